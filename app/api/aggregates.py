@@ -0,0 +1,314 @@
+"""Agregados pré-calculados para a família /insights.
+
+`empresa_resumo` guarda, por empresa, as contagens e somas que os GROUP BY de /insights
+precisam; `empresa_produto_resumo` guarda quantos detalhes de produto cada empresa tem por
+nome. Os handlers de escrita chamam `refresh_empresas` na mesma transação, então as leituras
+viram um GROUP BY sobre uma linha por empresa em vez de juntar as tabelas de fatos.
+
+Inserções de uma avaliação ou de um faturamento aplicam deltas (`n = n + 1`, `soma = soma +
+valor`, via `add_avaliacao`/`add_faturamento`): o PostgreSQL reaplica o incremento sobre a
+versão mais nova da linha, então escritas concorrentes somam. Atualizações, lotes e vendas (cujo
+delta depende de outra linha) recalculam com `refresh_empresas`, que antes trava as linhas de
+`empresa_resumo` (SELECT ... FOR UPDATE, em ordem de id). No READ COMMITTED, um UPDATE que
+esperou outra transação reavalia só o WHERE, com as subconsultas do snapshot antigo, e apagaria
+a contribuição da outra escrita; travando antes, o UPDATE começa depois do commit dela.
+
+    python -m app.api.aggregates rebuild   # recalcula tudo (carga inicial)
+    python -m app.api.aggregates check     # compara com as consultas ao vivo
+"""
+import math
+import sys
+from sqlalchemy import Select, case, delete, func, insert, select, text, update
+from sqlalchemy.orm import Session
+from app.api import models as api_models
+
+Empresas = api_models.Empresas
+Faturamento = api_models.Faturamento
+ProdutosVendidos = api_models.ProdutosVendidos
+DetalhesProdutos = api_models.DetalhesProdutos
+Avaliacoes = api_models.AvaliacoesDiretorEmpresa
+Resumo = api_models.EmpresaResumo
+ProdutoResumo = api_models.EmpresaProdutoResumo
+
+
+def _faturamentos(expression):
+    return select(expression).where(Faturamento.id_empresa == Resumo.id_empresa).scalar_subquery()
+
+
+def _vendas(expression):
+    return (
+        select(expression)
+        .select_from(Faturamento)
+        .join(ProdutosVendidos, ProdutosVendidos.id_faturamento == Faturamento.id_faturamento)
+        .where(Faturamento.id_empresa == Resumo.id_empresa)
+        .scalar_subquery()
+    )
+
+
+def _avaliacoes(expression):
+    return select(expression).where(Avaliacoes.id_empresa == Resumo.id_empresa).scalar_subquery()
+
+
+def _soma(column):
+    return func.coalesce(func.sum(column), 0)
+
+
+FONTES = ("faturamento", "produtos_vendidos", "avaliacoes", "detalhes_produtos")
+
+
+def _resumo_values(fontes):
+    # Guardamos também quantos valores não nulos entraram em cada soma, para reproduzir
+    # o NULL que SUM/AVG devolvem quando o grupo não tem valores.
+    values = {}
+    if "faturamento" in fontes:
+        values.update({
+            "n_faturamentos": _faturamentos(func.count()),
+            "soma_faturamento_anual": _faturamentos(_soma(Faturamento.faturamento_anual)),
+            "n_faturamento_anual": _faturamentos(func.count(Faturamento.faturamento_anual)),
+        })
+    if "faturamento" in fontes or "produtos_vendidos" in fontes:
+        values.update({
+            "n_vendas": _vendas(func.count()),
+            "soma_faturamento_vendas": _vendas(_soma(Faturamento.faturamento_anual)),
+            "n_faturamento_vendas": _vendas(func.count(Faturamento.faturamento_anual)),
+            "soma_produtos_vendidos": _vendas(_soma(ProdutosVendidos.produtos_vendidos)),
+            "n_produtos_vendidos": _vendas(func.count(ProdutosVendidos.produtos_vendidos)),
+        })
+    if "avaliacoes" in fontes:
+        values.update({
+            "n_avaliacoes": _avaliacoes(func.count()),
+            "soma_nota_geral": _avaliacoes(_soma(Avaliacoes.nota_geral_empresa)),
+            "n_nota_geral": _avaliacoes(func.count(Avaliacoes.nota_geral_empresa)),
+            "soma_nota_diretor": _avaliacoes(_soma(Avaliacoes.nota_diretor)),
+            "n_nota_diretor": _avaliacoes(func.count(Avaliacoes.nota_diretor)),
+        })
+    return values
+
+
+def resumo_update(empresa_ids=None, fontes=FONTES):
+    values = _resumo_values(fontes)
+    if not values:
+        return None
+    where = [Resumo.id_empresa.in_(empresa_ids)] if empresa_ids is not None else []
+    return update(Resumo).where(*where).values(values)
+
+
+def lock_resumos(empresa_ids):
+    """SELECT ... FOR UPDATE das linhas de resumo, em ordem de id para não haver deadlock."""
+    return select(Resumo.id_empresa).where(Resumo.id_empresa.in_(empresa_ids)).order_by(Resumo.id_empresa).with_for_update()
+
+
+def _increment(db: Session, id_empresa: int, deltas: dict):
+    db.execute(update(Resumo).where(Resumo.id_empresa == id_empresa).values({key: getattr(Resumo, key) + value for key, value in deltas.items()}))
+
+
+def _com_valor(deltas: dict, soma: str, n: str, value):
+    deltas[soma] = value if value is not None else 0
+    deltas[n] = int(value is not None)
+    return deltas
+
+
+def add_avaliacao(db: Session, avaliacao):
+    """Soma uma avaliação recém-inserida ao resumo da empresa."""
+    deltas = _com_valor({"n_avaliacoes": 1}, "soma_nota_geral", "n_nota_geral", avaliacao.nota_geral_empresa)
+    _increment(db, avaliacao.id_empresa, _com_valor(deltas, "soma_nota_diretor", "n_nota_diretor", avaliacao.nota_diretor))
+
+
+def add_faturamento(db: Session, faturamento):
+    """Soma um faturamento recém-inserido; ainda sem vendas, os agregados de vendas não mudam."""
+    _increment(db, faturamento.id_empresa, _com_valor({"n_faturamentos": 1}, "soma_faturamento_anual", "n_faturamento_anual", faturamento.faturamento_anual))
+
+
+def create_resumo(db: Session, id_empresa: int):
+    """Linha zerada para uma empresa nova; as escritas seguintes só fazem UPDATE."""
+    db.execute(insert(Resumo).values(id_empresa=id_empresa))
+
+
+def refresh_empresas(db: Session, empresa_ids=None, fontes=FONTES):
+    """Recalcula os agregados das empresas informadas a partir das tabelas em `fontes`.
+
+    `empresa_ids` pode ser uma coleção ou um SELECT de ids; com `None` recalcula todas as
+    empresas e cria as linhas que faltarem (carga inicial).
+    """
+    if empresa_ids is not None and not isinstance(empresa_ids, Select):
+        empresa_ids = {empresa_id for empresa_id in empresa_ids if empresa_id is not None}
+        if not empresa_ids:
+            return
+
+    def only(column):
+        return [column.in_(empresa_ids)] if empresa_ids is not None else []
+
+    if empresa_ids is None:
+        missing = select(Empresas.id_empresa).where(Empresas.id_empresa.not_in(select(Resumo.id_empresa)))
+        db.execute(insert(Resumo).from_select(["id_empresa"], missing))
+    elif db.get_bind().dialect.name == "postgresql":
+        # O SQLite já serializa as transações de escrita; ele ignoraria o FOR UPDATE.
+        db.execute(lock_resumos(empresa_ids))
+
+    stmt = resumo_update(empresa_ids, fontes)
+    if stmt is not None:
+        db.execute(stmt)
+
+    if "detalhes_produtos" in fontes:
+        db.execute(delete(ProdutoResumo).where(*only(ProdutoResumo.id_empresa)))
+        detalhes = (
+            select(DetalhesProdutos.id_empresa, DetalhesProdutos.nome_produto, func.count())
+            .where(DetalhesProdutos.id_empresa.is_not(None), *only(DetalhesProdutos.id_empresa))
+            .group_by(DetalhesProdutos.id_empresa, DetalhesProdutos.nome_produto)
+        )
+        db.execute(insert(ProdutoResumo).from_select(["id_empresa", "nome_produto", "n_detalhes"], detalhes))
+
+
+def empresas_de_faturamentos(id_faturamentos):
+    return select(Faturamento.id_empresa).where(Faturamento.id_faturamento.in_(id_faturamentos))
+
+
+def _ratio(numerator, denominator):
+    return case((denominator > 0, numerator * 1.0 / denominator))
+
+
+def _sum_if(value, weight):
+    return case((func.sum(weight) > 0, func.sum(value)))
+
+
+def insights_stmt():
+    return (
+        select(
+            Empresas.nome_empresa,
+            _sum_if(Resumo.soma_faturamento_anual * Resumo.n_avaliacoes, Resumo.n_faturamento_anual * Resumo.n_avaliacoes).label("faturamento_total_anual"),
+            _ratio(func.sum(Resumo.soma_nota_geral * Resumo.n_faturamentos), func.sum(Resumo.n_nota_geral * Resumo.n_faturamentos)).label("media_nota_empresa"),
+        )
+        .join(Resumo, Resumo.id_empresa == Empresas.id_empresa)
+        .group_by(Empresas.nome_empresa)
+        .having(func.sum(Resumo.n_faturamentos * Resumo.n_avaliacoes) > 0)
+    )
+
+
+def insights(db: Session):
+    return [row._asdict() for row in db.execute(insights_stmt()).all()]
+
+
+def maior_lucro(db: Session):
+    stmt = (
+        select(
+            Empresas.diretor_empresa,
+            ProdutoResumo.nome_produto,
+            Empresas.nome_empresa,
+            _sum_if(ProdutoResumo.n_detalhes * Resumo.soma_faturamento_vendas, ProdutoResumo.n_detalhes * Resumo.n_faturamento_vendas).label("faturamento_total"),
+            _sum_if(ProdutoResumo.n_detalhes * Resumo.soma_produtos_vendidos, ProdutoResumo.n_detalhes * Resumo.n_produtos_vendidos).label("total_produtos_vendidos"),
+        )
+        .join(Resumo, Resumo.id_empresa == Empresas.id_empresa)
+        .join(ProdutoResumo, ProdutoResumo.id_empresa == Empresas.id_empresa)
+        .group_by(Empresas.diretor_empresa, Empresas.nome_empresa, ProdutoResumo.nome_produto)
+        .having(func.sum(ProdutoResumo.n_detalhes * Resumo.n_vendas) > 0)
+        .order_by(text("faturamento_total desc"))
+    )
+    return [row._asdict() for row in db.execute(stmt).all()]
+
+
+def media_notas_diretor(db: Session):
+    stmt = (
+        select(
+            Empresas.diretor_empresa,
+            _ratio(func.sum(Resumo.soma_nota_diretor), func.sum(Resumo.n_nota_diretor)).label("media_nota"),
+        )
+        .join(Resumo, Resumo.id_empresa == Empresas.id_empresa)
+        .group_by(Empresas.diretor_empresa)
+        .having(func.sum(Resumo.n_avaliacoes) > 0)
+    )
+    return [{"diretor_empresa": diretor, "media_nota": media} for diretor, media in db.execute(stmt).all()]
+
+
+def insights_live(db: Session):
+    stmt = (
+        select(
+            Empresas.nome_empresa,
+            func.sum(Faturamento.faturamento_anual).label("faturamento_total_anual"),
+            func.avg(Avaliacoes.nota_geral_empresa).label("media_nota_empresa")
+        )
+        .join(Faturamento)
+        .join(Avaliacoes)
+        .group_by(Empresas.nome_empresa)
+    )
+    return [row._asdict() for row in db.execute(stmt).all()]
+
+
+def maior_lucro_live(db: Session):
+    stmt = (
+        select(
+            Empresas.diretor_empresa,
+            DetalhesProdutos.nome_produto,
+            Empresas.nome_empresa,
+            func.sum(Faturamento.faturamento_anual).label('faturamento_total'),
+            func.sum(ProdutosVendidos.produtos_vendidos).label('total_produtos_vendidos')
+        )
+        .join(Faturamento, Empresas.id_empresa == Faturamento.id_empresa)
+        .join(ProdutosVendidos, Faturamento.id_faturamento == ProdutosVendidos.id_faturamento)
+        .join(DetalhesProdutos, Empresas.id_empresa == DetalhesProdutos.id_empresa)
+        .group_by(Empresas.diretor_empresa, Empresas.nome_empresa, DetalhesProdutos.nome_produto)
+        .order_by(text('faturamento_total desc'))
+    )
+    return [row._asdict() for row in db.execute(stmt).all()]
+
+
+def media_notas_diretor_live(db: Session):
+    stmt = select(Empresas.diretor_empresa, func.avg(Avaliacoes.nota_diretor).label("media_nota")).join(Avaliacoes).group_by(Empresas.diretor_empresa)
+    return [{"diretor_empresa": diretor, "media_nota": media} for diretor, media in db.execute(stmt).all()]
+
+
+REPORTS = {
+    "insights": (insights, insights_live, ("nome_empresa",)),
+    "maior_lucro": (maior_lucro, maior_lucro_live, ("diretor_empresa", "nome_empresa", "nome_produto")),
+    "media_notas_diretor": (media_notas_diretor, media_notas_diretor_live, ("diretor_empresa",)),
+}
+
+
+def _same_value(left, right, rel_tol):
+    if left is None or right is None:
+        return left is None and right is None
+    if isinstance(left, str) or isinstance(right, str):
+        return left == right
+    return math.isclose(float(left), float(right), rel_tol=rel_tol, abs_tol=1e-9)
+
+
+def check_consistency(db: Session, rel_tol: float = 1e-9):
+    """Compara os agregados com as consultas ao vivo; devolve as divergências por relatório."""
+    divergencias = {}
+    for name, (rollup, live, keys) in REPORTS.items():
+        expected = {tuple(row[key] for key in keys): row for row in live(db)}
+        actual = {tuple(row[key] for key in keys): row for row in rollup(db)}
+        problems = []
+        for key in expected.keys() | actual.keys():
+            left, right = expected.get(key), actual.get(key)
+            if left is None or right is None or any(not _same_value(left[field], right[field], rel_tol) for field in left):
+                problems.append({"chave": key, "ao_vivo": left, "agregado": right})
+        if problems:
+            divergencias[name] = problems
+    return divergencias
+
+
+def main(argv):
+    from database import SessionLocal, get_engine
+
+    command = argv[0] if argv else "check"
+    with SessionLocal(bind=get_engine()) as db:
+        if command == "rebuild":
+            refresh_empresas(db)
+            db.commit()
+            print("Agregados recalculados.")
+            return 0
+        if command == "check":
+            divergencias = check_consistency(db)
+            for name, problems in divergencias.items():
+                print(f"{name}: {len(problems)} divergência(s)")
+                for problem in problems[:10]:
+                    print(f"  {problem}")
+            if not divergencias:
+                print("Agregados consistentes.")
+            return 1 if divergencias else 0
+    print(f"Comando desconhecido: {command}")
+    return 2
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
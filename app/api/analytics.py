@@ -0,0 +1,293 @@
+"""Relatórios de ranking, percentis, z-scores e correlações sobre um frame colunar em memória.
+
+O frame guarda em arrays NumPy as colunas de faturamento (ordenadas por id) e, por empresa,
+nome, diretor e médias das notas (de `empresa_resumo`). Cada relatório é uma operação
+vetorizada sobre esses arrays, sem consulta ao banco.
+
+O frame acompanha as gerações das tags do cache de respostas. Se só `empresas` ou `avaliacoes`
+mudaram, recarrega a tabela de empresas (uma linha por empresa). Se `faturamento` mudou e todas
+as escritas foram avisadas por `notify_faturamento` neste processo, relê só esses ids. Senão
+(escrita feita em outro worker, por exemplo) recarrega o faturamento inteiro. Escritas fora da
+API não mudam geração nenhuma: passados `REPORT_FRAME_TTL_SECONDS` da última carga completa, a
+próxima leitura recarrega tudo.
+
+NumPy é opcional: sem ele `available()` é falso e os endpoints usam o SQL equivalente.
+"""
+import os
+import threading
+import time
+from dataclasses import dataclass, replace
+from functools import cached_property
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+from app.api import models as api_models
+from app.api.cache import replica_may_lag, response_cache
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - dependência opcional
+    np = None
+
+Empresas = api_models.Empresas
+Faturamento = api_models.Faturamento
+Resumo = api_models.EmpresaResumo
+
+TAGS = ("empresas", "faturamento", "avaliacoes")
+COLUNA_PATTERN = "^(faturamento_anual|faturamento_mensal)$"
+NOTAS = ("nota_geral_empresa", "nota_diretor")
+SEM_EMPRESA = -1
+REPORT_FRAME_TTL_SECONDS = float(os.environ.get("REPORT_FRAME_TTL_SECONDS", "300"))
+
+
+def available() -> bool:
+    return np is not None
+
+
+def _floats(values):
+    return np.array([np.nan if value is None else value for value in values], dtype=np.float64)
+
+
+def _ints(values):
+    return np.array([SEM_EMPRESA if value is None else value for value in values], dtype=np.int64)
+
+
+def _media(soma, n):
+    return np.divide(soma, n, out=np.full(len(n), np.nan), where=n > 0)
+
+
+@dataclass(frozen=True)
+class Frame:
+    fat_id: "np.ndarray"
+    fat_empresa: "np.ndarray"
+    faturamento_anual: "np.ndarray"
+    faturamento_mensal: "np.ndarray"
+    emp_id: "np.ndarray"
+    emp_nome: "np.ndarray"
+    emp_diretor: "np.ndarray"
+    nota_geral_empresa: "np.ndarray"
+    nota_diretor: "np.ndarray"
+
+    # Derivados calculados no primeiro uso; `replace` cria outro frame e eles são refeitos.
+    @cached_property
+    def fat_empresa_index(self):
+        """Posição de cada faturamento em `emp_id` e se a empresa existe."""
+        return _empresa_index(self, self.fat_empresa)
+
+    @cached_property
+    def ordem_anual(self):
+        """Linhas com faturamento anual e empresa existente, por (valor, id)."""
+        rows, _ = _com_empresa(self, self.faturamento_anual)
+        return rows[np.lexsort((self.fat_id[rows], self.faturamento_anual[rows]))]
+
+    @cached_property
+    def ordem_anual_desc(self):
+        """Como `ordem_anual`, mas do maior valor para o menor (empates ainda por id)."""
+        rows, _ = _com_empresa(self, self.faturamento_anual)
+        return rows[np.lexsort((self.fat_id[rows], -self.faturamento_anual[rows]))]
+
+
+def _faturamento_columns(rows) -> dict:
+    ids, empresas, anual, mensal = zip(*rows) if rows else ((), (), (), ())
+    return {
+        "fat_id": np.array(ids, dtype=np.int64),
+        "fat_empresa": _ints(empresas),
+        "faturamento_anual": _floats(anual),
+        "faturamento_mensal": _floats(mensal),
+    }
+
+
+_FATURAMENTO = (Faturamento.id_faturamento, Faturamento.id_empresa, Faturamento.faturamento_anual, Faturamento.faturamento_mensal)
+
+
+def load_faturamento(db: Session) -> dict:
+    return _faturamento_columns(db.execute(select(*_FATURAMENTO).order_by(Faturamento.id_faturamento)).all())
+
+
+def load_empresas(db: Session) -> dict:
+    stmt = (
+        select(Empresas.id_empresa, Empresas.nome_empresa, Empresas.diretor_empresa,
+               Resumo.soma_nota_geral, Resumo.n_nota_geral, Resumo.soma_nota_diretor, Resumo.n_nota_diretor)
+        .outerjoin(Resumo, Resumo.id_empresa == Empresas.id_empresa)
+        .order_by(Empresas.id_empresa)
+    )
+    rows = db.execute(stmt).all()
+    ids, nomes, diretores, soma_geral, n_geral, soma_diretor, n_diretor = zip(*rows) if rows else ((),) * 7
+    return {
+        "emp_id": np.array(ids, dtype=np.int64),
+        "emp_nome": np.array(nomes, dtype=object),
+        "emp_diretor": np.array(diretores, dtype=object),
+        "nota_geral_empresa": _media(_floats(soma_geral), _floats(n_geral)),
+        "nota_diretor": _media(_floats(soma_diretor), _floats(n_diretor)),
+    }
+
+
+def apply_faturamento(frame: Frame, db: Session, ids) -> Frame:
+    """Novo frame com as linhas `ids` relidas do banco (inseridas, alteradas ou removidas)."""
+    ids = np.unique(np.fromiter(ids, dtype=np.int64))
+    changed = _faturamento_columns(db.execute(select(*_FATURAMENTO).where(Faturamento.id_faturamento.in_(ids.tolist()))).all())
+    names = ("fat_id", "fat_empresa", "faturamento_anual", "faturamento_mensal")
+    keep = ~np.isin(frame.fat_id, ids)
+    columns = {name: np.concatenate([getattr(frame, name)[keep], changed[name]]) for name in names}
+    if len(changed["fat_id"]) and keep.any() and changed["fat_id"].min() <= frame.fat_id[keep][-1]:
+        order = np.argsort(columns["fat_id"], kind="stable")
+        columns = {name: values[order] for name, values in columns.items()}
+    return replace(frame, **columns)
+
+
+def load(db: Session) -> Frame:
+    return Frame(**load_faturamento(db), **load_empresas(db))
+
+
+class ReportFrame:
+    """Frame compartilhado pelas requisições. Nenhum lock é mantido durante o I/O (no modo
+    assíncrono a carga roda no event loop); duas cargas simultâneas só repetem trabalho."""
+
+    def __init__(self):
+        self._frame = None
+        self._generation = None
+        self._loaded_at = 0.0
+        self._pending: set[int] = set()
+        self._notified = 0
+        self._lock = threading.Lock()
+
+    def notify_faturamento(self, ids):
+        """Chamado pelas escritas de faturamento depois do commit, antes da invalidação da tag."""
+        with self._lock:
+            self._pending.update(key for key in ids if key is not None)
+            self._notified += 1
+
+    def get(self, db: Session) -> Frame:
+        generation = dict(zip(TAGS, response_cache.generation(TAGS)))
+        now = time.monotonic()
+        with self._lock:
+            frame, base = self._frame, self._generation
+            expired = REPORT_FRAME_TTL_SECONDS > 0 and now - self._loaded_at >= REPORT_FRAME_TTL_SECONDS
+            if frame is not None and base == generation and not expired:
+                return frame
+            pending, notified = self._pending, self._notified
+            self._pending, self._notified = set(), 0
+
+        full = frame is None or base is None or expired
+        if full:
+            new = load(db)
+        else:
+            new = frame
+            if generation["faturamento"] != base["faturamento"]:
+                if generation["faturamento"] - base["faturamento"] == notified:
+                    new = apply_faturamento(new, db, pending)
+                else:
+                    new = replace(new, **load_faturamento(db))
+            if generation["empresas"] != base["empresas"] or generation["avaliacoes"] != base["avaliacoes"]:
+                new = replace(new, **load_empresas(db))
+
+        with self._lock:
+            # Uma carga completa vale por si. Uma incremental só vale se ninguém trocou o frame
+            # enquanto ela rodava: os avisos que a outra consumiu não estão aqui, então a
+            # próxima leitura recarrega tudo. Lido de uma réplica logo após uma escrita, o frame
+            # pode não ter a escrita e também não vale além desta requisição.
+            valid = (full or self._frame is frame) and not replica_may_lag(db, TAGS)
+            self._generation = generation if valid else None
+            self._frame = new
+            if full and valid:
+                self._loaded_at = now
+        return new
+
+
+report_frame = ReportFrame()
+
+
+def _empresa_index(frame: Frame, empresas):
+    index = np.searchsorted(frame.emp_id, empresas)
+    index = np.minimum(index, max(len(frame.emp_id) - 1, 0))
+    found = frame.emp_id[index] == empresas if len(frame.emp_id) else np.zeros(len(empresas), dtype=bool)
+    return index, found
+
+
+def _com_empresa(frame: Frame, values):
+    """Linhas de faturamento com valor e empresa existente (o equivalente ao INNER JOIN)."""
+    index, found = frame.fat_empresa_index
+    return np.flatnonzero(found & ~np.isnan(values)), index
+
+
+def ranking(frame: Frame, n: int, descending: bool) -> list[dict]:
+    """N maiores (ou menores) faturamentos anuais com o diretor da empresa; empates por id."""
+    chosen = (frame.ordem_anual_desc if descending else frame.ordem_anual)[:max(n, 0)]
+    index, _ = frame.fat_empresa_index
+    return [
+        {"diretor_empresa": diretor, "faturamento_anual": float(valor)}
+        for diretor, valor in zip(frame.emp_diretor[index[chosen]], frame.faturamento_anual[chosen])
+    ]
+
+
+def percentis(frame: Frame, coluna: str, ps) -> dict:
+    values = getattr(frame, coluna)
+    values = values[~np.isnan(values)]
+    resultado = {f"p{p:g}": None for p in ps}
+    if len(values):
+        resultado = {f"p{p:g}": float(value) for p, value in zip(ps, np.percentile(values, ps))}
+    return {"coluna": coluna, "n": int(len(values)), "percentis": resultado}
+
+
+def zscores(frame: Frame, coluna: str, limite: float, n: int) -> list[dict]:
+    """Linhas com |z| >= `limite`, maiores primeiro; z usa a média e o desvio da população."""
+    values = getattr(frame, coluna)
+    rows = np.flatnonzero(~np.isnan(values))
+    if len(rows) < 2:
+        return []
+    std = values[rows].std()
+    if std == 0:
+        return []
+    z = (values[rows] - values[rows].mean()) / std
+    selected = np.flatnonzero(np.abs(z) >= limite)
+    selected = selected[np.lexsort((frame.fat_id[rows[selected]], -np.abs(z[selected])))][:n]
+    chosen = rows[selected]
+    index, found = _empresa_index(frame, frame.fat_empresa[chosen])
+    return [
+        {
+            "id_faturamento": int(id_faturamento),
+            "id_empresa": int(id_empresa) if id_empresa != SEM_EMPRESA else None,
+            "nome_empresa": nome if achou else None,
+            "valor": float(valor),
+            "z": float(score),
+        }
+        for id_faturamento, id_empresa, nome, achou, valor, score in zip(
+            frame.fat_id[chosen], frame.fat_empresa[chosen], frame.emp_nome[index], found, values[chosen], z[selected]
+        )
+    ]
+
+
+def _ranks(values):
+    """Postos com média nos empates (como o Spearman costuma ser calculado)."""
+    order = np.argsort(values, kind="stable")
+    sorted_values = values[order]
+    starts = np.flatnonzero(np.r_[True, sorted_values[1:] != sorted_values[:-1]])
+    counts = np.diff(np.r_[starts, len(values)])
+    average = starts + (counts - 1) / 2 + 1
+    ranks = np.empty(len(values))
+    ranks[order] = np.repeat(average, counts)
+    return ranks
+
+
+def _pearson(x, y):
+    if len(x) < 2 or x.std() == 0 or y.std() == 0:
+        return None
+    return float(np.corrcoef(x, y)[0, 1])
+
+
+def correlacoes(frame: Frame) -> list[dict]:
+    """Correlação entre o faturamento anual total de cada empresa e as médias das notas."""
+    rows, index = _com_empresa(frame, frame.faturamento_anual)
+    total = np.bincount(index[rows], weights=frame.faturamento_anual[rows], minlength=len(frame.emp_id))
+    com_faturamento = np.bincount(index[rows], minlength=len(frame.emp_id)) > 0
+    resultado = []
+    for nota in NOTAS:
+        notas = getattr(frame, nota)
+        mask = com_faturamento & ~np.isnan(notas)
+        x, y = total[mask], notas[mask]
+        resultado.append({
+            "nota": nota,
+            "n_empresas": int(mask.sum()),
+            "pearson": _pearson(x, y),
+            "spearman": _pearson(_ranks(x), _ranks(y)) if len(x) else None,
+        })
+    return resultado
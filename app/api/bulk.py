@@ -0,0 +1,197 @@
+import json
+import os
+from dataclasses import dataclass
+from fastapi import HTTPException, Request, status
+from pydantic import BaseModel, ValidationError
+from sqlalchemy import func, insert, select
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from app.api import aggregates
+from app.api import models as api_models
+from app.api import schemas as api_schemas
+from database import is_foreign_key_violation
+
+BULK_MAX_ROWS = int(os.environ.get("BULK_MAX_ROWS", "10000"))
+CONFLICT_PATTERN = "^(error|ignore|update)$"
+
+
+@dataclass(frozen=True)
+class BulkSpec:
+    model: type
+    schema: type[BaseModel]
+    parent: type
+    foreign_key: str
+    parent_missing: str
+
+
+FATURAMENTO = BulkSpec(api_models.Faturamento, api_schemas.FaturamentoBulk, api_models.Empresas, "id_empresa", "Empresa com ID {} não encontrada.")
+PRODUTOS_VENDIDOS = BulkSpec(api_models.ProdutosVendidos, api_schemas.ProdutosVendidosBulk, api_models.Faturamento, "id_faturamento", "Faturamento com ID {} não encontrado.")
+DETALHES_PRODUTOS = BulkSpec(api_models.DetalhesProdutos, api_schemas.DetalhesProdutosBulk, api_models.Empresas, "id_empresa", "Empresa com ID {} não encontrada.")
+AVALIACOES = BulkSpec(api_models.AvaliacoesDiretorEmpresa, api_schemas.AvaliacoesDiretorEmpresaBulk, api_models.Empresas, "id_empresa", "Empresa com ID {} não encontrada.")
+
+
+async def read_rows(request: Request) -> list:
+    """Lê o corpo como lista JSON ou NDJSON (`Content-Type: application/x-ndjson`)."""
+    body = await request.body()
+    try:
+        if "ndjson" in request.headers.get("content-type", ""):
+            rows = [json.loads(line) for line in body.splitlines() if line.strip()]
+        else:
+            rows = json.loads(body or b"null")
+    except ValueError:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Corpo inválido: esperado JSON ou NDJSON.")
+    if not isinstance(rows, list):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Corpo inválido: esperada uma lista de registros.")
+    if len(rows) > BULK_MAX_ROWS:
+        raise HTTPException(status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE, detail=f"Máximo de {BULK_MAX_ROWS} registros por requisição.")
+    return rows
+
+
+def _primary_key(model):
+    return model.__mapper__.primary_key[0]
+
+
+def _insert_for(db: Session, model, on_conflict: str):
+    dialect = db.get_bind().dialect.name
+    if on_conflict == "error":
+        return insert(model)
+    if dialect == "postgresql":
+        stmt = postgresql.insert(model)
+    elif dialect == "sqlite":
+        stmt = sqlite.insert(model)
+    else:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"on_conflict não suportado em {dialect}.")
+
+    pk = _primary_key(model)
+    if on_conflict == "ignore":
+        return stmt.on_conflict_do_nothing(index_elements=[pk])
+    columns = [column.key for column in model.__table__.columns if column is not pk]
+    return stmt.on_conflict_do_update(index_elements=[pk], set_={key: stmt.excluded[key] for key in columns})
+
+
+def _execute_rows(db: Session, stmt, rows: list[dict], key: str | None = None) -> list:
+    """Executa o lote num savepoint; se o banco recusar, repete linha a linha.
+
+    Devolve, por linha, a chave que o RETURNING devolveu (None quando o ON CONFLICT a ignorou)
+    ou o `IntegrityError` que a recusou. Com `key`, as linhas trazem a própria chave e são
+    achadas por ela; sem, o RETURNING precisa vir na ordem dos parâmetros.
+    """
+    try:
+        with db.begin_nested():
+            returned = db.execute(stmt, rows).scalars().all()
+        if key is None:
+            return returned
+        returned = set(returned)
+        return [row[key] if row[key] in returned else None for row in rows]
+    except IntegrityError:
+        pass
+    outcomes = []
+    for row in rows:
+        try:
+            with db.begin_nested():
+                outcomes.append(db.execute(stmt, [row]).scalar_one_or_none())
+        except IntegrityError as exc:
+            outcomes.append(exc)
+    return outcomes
+
+
+def _integrity_error(spec: BulkSpec, data: dict, exc: IntegrityError) -> str:
+    if is_foreign_key_violation(exc):
+        return spec.parent_missing.format(data[spec.foreign_key])
+    return f"Registro recusado pelo banco: {str(exc.orig).splitlines()[0]}"
+
+
+def _advance_sequence(db: Session, model, max_key: int):
+    """IDs explícitos não avançam a sequência do SERIAL no PostgreSQL; sem isso o próximo POST
+    sem ID colidiria com eles. Só avança: nunca volta abaixo do valor atual."""
+    if db.get_bind().dialect.name != "postgresql":
+        return
+    sequence = func.pg_get_serial_sequence(model.__table__.fullname, _primary_key(model).name)
+    db.execute(select(func.setval(sequence, func.greatest(func.nextval(sequence), max_key))))
+
+
+def bulk_insert(db: Session, spec: BulkSpec, rows: list, on_conflict: str = "error"):
+    pk = _primary_key(spec.model)
+    results = [None] * len(rows)
+    valid = []
+
+    for index, row in enumerate(rows):
+        try:
+            valid.append((index, spec.schema.model_validate(row).model_dump()))
+        except ValidationError as exc:
+            results[index] = {"indice": index, "status": "erro", "erro": exc.errors(include_url=False)[0]["msg"]}
+
+    # Uma única consulta IN valida todas as chaves estrangeiras do lote.
+    parent_pk = _primary_key(spec.parent)
+    parent_ids = {data[spec.foreign_key] for _, data in valid}
+    existing_parents = set(db.execute(select(parent_pk).where(parent_pk.in_(parent_ids))).scalars()) if parent_ids else set()
+
+    to_write = []
+    for index, data in valid:
+        if data[spec.foreign_key] not in existing_parents:
+            results[index] = {"indice": index, "status": "erro", "erro": spec.parent_missing.format(data[spec.foreign_key])}
+        else:
+            to_write.append((index, data))
+
+    with_pk, seen = [], set()
+    for index, data in to_write:
+        key = data[pk.key]
+        if key is None:
+            continue
+        if key in seen:
+            # No PostgreSQL, o ON CONFLICT DO UPDATE não pode tocar a mesma linha duas vezes.
+            results[index] = {"indice": index, "status": "erro", "id": key, "erro": f"ID {key} repetido no lote."}
+        else:
+            seen.add(key)
+            with_pk.append((index, data))
+    without_pk = [(index, {key: value for key, value in data.items() if key != pk.key}) for index, data in to_write if data[pk.key] is None]
+
+    # Linhas que já existem: servem para saber se o upsert atualizou e quais empresas mudam.
+    existing = {}
+    if with_pk:
+        fk = getattr(spec.model, spec.foreign_key)
+        stmt = select(pk, fk).where(pk.in_([data[pk.key] for _, data in with_pk]))
+        existing = dict(db.execute(stmt).all())
+
+    if on_conflict == "error":
+        for index, data in with_pk:
+            if data[pk.key] in existing:
+                results[index] = {"indice": index, "status": "erro", "id": data[pk.key], "erro": f"Registro com ID {data[pk.key]} já existe."}
+        with_pk = [(index, data) for index, data in with_pk if data[pk.key] not in existing]
+
+    if with_pk:
+        stmt = _insert_for(db, spec.model, on_conflict).returning(pk)
+        outcomes = _execute_rows(db, stmt, [data for _, data in with_pk], pk.key)
+        for (index, data), outcome in zip(with_pk, outcomes):
+            key = data[pk.key]
+            if isinstance(outcome, IntegrityError):
+                results[index] = {"indice": index, "status": "erro", "id": key, "erro": _integrity_error(spec, data, outcome)}
+            elif outcome is None:
+                results[index] = {"indice": index, "status": "ignorado", "id": key}
+            else:
+                results[index] = {"indice": index, "status": "atualizado" if key in existing else "criado", "id": key}
+        written = [outcome for outcome in outcomes if outcome is not None and not isinstance(outcome, IntegrityError)]
+        if written:
+            _advance_sequence(db, spec.model, max(written))
+
+    if without_pk:
+        stmt = insert(spec.model).returning(pk, sort_by_parameter_order=True)
+        outcomes = _execute_rows(db, stmt, [data for _, data in without_pk])
+        for (index, data), outcome in zip(without_pk, outcomes):
+            if isinstance(outcome, IntegrityError):
+                results[index] = {"indice": index, "status": "erro", "erro": _integrity_error(spec, data, outcome)}
+            else:
+                results[index] = {"indice": index, "status": "criado", "id": outcome}
+
+    parents = {data[spec.foreign_key] for _, data in to_write} | set(existing.values())
+    if parents:
+        empresas = parents if spec.parent is api_models.Empresas else aggregates.empresas_de_faturamentos(parents)
+        aggregates.refresh_empresas(db, empresas, [spec.model.__tablename__])
+    db.commit()
+
+    summary = {"criados": 0, "atualizados": 0, "ignorados": 0, "erros": 0}
+    labels = {"criado": "criados", "atualizado": "atualizados", "ignorado": "ignorados", "erro": "erros"}
+    for result in results:
+        summary[labels[result["status"]]] += 1
+    return {**summary, "itens": results}
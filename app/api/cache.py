@@ -0,0 +1,258 @@
+import functools
+import hashlib
+import inspect
+import os
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from fastapi import Request, Response
+from app.api.responses import dumps
+from app.compression import strip_encoding
+from app.shared import SharedGenerations, shared_generations, shared_token
+from database import DB_REPLICA_LAG_SECONDS
+
+RESPONSE_CACHE_SIZE = int(os.environ.get("RESPONSE_CACHE_SIZE", "512"))
+RESPONSE_CACHE_TTL_SECONDS = int(os.environ.get("RESPONSE_CACHE_TTL_SECONDS", "300"))
+
+
+@dataclass
+class CachedResponse:
+    body: bytes
+    etag: str
+    media_type: str
+    expires_at: float
+
+
+class CacheBackend:
+    """Interface de armazenamento do cache de respostas.
+
+    Um backend compartilhado (Redis, memcached) só precisa implementar estes métodos;
+    `generation` deve mudar sempre que uma das tags for invalidada.
+    """
+
+    def get(self, key: str) -> CachedResponse | None:
+        raise NotImplementedError
+
+    def set(self, key: str, entry: CachedResponse, tags, generation) -> None:
+        raise NotImplementedError
+
+    def generation(self, tags):
+        raise NotImplementedError
+
+    def invalidate(self, *tags: str) -> None:
+        raise NotImplementedError
+
+    def invalidated_within(self, tags, seconds: float) -> bool:
+        """Se alguma das tags foi invalidada nos últimos `seconds` (usado com réplicas)."""
+        return False
+
+    def stats(self) -> dict:
+        return {}
+
+
+class MemoryCacheBackend(CacheBackend):
+    """LRU por processo. Com `shared`, as gerações das tags ficam no arquivo compartilhado e
+    uma invalidação feita em outro worker descarta a entrada na próxima leitura."""
+
+    def __init__(self, max_size: int, shared: SharedGenerations | None = None):
+        self.max_size = max_size
+        self.shared = shared
+        self._entries: OrderedDict[str, tuple[CachedResponse, tuple, tuple]] = OrderedDict()
+        self._keys_by_tag: dict[str, set[str]] = {}
+        self._generations: dict[str, int] = {}
+        self._invalidated_at: dict[str, float] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def _current(self, tags):
+        if self.shared is not None:
+            return tuple(self.shared.get(f"response:{tag}") for tag in tags)
+        return tuple(self._generations.get(tag, 0) for tag in tags)
+
+    def get(self, key):
+        with self._lock:
+            stored = self._entries.get(key)
+            if stored is None or stored[0].expires_at <= time.time() or (self.shared is not None and self._current(stored[1]) != stored[2]):
+                self._entries.pop(key, None)
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return stored[0]
+
+    def generation(self, tags):
+        with self._lock:
+            return self._current(tags)
+
+    def set(self, key, entry, tags, generation):
+        if self.max_size <= 0:
+            return
+        with self._lock:
+            # Uma escrita que terminou durante o cálculo invalida o resultado antes de ele entrar.
+            if self._current(tags) != generation:
+                return
+            self._entries[key] = (entry, tuple(tags), generation)
+            self._entries.move_to_end(key)
+            for tag in tags:
+                self._keys_by_tag.setdefault(tag, set()).add(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, *tags):
+        with self._lock:
+            for tag in tags:
+                if self.shared is not None:
+                    self.shared.bump(f"response:{tag}")
+                self._generations[tag] = self._generations.get(tag, 0) + 1
+                self._invalidated_at[tag] = time.monotonic()
+                for key in self._keys_by_tag.pop(tag, ()):
+                    self._entries.pop(key, None)
+
+    def invalidated_within(self, tags, seconds):
+        # Só as escritas deste processo: com vários workers, as dos outros não aparecem aqui.
+        limit = time.monotonic() - seconds
+        return any(self._invalidated_at.get(tag, float("-inf")) > limit for tag in tags)
+
+    def stats(self):
+        with self._lock:
+            return {"size": len(self._entries), "max_size": self.max_size, "hits": self.hits, "misses": self.misses}
+
+
+response_cache: CacheBackend = MemoryCacheBackend(RESPONSE_CACHE_SIZE, shared_generations())
+
+
+def replica_may_lag(db, tags) -> bool:
+    """Sessão numa réplica pouco depois de uma escrita nas tags: o resultado pode ser anterior
+    à escrita, então é entregue mas não guardado."""
+    return db is not None and db.info.get("replica", False) and response_cache.invalidated_within(tags, DB_REPLICA_LAG_SECONDS)
+
+
+def _cache_key(request: Request) -> str:
+    query = "&".join(f"{key}={value}" for key, value in sorted(request.query_params.multi_items()))
+    return f"{request.url.path}?{query}"
+
+
+# Os contadores de geração recomeçam do zero a cada subida (ou a cada diretório compartilhado
+# novo); o token entra no ETag para que uma versão antiga não coincida com a nova numeração.
+_ETAG_EPOCH = shared_token() or os.urandom(8).hex()
+
+
+def version_etag(key: str, generation) -> str:
+    """ETag forte a partir da geração das tags, sem olhar o corpo.
+
+    Escritas fora da API não mudam a geração; a janela de `RESPONSE_CACHE_TTL_SECONDS` limita
+    por quanto tempo um 304 pode confirmar um resultado desses, como o TTL faz no cache.
+    """
+    window = int(time.time() // RESPONSE_CACHE_TTL_SECONDS) if RESPONSE_CACHE_TTL_SECONDS > 0 else 0
+    return f'"{hashlib.sha1(f"{_ETAG_EPOCH}|{window}|{key}|{generation}".encode()).hexdigest()}"'
+
+
+def content_etag(body: bytes) -> str:
+    return f'"{hashlib.sha1(body).hexdigest()}"'
+
+
+def _etag_matches(request: Request, etag: str) -> bool:
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    # Comparação fraca (RFC 9110), ignorando o sufixo que a compressão acrescenta ao ETag.
+    return header.strip() == "*" or etag in (strip_encoding(value.strip().removeprefix("W/")) for value in header.split(","))
+
+
+def not_modified(etag: str) -> Response:
+    return Response(status_code=304, headers={"ETag": etag, "X-Cache": "HIT"})
+
+
+def _send(request: Request, entry: CachedResponse, status: str) -> Response:
+    headers = {"ETag": entry.etag, "X-Cache": status}
+    if _etag_matches(request, entry.etag):
+        return Response(status_code=304, headers=headers)
+    return Response(content=entry.body, media_type=entry.media_type, headers=headers)
+
+
+def cached_response(*tags: str):
+    """Guarda o JSON serializado da resposta, indexado por rota e query string.
+
+    O decorador acrescenta um parâmetro `Request` à assinatura do endpoint; respostas que já
+    são `Response` (exports em streaming, por exemplo) passam direto sem cache. O ETag vem da
+    geração das tags (`version_etag`), então um If-None-Match da versão atual recebe 304 antes
+    de consultar o cache ou o banco.
+    """
+    def decorator(func):
+        signature = inspect.signature(func)
+        request_param = inspect.Parameter("_cache_request", inspect.Parameter.KEYWORD_ONLY, annotation=Request)
+
+        @functools.wraps(func)
+        async def wrapper(*args, _cache_request: Request, **kwargs):
+            key = _cache_key(_cache_request)
+            generation = response_cache.generation(tags)
+            etag = version_etag(key, generation)
+            if _etag_matches(_cache_request, etag):
+                return not_modified(etag)
+            entry = response_cache.get(key)
+            if entry is not None:
+                return _send(_cache_request, entry, "HIT")
+
+            result = await func(*args, **kwargs)
+            if isinstance(result, Response):
+                return result
+
+            body = dumps(result)
+            # Lido de uma réplica atrasada, o corpo pode ser anterior à geração: o ETag vem do conteúdo.
+            lagging = replica_may_lag(kwargs.get("db"), tags)
+            entry = CachedResponse(
+                body=body,
+                etag=content_etag(body) if lagging else etag,
+                media_type="application/json",
+                expires_at=time.time() + RESPONSE_CACHE_TTL_SECONDS,
+            )
+            if not lagging:
+                response_cache.set(key, entry, tags, generation)
+            return _send(_cache_request, entry, "MISS")
+
+        wrapper.__signature__ = signature.replace(parameters=[*signature.parameters.values(), request_param])
+        return wrapper
+    return decorator
+
+
+def conditional_response(tags_for):
+    """ETag e 304 sem guardar o corpo, para respostas numerosas demais para o cache (as páginas
+    das listagens, uma por cursor).
+
+    `tags_for(request)` devolve as tags lidas pela requisição. O ETag é o mesmo `version_etag`
+    de `cached_response`, sobre a rota e a query string inteira, então cursor, limit, fields e
+    expand entram nele; um If-None-Match da versão atual recebe 304 sem consultar o banco.
+    """
+    def decorator(func):
+        signature = inspect.signature(func)
+        request_param = inspect.Parameter("_cache_request", inspect.Parameter.KEYWORD_ONLY, annotation=Request)
+
+        @functools.wraps(func)
+        async def wrapper(*args, _cache_request: Request, **kwargs):
+            tags = tags_for(_cache_request)
+            etag = version_etag(_cache_key(_cache_request), response_cache.generation(tags))
+            if _etag_matches(_cache_request, etag):
+                return not_modified(etag)
+            result = await func(*args, **kwargs)
+            # Da réplica logo depois de uma escrita, o corpo pode ser anterior à geração.
+            if isinstance(result, Response) and not replica_may_lag(kwargs.get("db"), tags):
+                result.headers["ETag"] = etag
+            return result
+
+        wrapper.__signature__ = signature.replace(parameters=[*signature.parameters.values(), request_param])
+        return wrapper
+    return decorator
+
+
+def invalidates(*tags: str):
+    """Invalida as tags do cache depois que o handler de escrita termina sem erro."""
+    def decorator(func):
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            result = await func(*args, **kwargs)
+            response_cache.invalidate(*tags)
+            return result
+        return wrapper
+    return decorator
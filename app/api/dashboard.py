@@ -0,0 +1,175 @@
+"""Vários relatórios numa resposta só, com uma autenticação e no máximo uma sessão por relatório.
+
+Cada relatório é guardado no cache de respostas com a própria chave e as próprias tags, já
+serializado; o corpo final é a concatenação dos JSONs, sem serializar de novo. Os relatórios
+fora do cache rodam em paralelo, cada um na sua sessão (até `DASHBOARD_CONCURRENCY` por
+requisição e, somando todas as requisições do worker, metade do pool), ou em sequência na
+sessão da requisição quando a concorrência é 1. Com `consistente=true` rodam em sequência numa
+conexão própria, numa transação somente leitura REPEATABLE READ no PostgreSQL: todos os
+relatórios enxergam o mesmo instante do banco. O ETag vem da geração das tags de todos os relatórios; um
+If-None-Match da versão atual recebe 304 sem consultar o cache nem o banco.
+"""
+import asyncio
+import os
+import time
+from dataclasses import dataclass
+from typing import Callable
+from fastapi import Request, Response
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+from app.api.cache import (
+    RESPONSE_CACHE_TTL_SECONDS, CachedResponse, _cache_key, _etag_matches, content_etag, not_modified, replica_may_lag,
+    response_cache, version_etag,
+)
+from app.api.responses import dumps
+from database import AsyncSessionLocal, SessionLocal, run_db
+
+DASHBOARD_CONCURRENCY = int(os.environ.get("DASHBOARD_CONCURRENCY", "4"))
+CONSISTENT_OPTIONS = {"isolation_level": "REPEATABLE READ", "postgresql_readonly": True}
+
+
+@dataclass(frozen=True)
+class Report:
+    tags: tuple[str, ...]
+    run: Callable[[Session], object]
+
+
+def _key(name: str) -> str:
+    return f"dashboard:{name}"
+
+
+def _render(report: Report, db: Session) -> bytes:
+    return dumps(report.run(db))
+
+
+def _render_all(reports: list[Report], db: Session) -> list[bytes]:
+    return [_render(report, db) for report in reports]
+
+
+def _session_info(db) -> dict:
+    # A sessão nova herda só a origem (réplica ou primário), que decide se o resultado vai ao cache.
+    return {"replica": db.info.get("replica", False)}
+
+
+def _fan_out_limit(engine) -> int:
+    """Metade da capacidade do pool (pool_size + max_overflow): o resto fica para as outras rotas."""
+    pool = getattr(engine, "sync_engine", engine).pool
+    size = pool.size() if hasattr(pool, "size") else DASHBOARD_CONCURRENCY
+    return max(1, (size + max(getattr(pool, "_max_overflow", 0), 0)) // 2)
+
+
+# Um semáforo por event loop e engine, dividido entre todas as requisições do worker.
+_fan_out: dict[tuple[asyncio.AbstractEventLoop, object], asyncio.Semaphore] = {}
+
+
+def _fan_out_semaphore(engine) -> asyncio.Semaphore:
+    key = (asyncio.get_running_loop(), engine)
+    semaphore = _fan_out.get(key)
+    if semaphore is None:
+        semaphore = _fan_out[key] = asyncio.Semaphore(_fan_out_limit(engine))
+    return semaphore
+
+
+async def _release(db):
+    """Devolve ao pool a conexão que a sessão da requisição segura (a da autenticação, por exemplo)."""
+    if isinstance(db, AsyncSession):
+        await db.rollback()
+    else:
+        await run_in_threadpool(db.rollback)
+
+
+async def _render_consistent(db, reports: list[Report]) -> list[bytes]:
+    """Todos os relatórios numa conexão própria, aberta já com o isolamento pedido.
+
+    Na sessão da requisição o isolamento não pegaria: ela pode já estar com uma transação aberta.
+    """
+    if isinstance(db, AsyncSession):
+        async with db.bind.connect() as conn:
+            if conn.dialect.name == "postgresql":
+                await conn.execution_options(**CONSISTENT_OPTIONS)
+            async with AsyncSessionLocal(bind=conn, info=_session_info(db)) as session:
+                return await session.run_sync(lambda sync_session: _render_all(reports, sync_session))
+
+    def run():
+        with db.get_bind().connect() as conn:
+            if conn.dialect.name == "postgresql":
+                conn.execution_options(**CONSISTENT_OPTIONS)
+            with SessionLocal(bind=conn, info=_session_info(db)) as session:
+                return _render_all(reports, session)
+
+    return await run_in_threadpool(run)
+
+
+async def _render_isolated(db, report: Report) -> bytes:
+    """Roda o relatório numa sessão própria, com o mesmo engine da sessão da requisição."""
+    if isinstance(db, AsyncSession):
+        async with AsyncSessionLocal(bind=db.bind, info=_session_info(db)) as session:
+            return await session.run_sync(lambda sync_session: _render(report, sync_session))
+
+    def run():
+        with SessionLocal(bind=db.get_bind(), info=_session_info(db)) as session:
+            return _render(report, session)
+
+    return await run_in_threadpool(run)
+
+
+async def _render_missing(db, reports: list[Report], consistente: bool) -> list[bytes]:
+    if not consistente and (DASHBOARD_CONCURRENCY <= 1 or len(reports) == 1):
+        return await run_db(db, lambda session: _render_all(reports, session))
+    # Sem isso cada requisição seguraria uma conexão parada enquanto espera pelas outras.
+    await _release(db)
+    if consistente:
+        return await _render_consistent(db, reports)
+    per_request = asyncio.Semaphore(DASHBOARD_CONCURRENCY)
+    shared = _fan_out_semaphore(db.bind if isinstance(db, AsyncSession) else db.get_bind())
+
+    async def render(report):
+        async with per_request, shared:
+            return await _render_isolated(db, report)
+
+    return await asyncio.gather(*(render(report) for report in reports))
+
+
+async def dashboard_response(request: Request, db, reports: dict[str, Report], consistente: bool = False) -> Response:
+    tags = tuple(dict.fromkeys(tag for report in reports.values() for tag in report.tags))
+    etag = version_etag(_cache_key(request), response_cache.generation(tags))
+    if _etag_matches(request, etag):
+        return not_modified(etag)
+
+    bodies, missing = {}, []
+    for name, report in reports.items():
+        entry = None if consistente else response_cache.get(_key(name))
+        if entry is not None:
+            bodies[name] = entry
+        else:
+            missing.append(name)
+
+    lagging = False
+    if missing:
+        generations = {name: response_cache.generation(reports[name].tags) for name in missing}
+        rendered = await _render_missing(db, [reports[name] for name in missing], consistente)
+        for name, body in zip(missing, rendered):
+            entry = CachedResponse(
+                body=body,
+                etag=content_etag(body),
+                media_type="application/json",
+                expires_at=time.time() + RESPONSE_CACHE_TTL_SECONDS,
+            )
+            if replica_may_lag(db, reports[name].tags):
+                lagging = True
+            else:
+                response_cache.set(_key(name), entry, reports[name].tags, generations[name])
+            bodies[name] = entry
+
+    if lagging:
+        # Algum relatório veio de uma réplica atrasada: o ETag da geração não vale para este corpo.
+        etag = content_etag("".join(name + bodies[name].etag for name in reports).encode())
+    headers = {"ETag": etag, "X-Cache": "HIT" if not missing else ("MISS" if len(missing) == len(reports) else "PARTIAL")}
+    if _etag_matches(request, etag):
+        return Response(status_code=304, headers=headers)
+    # Uma única junção: com relatórios de vários MB, cada cópia intermediária pesa.
+    parts = []
+    for name in reports:
+        parts += [b"," if parts else b"{", dumps(name), b":", bodies[name].body]
+    return Response(content=b"".join(parts + [b"}"]), media_type="application/json", headers=headers)
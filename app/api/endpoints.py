@@ -1,277 +1,367 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+import os
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, status
 from sqlalchemy.orm import Session
-from sqlalchemy import select, update, func, text
+from sqlalchemy import select
 from typing import List, Dict
 from app.api import models as api_models
+from app.api import aggregates, analytics, bulk, dashboard, search, series, writes
+from app.api.cache import cached_response, conditional_response, invalidates
 from app.api import schemas as api_schemas
+from app.api.export import FORMAT_PATTERN, stream_export
+from app.api.pagination import DEFAULT_LIMIT, MAX_LIMIT, list_tags, paginate
+from app.api.responses import rows_as_dicts
+from app.api.writebehind import avaliacoes_queue
 from app.auth.endpoints import get_current_user
 from app.auth.models import User
-from database import get_db 
+from database import get_db, run_db, session_endpoint, statement_timeout
+
+# Relatórios que varrem tabelas inteiras: um comando lento responde 503 em vez de prender a conexão.
+REPORT_TIMEOUT_SECONDS = float(os.environ.get("REPORT_STATEMENT_TIMEOUT_SECONDS", "15"))
 
 router = APIRouter()
 
 @router.get("/empresas/")
-def read_empresas(db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
-    stmt = select(api_models.Empresas)
-    empresas = db.execute(stmt).scalars().all()
-    return empresas
+@conditional_response(list_tags(api_models.Empresas))
+@session_endpoint
+def read_empresas(cursor: str | None = None, limit: int = Query(DEFAULT_LIMIT, ge=1, le=MAX_LIMIT), fields: str | None = None, format: str = Query("json", pattern=FORMAT_PATTERN), expand: str | None = None, db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
+    return paginate(db, api_models.Empresas, cursor, limit, fields, format, expand)
 
 @router.get("/faturamento/")
-def read_faturamento(db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
-    stmt = select(api_models.Faturamento)
-    faturamento = db.execute(stmt).scalars().all()
-    return faturamento
+@conditional_response(list_tags(api_models.Faturamento))
+@session_endpoint
+def read_faturamento(cursor: str | None = None, limit: int = Query(DEFAULT_LIMIT, ge=1, le=MAX_LIMIT), fields: str | None = None, format: str = Query("json", pattern=FORMAT_PATTERN), expand: str | None = None, db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
+    return paginate(db, api_models.Faturamento, cursor, limit, fields, format, expand)
 
 @router.get("/produtos/")
-def read_produtos(db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
-    stmt = select(api_models.ProdutosVendidos)
-    produtos = db.execute(stmt).scalars().all()
-    return produtos
+@conditional_response(list_tags(api_models.ProdutosVendidos))
+@session_endpoint
+def read_produtos(cursor: str | None = None, limit: int = Query(DEFAULT_LIMIT, ge=1, le=MAX_LIMIT), fields: str | None = None, format: str = Query("json", pattern=FORMAT_PATTERN), expand: str | None = None, db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
+    return paginate(db, api_models.ProdutosVendidos, cursor, limit, fields, format, expand)
 
 @router.get("/detalhes_produtos/")
-def read_detalhes_produtos(db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
-    stmt = select(api_models.DetalhesProdutos)
-    detalhes_produtos = db.execute(stmt).scalars().all()
-    return detalhes_produtos
+@conditional_response(list_tags(api_models.DetalhesProdutos))
+@session_endpoint
+def read_detalhes_produtos(cursor: str | None = None, limit: int = Query(DEFAULT_LIMIT, ge=1, le=MAX_LIMIT), fields: str | None = None, format: str = Query("json", pattern=FORMAT_PATTERN), expand: str | None = None, db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
+    return paginate(db, api_models.DetalhesProdutos, cursor, limit, fields, format, expand)
 
 @router.get("/avaliacoes/")
-def read_avaliacoes(db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
-    stmt = select(api_models.AvaliacoesDiretorEmpresa)
-    avaliacoes = db.execute(stmt).scalars().all()
-    return avaliacoes
+@conditional_response(list_tags(api_models.AvaliacoesDiretorEmpresa))
+@session_endpoint
+def read_avaliacoes(cursor: str | None = None, limit: int = Query(DEFAULT_LIMIT, ge=1, le=MAX_LIMIT), fields: str | None = None, format: str = Query("json", pattern=FORMAT_PATTERN), expand: str | None = None, db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
+    return paginate(db, api_models.AvaliacoesDiretorEmpresa, cursor, limit, fields, format, expand)
 
 @router.post("/empresas/", response_model=api_schemas.Empresas)
+@invalidates("empresas")
+@session_endpoint
 def create_empresa(empresa: api_schemas.EmpresasBase, db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
     if not empresa.nome_empresa.strip() or not empresa.diretor_empresa.strip():
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Campos não podem ser vazios.")
     
-    db_empresa = api_models.Empresas(**empresa.model_dump())
-    db.add(db_empresa)
+    db_empresa = writes.insert_returning(db, api_models.Empresas, empresa.model_dump())
+    aggregates.create_resumo(db, db_empresa.id_empresa)
     db.commit()
-    db.refresh(db_empresa)
     return db_empresa
 
 @router.post("/detalhes_produtos/", response_model=api_schemas.DetalhesProdutos)
+@invalidates("detalhes_produtos")
+@session_endpoint
 def create_detalhes_produtos(detalhes_produtos: api_schemas.DetalhesProdutosCreate, db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
-    db_detalhes_produtos = api_models.DetalhesProdutos(**detalhes_produtos.model_dump())
-    db.add(db_detalhes_produtos)
+    db_detalhes_produtos = writes.insert_returning(db, api_models.DetalhesProdutos, detalhes_produtos.model_dump(), f"Empresa com ID {detalhes_produtos.id_empresa} não encontrada.")
+    aggregates.refresh_empresas(db, [db_detalhes_produtos.id_empresa], ["detalhes_produtos"])
     db.commit()
-    db.refresh(db_detalhes_produtos)
     return db_detalhes_produtos
 
-@router.post("/avaliacoes/", response_model=api_schemas.AvaliacoesDiretorEmpresa)
-def create_avaliacao(avaliacao: api_schemas.AvaliacoesDiretorEmpresaCreate, db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
-
-    empresa_existe = db.query(api_models.Empresas).filter(api_models.Empresas.id_empresa == avaliacao.id_empresa).first()
-    if not empresa_existe:
-        raise HTTPException(status_code=404, detail=f"Empresa com ID {avaliacao.id_empresa} não encontrada.")
-
-    db_avaliacao = api_models.AvaliacoesDiretorEmpresa(**avaliacao.model_dump())
-    db.add(db_avaliacao)
+@router.post("/avaliacoes/", response_model=api_schemas.AvaliacoesDiretorEmpresa, responses={202: {"description": "Avaliação enfileirada (AVALIACOES_WRITE_BEHIND=1)."}})
+async def create_avaliacao(avaliacao: api_schemas.AvaliacoesDiretorEmpresaCreate, db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
+    if avaliacoes_queue.enabled:
+        return avaliacoes_queue.accept(avaliacao.model_dump())
+    return await _insert_avaliacao(avaliacao, db=db)
+
+@invalidates("avaliacoes")
+@session_endpoint
+def _insert_avaliacao(avaliacao: api_schemas.AvaliacoesDiretorEmpresaCreate, db: Session):
+    db_avaliacao = writes.insert_returning(db, api_models.AvaliacoesDiretorEmpresa, avaliacao.model_dump(), f"Empresa com ID {avaliacao.id_empresa} não encontrada.")
+    aggregates.add_avaliacao(db, db_avaliacao)
     db.commit()
-    db.refresh(db_avaliacao)
     return db_avaliacao
 
 @router.put("/empresas/{id_empresa}", response_model=api_schemas.EmpresasBase)
+@invalidates("empresas")
+@session_endpoint
 def update_empresa(id_empresa: int, empresa_data: api_schemas.EmpresasBase, db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
-    stmt = update(api_models.Empresas).where(api_models.Empresas.id_empresa == id_empresa).values(empresa_data.model_dump())
-    result = db.execute(stmt)
-    if result.rowcount == 0:
-        raise HTTPException(status_code=404, detail="Empresa não encontrada")
-    
+    db_empresa = writes.update_returning(db, api_models.Empresas, id_empresa, empresa_data.model_dump(), "Empresa não encontrada")
     db.commit()
-    db_empresa = db.query(api_models.Empresas).filter(api_models.Empresas.id_empresa == id_empresa).first()
     return db_empresa
 
 @router.put("/detalhes_produtos/{id_produto}")
+@invalidates("detalhes_produtos")
+@session_endpoint
 def update_detalhes_produtos(id_produto: int, produto_data: api_schemas.DetalhesProdutosUpdate, db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
-    db_produto = db.query(api_models.DetalhesProdutos).filter(api_models.DetalhesProdutos.id_produto == id_produto).first()
-    if not db_produto:
-        raise HTTPException(status_code=404, detail="Detalhes do produto não encontrados.")
-    
     update_data = produto_data.model_dump(exclude_unset=True)
-    for key, value in update_data.items():
-        setattr(db_produto, key, value)
-        
+    empresas_afetadas = []
+    if "id_empresa" in update_data:
+        empresas_afetadas = list(db.execute(select(api_models.DetalhesProdutos.id_empresa).where(api_models.DetalhesProdutos.id_produto == id_produto)).scalars())
+
+    db_produto = writes.update_returning(db, api_models.DetalhesProdutos, id_produto, update_data, "Detalhes do produto não encontrados.", f"Empresa com ID {update_data.get('id_empresa')} não encontrada.")
+    aggregates.refresh_empresas(db, empresas_afetadas + [db_produto.id_empresa], ["detalhes_produtos"])
     db.commit()
-    db.refresh(db_produto)
     return db_produto
 
 @router.put("/avaliacoes/{id_avaliacao}")
+@invalidates("avaliacoes")
+@session_endpoint
 def update_avaliacoes(id_avaliacao: int, avaliacao_data: api_schemas.AvaliacoesDiretorEmpresaUpdate, db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
 
-    db_avaliacao = db.query(api_models.AvaliacoesDiretorEmpresa).filter(api_models.AvaliacoesDiretorEmpresa.id_avaliacao == id_avaliacao).first()
-    if not db_avaliacao:
-        raise HTTPException(status_code=404, detail="Avaliação não encontrada.")
-    
     update_data = avaliacao_data.model_dump(exclude_unset=True)
-    for key, value in update_data.items():
-        setattr(db_avaliacao, key, value)
-        
+    db_avaliacao = writes.update_returning(db, api_models.AvaliacoesDiretorEmpresa, id_avaliacao, update_data, "Avaliação não encontrada.")
+    aggregates.refresh_empresas(db, [db_avaliacao.id_empresa], ["avaliacoes"])
     db.commit()
-    db.refresh(db_avaliacao)
     return db_avaliacao
 
+def piores_diretores_stmt(n: int = 4):
+    return select(api_models.Empresas.diretor_empresa, api_models.Faturamento.faturamento_anual).join(api_models.Faturamento, api_models.Empresas.id_empresa== api_models.Faturamento.id_empresa).where(api_models.Faturamento.faturamento_anual.is_not(None)).order_by(api_models.Faturamento.faturamento_anual.asc(), api_models.Faturamento.id_faturamento).limit(n)
+
+def melhores_diretores_stmt(n: int = 4):
+    return select(api_models.Empresas.diretor_empresa, api_models.Faturamento.faturamento_anual).join(api_models.Faturamento, api_models.Empresas.id_empresa== api_models.Faturamento.id_empresa).where(api_models.Faturamento.faturamento_anual.is_not(None)).order_by(api_models.Faturamento.faturamento_anual.desc(), api_models.Faturamento.id_faturamento).limit(n)
+
+def _ranking_diretores(db: Session, n: int, descending: bool):
+    if analytics.available():
+        return analytics.ranking(analytics.report_frame.get(db), n, descending)
+    stmt = melhores_diretores_stmt(n) if descending else piores_diretores_stmt(n)
+    return rows_as_dicts(db.execute(stmt), ["diretor_empresa", "faturamento_anual"])
+
+def _report_frame(db: Session):
+    if not analytics.available():
+        raise HTTPException(status_code=status.HTTP_501_NOT_IMPLEMENTED, detail="Relatório indisponível: numpy não está instalado.")
+    return analytics.report_frame.get(db)
+
+def faturamento_por_produto_stmt():
+    return select(api_models.ProdutosVendidos.nome_produto, api_models.Empresas.nome_empresa).join(api_models.Faturamento,api_models.ProdutosVendidos.id_faturamento== api_models.Faturamento.id_faturamento).join(api_models.Empresas, api_models.Empresas.id_empresa==api_models.Faturamento.id_empresa).order_by(api_models.ProdutosVendidos.produtos_vendidos.asc())
 
 @router.get("/pioresdiretores/")
-def get_piores(db:Session= Depends(get_db), current_user: User = Depends(get_current_user)):
-    stmt= select(api_models.Empresas.diretor_empresa, api_models.Faturamento.faturamento_anual).join(api_models.Faturamento, api_models.Empresas.id_empresa== api_models.Faturamento.id_empresa).order_by(api_models.Faturamento.faturamento_anual.asc()).limit(4)
-    piores = db.execute(stmt).all()
-    
-    piores_list = []
-    for diretor, faturamento in piores:
-        piores_list.append({"diretor_empresa": diretor, "faturamento_anual": faturamento})
-    return piores_list
+@cached_response("empresas", "faturamento")
+@session_endpoint
+def get_piores(n: int = Query(4, ge=1, le=1000), db:Session= Depends(get_db), current_user: User = Depends(get_current_user)):
+    return _ranking_diretores(db, n, descending=False)
 
 @router.get("/faturamento_por_produto")
-def get_empresa_produtos(db:Session=Depends(get_db), current_user: User = Depends(get_current_user)):
-    stmt = select(api_models.ProdutosVendidos.nome_produto, api_models.Empresas.nome_empresa).join(api_models.Faturamento,api_models.ProdutosVendidos.id_faturamento== api_models.Faturamento.id_faturamento).join(api_models.Empresas, api_models.Empresas.id_empresa==api_models.Faturamento.id_empresa).order_by(api_models.ProdutosVendidos.produtos_vendidos.asc())
-    vendas= db.execute(stmt).all()
-    vendas_lista = []
-    for produto, empresa in vendas:
-       vendas_lista.append({"nome_produto": produto,"nome_empresa": empresa})
-    return vendas_lista
+@cached_response("empresas", "faturamento", "produtos_vendidos")
+@statement_timeout(REPORT_TIMEOUT_SECONDS)
+@session_endpoint
+def get_empresa_produtos(format: str = Query("json", pattern=FORMAT_PATTERN), db:Session=Depends(get_db), current_user: User = Depends(get_current_user)):
+    stmt = faturamento_por_produto_stmt()
+    if format != "json":
+        return stream_export(db, stmt, ["nome_produto", "nome_empresa"], format, "faturamento_por_produto")
+    return rows_as_dicts(db.execute(stmt), ["nome_produto", "nome_empresa"])
 
 @router.get("/insights/")
+@cached_response("empresas", "faturamento", "avaliacoes")
+@statement_timeout(REPORT_TIMEOUT_SECONDS)
+@session_endpoint
 def get_insights(db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
-    stmt = (
-        select(
-            api_models.Empresas.nome_empresa,
-            func.sum(api_models.Faturamento.faturamento_anual).label("faturamento_total_anual"),
-            func.avg(api_models.AvaliacoesDiretorEmpresa.nota_geral_empresa).label("media_nota_empresa")
-        )
-        .join(api_models.Faturamento)
-        .join(api_models.AvaliacoesDiretorEmpresa)
-        .group_by(api_models.Empresas.nome_empresa)
-    )
-    
-    insights = db.execute(stmt).all()
-    insights_list = []
-    for insight in insights:
-        insights_list.append(insight._asdict())
-    return insights_list
+    return aggregates.insights(db)
 
 @router.get("/insights/maior_lucro/")
+@cached_response("empresas", "faturamento", "produtos_vendidos", "detalhes_produtos")
+@statement_timeout(REPORT_TIMEOUT_SECONDS)
+@session_endpoint
 def get_maior_lucro(db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
-    query = (
-        select(
-            api_models.Empresas.diretor_empresa,
-            api_models.DetalhesProdutos.nome_produto,
-            api_models.Empresas.nome_empresa,
-            func.sum(api_models.Faturamento.faturamento_anual).label('faturamento_total'),
-            func.sum(api_models.ProdutosVendidos.produtos_vendidos).label('total_produtos_vendidos')
-        )
-        .join(api_models.Faturamento, api_models.Empresas.id_empresa == api_models.Faturamento.id_empresa)
-        .join(api_models.ProdutosVendidos, api_models.Faturamento.id_faturamento == api_models.ProdutosVendidos.id_faturamento)
-        .join(api_models.DetalhesProdutos, api_models.Empresas.id_empresa == api_models.DetalhesProdutos.id_empresa)
-        .group_by(api_models.Empresas.diretor_empresa, api_models.Empresas.nome_empresa, api_models.DetalhesProdutos.nome_produto)
-        .order_by(text('faturamento_total desc'))
-    )
-    
-    results = db.execute(query).all()
-    melhores = []
-    for row in results:
-        melhores.append(row._asdict())
-
-    return melhores
+    return aggregates.maior_lucro(db)
 
 @router.get("/melhoresdiretores/")
-def get_piores(db:Session= Depends(get_db), current_user: User = Depends(get_current_user)):
-    stmt= select(api_models.Empresas.diretor_empresa, api_models.Faturamento.faturamento_anual).join(api_models.Faturamento, api_models.Empresas.id_empresa== api_models.Faturamento.id_empresa).limit(4)
-    melhores = db.execute(stmt).all()
-    
-    melhores_list = []
-    for diretor, faturamento in melhores:
-        melhores_list.append({"diretor_empresa": diretor, "faturamento_anual": faturamento})
-    return melhores_list
+@cached_response("empresas", "faturamento")
+@session_endpoint
+def get_melhores(n: int = Query(4, ge=1, le=1000), db:Session= Depends(get_db), current_user: User = Depends(get_current_user)):
+    return _ranking_diretores(db, n, descending=True)
+
+@router.get("/analytics/percentis/")
+@cached_response("faturamento")
+@statement_timeout(REPORT_TIMEOUT_SECONDS)
+@session_endpoint
+def get_percentis(coluna: str = Query("faturamento_anual", pattern=analytics.COLUNA_PATTERN), p: List[float] = Query([25, 50, 75, 90, 99]), db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
+    # Comparação positiva: NaN falha nas duas pontas e não chega ao np.percentile.
+    if not all(0 <= value <= 100 for value in p):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Percentis devem estar entre 0 e 100.")
+    return analytics.percentis(_report_frame(db), coluna, p)
+
+@router.get("/analytics/zscores/")
+@cached_response("empresas", "faturamento")
+@statement_timeout(REPORT_TIMEOUT_SECONDS)
+@session_endpoint
+def get_zscores(coluna: str = Query("faturamento_anual", pattern=analytics.COLUNA_PATTERN), limite: float = Query(3.0, ge=0), n: int = Query(100, ge=1, le=MAX_LIMIT), db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
+    return analytics.zscores(_report_frame(db), coluna, limite, n)
+
+@router.get("/analytics/correlacoes/")
+@cached_response("empresas", "faturamento", "avaliacoes")
+@statement_timeout(REPORT_TIMEOUT_SECONDS)
+@session_endpoint
+def get_correlacoes(db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
+    return analytics.correlacoes(_report_frame(db))
 
 
 @router.post("/faturamento/", response_model=api_schemas.Faturamento)
-def create_faturamento(faturamento: api_schemas.FaturamentoBase, db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
-    empresa_existe = db.query(api_models.Empresas).filter(api_models.Empresas.id_empresa == faturamento.id_empresa).first()
-    if not empresa_existe:
-        raise HTTPException(status_code=404, detail=f"Empresa com ID {faturamento.id_empresa} não encontrada.")
-    
-    db_faturamento = api_models.Faturamento(**faturamento.model_dump())
-    db.add(db_faturamento)
+@invalidates("faturamento")
+@session_endpoint
+def create_faturamento(faturamento: api_schemas.FaturamentoCreate, db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
+    db_faturamento = writes.insert_returning(db, api_models.Faturamento, faturamento.model_dump(), f"Empresa com ID {faturamento.id_empresa} não encontrada.")
+    aggregates.add_faturamento(db, db_faturamento)
     db.commit()
-    db.refresh(db_faturamento)
+    analytics.report_frame.notify_faturamento([db_faturamento.id_faturamento])
     return db_faturamento
 
 @router.post("/produtos_vendidos/", response_model=api_schemas.ProdutosVendidos)
-def create_produtos_vendidos(produto_vendido: api_schemas.ProdutosVendidosBase, db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
-    faturamento_existe = db.query(api_models.Faturamento).filter(api_models.Faturamento.id_faturamento == produto_vendido.id_faturamento).first()
-    if not faturamento_existe:
-        raise HTTPException(status_code=404, detail=f"Faturamento com ID {produto_vendido.id_faturamento} não encontrado.")
-
-    db_produto = api_models.ProdutosVendidos(**produto_vendido.model_dump())
-    db.add(db_produto)
+@invalidates("produtos_vendidos")
+@session_endpoint
+def create_produtos_vendidos(produto_vendido: api_schemas.ProdutosVendidosCreate, db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
+    db_produto = writes.insert_returning(db, api_models.ProdutosVendidos, produto_vendido.model_dump(), f"Faturamento com ID {produto_vendido.id_faturamento} não encontrado.")
+    aggregates.refresh_empresas(db, aggregates.empresas_de_faturamentos([db_produto.id_faturamento]), ["produtos_vendidos"])
     db.commit()
-    db.refresh(db_produto)
     return db_produto
 
-
 @router.put("/faturamento/{id_faturamento}", response_model=api_schemas.FaturamentoBase)
+@invalidates("faturamento")
+@session_endpoint
 def update_faturamento(id_faturamento: int, faturamento_data: api_schemas.FaturamentoUpdate, db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
-    db_faturamento = db.query(api_models.Faturamento).filter(api_models.Faturamento.id_faturamento == id_faturamento).first()
-    if not db_faturamento:
-        raise HTTPException(status_code=404, detail="Faturamento não encontrado.")
-    
     update_data = faturamento_data.model_dump(exclude_unset=True)
+    empresas_afetadas = []
     if "id_empresa" in update_data:
-        empresa_existe = db.query(api_models.Empresas).filter(api_models.Empresas.id_empresa == update_data["id_empresa"]).first()
-        if not empresa_existe:
-            raise HTTPException(status_code=404, detail=f"Empresa com ID {update_data['id_empresa']} não encontrada.")
-    
-    for key, value in update_data.items():
-        setattr(db_faturamento, key, value)
-    
+        empresas_afetadas = list(db.execute(select(api_models.Faturamento.id_empresa).where(api_models.Faturamento.id_faturamento == id_faturamento)).scalars())
+
+    db_faturamento = writes.update_returning(db, api_models.Faturamento, id_faturamento, update_data, "Faturamento não encontrado.", f"Empresa com ID {update_data.get('id_empresa')} não encontrada.")
+    aggregates.refresh_empresas(db, empresas_afetadas + [db_faturamento.id_empresa], ["faturamento"])
     db.commit()
-    db.refresh(db_faturamento)
+    analytics.report_frame.notify_faturamento([id_faturamento])
     return db_faturamento
     
 
 @router.put("/produtos_vendidos/{id_venda}", response_model=api_schemas.ProdutosVendidos)
+@invalidates("produtos_vendidos")
+@session_endpoint
 def update_produtos_vendidos(id_venda: int, produto_data: api_schemas.ProdutosVendidosUpdate, db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
-    db_produto = db.query(api_models.ProdutosVendidos).filter(api_models.ProdutosVendidos.id_venda == id_venda).first()
-    if not db_produto:
-        raise HTTPException(status_code=404, detail="Venda de produto não encontrada.")
-    
     update_data = produto_data.model_dump(exclude_unset=True)
+    faturamentos_afetados = []
     if "id_faturamento" in update_data:
-        faturamento_existe = db.query(api_models.Faturamento).filter(api_models.Faturamento.id_faturamento == update_data["id_faturamento"]).first()
-        if not faturamento_existe:
-            raise HTTPException(status_code=404, detail=f"Faturamento com ID {update_data['id_faturamento']} não encontrado.")
-    
-    for key, value in update_data.items():
-        setattr(db_produto, key, value)
-    
+        faturamentos_afetados = list(db.execute(select(api_models.ProdutosVendidos.id_faturamento).where(api_models.ProdutosVendidos.id_venda == id_venda)).scalars())
+
+    db_produto = writes.update_returning(db, api_models.ProdutosVendidos, id_venda, update_data, "Venda de produto não encontrada.", f"Faturamento com ID {update_data.get('id_faturamento')} não encontrado.")
+    faturamentos_afetados.append(db_produto.id_faturamento)
+    aggregates.refresh_empresas(db, aggregates.empresas_de_faturamentos(faturamentos_afetados), ["produtos_vendidos"])
     db.commit()
-    db.refresh(db_produto)
     return db_produto
 
 @router.get("/produtos_vendidos/")
-def read_produtos_vendidos(db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
-    stmt = select(api_models.ProdutosVendidos)
-    produtos = db.execute(stmt).scalars().all()
-    return produtos
+@conditional_response(list_tags(api_models.ProdutosVendidos))
+@session_endpoint
+def read_produtos_vendidos(cursor: str | None = None, limit: int = Query(DEFAULT_LIMIT, ge=1, le=MAX_LIMIT), fields: str | None = None, format: str = Query("json", pattern=FORMAT_PATTERN), expand: str | None = None, db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
+    return paginate(db, api_models.ProdutosVendidos, cursor, limit, fields, format, expand)
+
 
+def faturamento_mensal_por_empresa_stmt():
+    return select(api_models.Empresas.nome_empresa, api_models.Faturamento.faturamento_mensal).join(api_models.Faturamento)
 
 @router.get("/faturamento_mensal_por_empresa/")
-def get_faturamento_mensal(db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
-    stmt = select(api_models.Empresas.nome_empresa, api_models.Faturamento.faturamento_mensal).join(api_models.Faturamento)
-    faturamento_mensal = db.execute(stmt).all()
-    faturamento_mensal_list = []
-    for empresa, faturamento in faturamento_mensal:
-        faturamento_mensal_list.append({"nome_empresa": empresa, "faturamento_mensal": faturamento})
-    return faturamento_mensal_list
+@cached_response("empresas", "faturamento")
+@statement_timeout(REPORT_TIMEOUT_SECONDS)
+@session_endpoint
+def get_faturamento_mensal(format: str = Query("json", pattern=FORMAT_PATTERN), db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
+    stmt = faturamento_mensal_por_empresa_stmt()
+    if format != "json":
+        return stream_export(db, stmt, ["nome_empresa", "faturamento_mensal"], format, "faturamento_mensal_por_empresa")
+    return rows_as_dicts(db.execute(stmt), ["nome_empresa", "faturamento_mensal"])
+
+
+@router.get("/faturamento/mensal/")
+@cached_response("empresas", "faturamento")
+@statement_timeout(REPORT_TIMEOUT_SECONDS)
+@session_endpoint
+def get_faturamento_mensal_periodo(de: str = Query(..., pattern=series.PERIODO_PATTERN), ate: str = Query(..., pattern=series.PERIODO_PATTERN), id_empresa: int | None = None, db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
+    inicio, fim = series.parse_periodos(de, ate)
+    return rows_as_dicts(db.execute(series.faturamento_mensal_stmt(inicio, fim, id_empresa)), series.FATURAMENTO_MENSAL_KEYS)
+
+
+@router.get("/faturamento/acumulado_12m/")
+@cached_response("empresas", "faturamento")
+@statement_timeout(REPORT_TIMEOUT_SECONDS)
+@session_endpoint
+def get_faturamento_acumulado_12m(de: str = Query(..., pattern=series.PERIODO_PATTERN), ate: str = Query(..., pattern=series.PERIODO_PATTERN), id_empresa: int | None = None, db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
+    inicio, fim = series.parse_periodos(de, ate)
+    return rows_as_dicts(db.execute(series.acumulado_12m_stmt(inicio, fim, id_empresa)), series.ACUMULADO_12M_KEYS)
+
+
+@router.get("/produtos_vendidos/mensal/")
+@cached_response("empresas", "faturamento", "produtos_vendidos")
+@statement_timeout(REPORT_TIMEOUT_SECONDS)
+@session_endpoint
+def get_produtos_vendidos_mensal(de: str = Query(..., pattern=series.PERIODO_PATTERN), ate: str = Query(..., pattern=series.PERIODO_PATTERN), id_empresa: int | None = None, db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
+    inicio, fim = series.parse_periodos(de, ate)
+    return rows_as_dicts(db.execute(series.produtos_vendidos_mensal_stmt(inicio, fim, id_empresa)), series.PRODUTOS_VENDIDOS_MENSAL_KEYS)
 
 
 @router.get("/media_notas_diretor/")
+@cached_response("empresas", "avaliacoes")
+@statement_timeout(REPORT_TIMEOUT_SECONDS)
+@session_endpoint
 def get_media_notas_diretor(db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
-    stmt = select(api_models.Empresas.diretor_empresa, func.avg(api_models.AvaliacoesDiretorEmpresa.nota_diretor).label("media_nota")).join(api_models.AvaliacoesDiretorEmpresa).group_by(api_models.Empresas.diretor_empresa)
-    notas = db.execute(stmt).all()
-    notas_list = []
-    for diretor, media in notas:
-        notas_list.append({"diretor_empresa": diretor, "media_nota": media})
-    return notas_list
\ No newline at end of file
+    return aggregates.media_notas_diretor(db)
+
+
+@router.get("/busca/empresas/")
+@session_endpoint
+def search_empresas(q: str = Query(..., min_length=1, max_length=200), cursor: str | None = None, limit: int = Query(20, ge=1, le=MAX_LIMIT), db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
+    return search.search(db, search.EMPRESAS, q, cursor, limit)
+
+
+@router.get("/busca/produtos/")
+@session_endpoint
+def search_produtos(q: str = Query(..., min_length=1, max_length=200), cursor: str | None = None, limit: int = Query(20, ge=1, le=MAX_LIMIT), db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
+    return search.search(db, search.PRODUTOS, q, cursor, limit)
+
+
+@router.post("/faturamento/bulk", response_model=api_schemas.BulkResult)
+@invalidates("faturamento")
+async def bulk_faturamento(request: Request, on_conflict: str = Query("error", pattern=bulk.CONFLICT_PATTERN), db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
+    rows = await bulk.read_rows(request)
+    result = await run_db(db, bulk.bulk_insert, bulk.FATURAMENTO, rows, on_conflict)
+    analytics.report_frame.notify_faturamento(item["id"] for item in result["itens"] if item["status"] in ("criado", "atualizado"))
+    return result
+
+@router.post("/produtos_vendidos/bulk", response_model=api_schemas.BulkResult)
+@invalidates("produtos_vendidos")
+async def bulk_produtos_vendidos(request: Request, on_conflict: str = Query("error", pattern=bulk.CONFLICT_PATTERN), db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
+    rows = await bulk.read_rows(request)
+    return await run_db(db, bulk.bulk_insert, bulk.PRODUTOS_VENDIDOS, rows, on_conflict)
+
+@router.post("/detalhes_produtos/bulk", response_model=api_schemas.BulkResult)
+@invalidates("detalhes_produtos")
+async def bulk_detalhes_produtos(request: Request, on_conflict: str = Query("error", pattern=bulk.CONFLICT_PATTERN), db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
+    rows = await bulk.read_rows(request)
+    return await run_db(db, bulk.bulk_insert, bulk.DETALHES_PRODUTOS, rows, on_conflict)
+
+@router.post("/avaliacoes/bulk", response_model=api_schemas.BulkResult)
+@invalidates("avaliacoes")
+async def bulk_avaliacoes(request: Request, on_conflict: str = Query("error", pattern=bulk.CONFLICT_PATTERN), db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
+    rows = await bulk.read_rows(request)
+    return await run_db(db, bulk.bulk_insert, bulk.AVALIACOES, rows, on_conflict)
+
+
+DASHBOARD_REPORTS = {
+    "insights": dashboard.Report(("empresas", "faturamento", "avaliacoes"), aggregates.insights),
+    "maior_lucro": dashboard.Report(("empresas", "faturamento", "produtos_vendidos", "detalhes_produtos"), aggregates.maior_lucro),
+    "media_notas_diretor": dashboard.Report(("empresas", "avaliacoes"), aggregates.media_notas_diretor),
+    "pioresdiretores": dashboard.Report(("empresas", "faturamento"), lambda db: _ranking_diretores(db, 4, descending=False)),
+    "melhoresdiretores": dashboard.Report(("empresas", "faturamento"), lambda db: _ranking_diretores(db, 4, descending=True)),
+    "faturamento_mensal_por_empresa": dashboard.Report(("empresas", "faturamento"), lambda db: rows_as_dicts(db.execute(faturamento_mensal_por_empresa_stmt()), ["nome_empresa", "faturamento_mensal"])),
+    "faturamento_por_produto": dashboard.Report(("empresas", "faturamento", "produtos_vendidos"), lambda db: rows_as_dicts(db.execute(faturamento_por_produto_stmt()), ["nome_produto", "nome_empresa"])),
+}
+if analytics.available():
+    DASHBOARD_REPORTS["correlacoes"] = dashboard.Report(("empresas", "faturamento", "avaliacoes"), lambda db: analytics.correlacoes(analytics.report_frame.get(db)))
+
+
+@router.get("/dashboard/")
+@statement_timeout(REPORT_TIMEOUT_SECONDS)
+async def get_dashboard(request: Request, relatorios: List[str] | None = Query(None), consistente: bool = False, db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
+    nomes = list(dict.fromkeys(relatorios or DASHBOARD_REPORTS))
+    desconhecidos = [nome for nome in nomes if nome not in DASHBOARD_REPORTS]
+    if desconhecidos:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"Relatórios desconhecidos: {', '.join(desconhecidos)}. Disponíveis: {', '.join(DASHBOARD_REPORTS)}.")
+    return await dashboard.dashboard_response(request, db, {nome: DASHBOARD_REPORTS[nome] for nome in nomes}, consistente)
@@ -0,0 +1,75 @@
+"""Relações aninhadas nas listagens (`?expand=faturamentos,faturamentos.produtos_vendidos`).
+
+Cada relação pedida custa um SELECT com `IN` sobre as chaves da página, o mesmo que o
+`selectinload` do ORM faria, só que sobre tuplas de linha como o resto das listagens. O número
+de comandos por requisição é 1 + o número de relações, qualquer que seja o tamanho da página.
+As relações vêm dos `relationship()` de `app/api/models.py`.
+"""
+from fastapi import HTTPException, status
+from sqlalchemy import select
+from app.api.responses import rows_as_dicts
+
+MAX_DEPTH = 3
+MAX_PATHS = 8
+
+
+def parse_expand(model, expand: str | None) -> dict:
+    """'a,a.b,c' → {'a': {'b': {}}, 'c': {}}, validando cada nome nas relações do modelo."""
+    tree = {}
+    paths = [path.strip() for path in (expand or "").split(",") if path.strip()]
+    if len(paths) > MAX_PATHS:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"No máximo {MAX_PATHS} relações em expand.")
+    for path in paths:
+        names = path.split(".")
+        if len(names) > MAX_DEPTH:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"Relação muito profunda em expand: {path}.")
+        current_model, node = model, tree
+        for name in names:
+            relationships = current_model.__mapper__.relationships
+            if name not in relationships:
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail=f"Relação inválida em expand: {path}. Disponíveis em {current_model.__tablename__}: {', '.join(relationships.keys())}.",
+                )
+            node = node.setdefault(name, {})
+            current_model = relationships[name].mapper.class_
+    return tree
+
+
+def _pair(model, name):
+    relationship = model.__mapper__.relationships[name]
+    local, remote = relationship.local_remote_pairs[0]
+    return relationship, local, remote
+
+
+def local_columns(model, tree: dict) -> list:
+    """Colunas do pai que as relações de `tree` usam como chave."""
+    return list(dict.fromkeys(_pair(model, name)[1] for name in tree))
+
+
+def attach(db, model, rows, items: list[dict], tree: dict):
+    """Acrescenta a `items` (um dict por linha de `rows`) os filhos de cada relação de `tree`."""
+    for name, subtree in tree.items():
+        relationship, local, remote = _pair(model, name)
+        target = relationship.mapper.class_
+        keys = [row._mapping[local] for row in rows]
+        wanted = {key for key in keys if key is not None}
+        children, child_rows = [], []
+        if wanted:
+            columns = list(target.__table__.columns)
+            pk = target.__mapper__.primary_key[0]
+            child_rows = db.execute(select(*columns).where(remote.in_(wanted)).order_by(pk)).all()
+            children = rows_as_dicts(child_rows, [column.key for column in columns])
+            if subtree:
+                attach(db, target, child_rows, children, subtree)
+
+        if relationship.uselist:
+            grouped = {}
+            for child_row, child in zip(child_rows, children):
+                grouped.setdefault(child_row._mapping[remote], []).append(child)
+            for key, item in zip(keys, items):
+                item[name] = grouped.get(key, [])
+        else:
+            by_key = {child_row._mapping[remote]: child for child_row, child in zip(child_rows, children)}
+            for key, item in zip(keys, items):
+                item[name] = by_key.get(key)
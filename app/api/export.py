@@ -0,0 +1,85 @@
+import csv
+import io
+import json
+from fastapi.responses import StreamingResponse
+from sqlalchemy.orm import Session
+
+EXPORT_FORMATS = ("json", "ndjson", "csv")
+FORMAT_PATTERN = "^(json|ndjson|csv)$"
+STREAM_BATCH_SIZE = 1000
+
+MEDIA_TYPES = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv; charset=utf-8",
+}
+
+
+class _Encoder:
+    def __init__(self, keys, export_format: str):
+        self.keys = keys
+        self.export_format = export_format
+        if export_format == "csv":
+            self.buffer = io.StringIO()
+            self.writer = csv.writer(self.buffer)
+
+    def _drain(self):
+        chunk = self.buffer.getvalue()
+        self.buffer.seek(0)
+        self.buffer.truncate()
+        return chunk
+
+    def header(self):
+        if self.export_format != "csv":
+            return ""
+        self.writer.writerow(self.keys)
+        return self._drain()
+
+    def chunk(self, partition):
+        rows = [tuple(row._mapping[key] for key in self.keys) for row in partition]
+        if self.export_format == "csv":
+            self.writer.writerows(rows)
+            return self._drain()
+        return "".join(
+            json.dumps(dict(zip(self.keys, row)), default=str, ensure_ascii=False) + "\n"
+            for row in rows
+        )
+
+
+def iter_export(db: Session, stmt, keys, export_format: str):
+    # stream_results abre um cursor no servidor (psycopg2) e yield_per busca as linhas
+    # em lotes, então a memória fica limitada ao tamanho do lote.
+    stmt = stmt.execution_options(stream_results=True, yield_per=STREAM_BATCH_SIZE)
+    encoder = _Encoder(keys, export_format)
+    result = db.execute(stmt)
+    try:
+        yield encoder.header()
+        for partition in result.partitions():
+            yield encoder.chunk(partition)
+    finally:
+        result.close()
+
+
+async def aiter_export(db, stmt, keys, export_format: str):
+    stmt = stmt.execution_options(yield_per=STREAM_BATCH_SIZE)
+    encoder = _Encoder(keys, export_format)
+    result = await db.stream(stmt)
+    try:
+        yield encoder.header()
+        async for partition in result.partitions():
+            yield encoder.chunk(partition)
+    finally:
+        await result.close()
+
+
+def stream_export(db: Session, stmt, keys, export_format: str, filename: str):
+    extension = "csv" if export_format == "csv" else "ndjson"
+    async_db = db.info.get("async_session")
+    if async_db is not None:
+        content = aiter_export(async_db, stmt, keys, export_format)
+    else:
+        content = iter_export(db, stmt, keys, export_format)
+    return StreamingResponse(
+        content,
+        media_type=MEDIA_TYPES[export_format],
+        headers={"Content-Disposition": f'attachment; filename="{filename}.{extension}"'},
+    )
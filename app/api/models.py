@@ -1,5 +1,5 @@
 from sqlalchemy.orm import relationship
-from sqlalchemy import Column, Integer, String, Float, ForeignKey, Date
+from sqlalchemy import Column, Integer, String, Float, ForeignKey, Date, Index
 from database import Base
 
 class Empresas(Base):
@@ -16,30 +16,48 @@ class Empresas(Base):
 
 class Faturamento(Base):
     __tablename__ = "faturamento"
-    __table_args__ = {'schema': 'public'}
+    __table_args__ = (
+        Index("ix_faturamento_empresa", "id_empresa", "faturamento_anual"),
+        Index("ix_faturamento_anual", "faturamento_anual", "id_empresa"),
+        Index("ix_faturamento_periodo", "ano", "mes", "id_empresa", "faturamento_mensal"),
+        Index("ix_faturamento_empresa_periodo", "id_empresa", "ano", "mes", "faturamento_mensal"),
+        {'schema': 'public'},
+    )
 
     id_faturamento = Column(Integer, primary_key=True)
     id_empresa = Column(Integer, ForeignKey('public.empresas.id_empresa'))
     faturamento_mensal = Column(Float)
     faturamento_anual = Column(Float)
+    ano = Column(Integer)
+    mes = Column(Integer)
 
     empresa = relationship("Empresas", back_populates="faturamentos")
     produtos_vendidos = relationship("ProdutosVendidos", back_populates="faturamento")
 
 class ProdutosVendidos(Base):
     __tablename__ = "produtos_vendidos"
-    __table_args__ = {'schema': 'public'}
+    __table_args__ = (
+        Index("ix_produtos_vendidos_faturamento", "id_faturamento", "produtos_vendidos"),
+        Index("ix_produtos_vendidos_quantidade", "produtos_vendidos", "id_faturamento", "nome_produto"),
+        Index("ix_produtos_vendidos_periodo", "ano", "mes", "id_faturamento", "produtos_vendidos"),
+        {'schema': 'public'},
+    )
 
     id_venda = Column(Integer, primary_key=True)
     id_faturamento = Column(Integer, ForeignKey('public.faturamento.id_faturamento'))
     nome_produto = Column(String)
     produtos_vendidos = Column(Integer)
+    ano = Column(Integer)
+    mes = Column(Integer)
 
     faturamento = relationship("Faturamento", back_populates="produtos_vendidos")
 
 class DetalhesProdutos(Base):
     __tablename__ = "detalhes_produtos"
-    __table_args__ = {'schema': 'public'}
+    __table_args__ = (
+        Index("ix_detalhes_produtos_empresa", "id_empresa", "nome_produto"),
+        {'schema': 'public'},
+    )
 
     id_produto = Column(Integer, primary_key=True, autoincrement=True)
     id_empresa = Column(Integer, ForeignKey('public.empresas.id_empresa'))
@@ -53,7 +71,10 @@ class DetalhesProdutos(Base):
 
 class AvaliacoesDiretorEmpresa(Base):
     __tablename__ = "avaliacoes_diretor_empresa"
-    __table_args__ = {'schema': 'public'}
+    __table_args__ = (
+        Index("ix_avaliacoes_empresa", "id_empresa", "nota_geral_empresa", "nota_diretor"),
+        {'schema': 'public'},
+    )
 
     id_avaliacao = Column(Integer, primary_key=True, autoincrement=True)
     id_empresa = Column(Integer, ForeignKey('public.empresas.id_empresa'))
@@ -61,4 +82,32 @@ class AvaliacoesDiretorEmpresa(Base):
     nota_geral_empresa = Column(Integer)
     comentario = Column(String)
 
-    empresa = relationship("Empresas", back_populates="avaliacoes")
\ No newline at end of file
+    empresa = relationship("Empresas", back_populates="avaliacoes")
+
+class EmpresaResumo(Base):
+    __tablename__ = "empresa_resumo"
+    __table_args__ = {'schema': 'public'}
+
+    id_empresa = Column(Integer, ForeignKey('public.empresas.id_empresa'), primary_key=True)
+    n_faturamentos = Column(Integer, nullable=False, default=0)
+    soma_faturamento_anual = Column(Float, nullable=False, default=0)
+    n_faturamento_anual = Column(Integer, nullable=False, default=0)
+    n_vendas = Column(Integer, nullable=False, default=0)
+    soma_faturamento_vendas = Column(Float, nullable=False, default=0)
+    n_faturamento_vendas = Column(Integer, nullable=False, default=0)
+    soma_produtos_vendidos = Column(Integer, nullable=False, default=0)
+    n_produtos_vendidos = Column(Integer, nullable=False, default=0)
+    n_avaliacoes = Column(Integer, nullable=False, default=0)
+    soma_nota_geral = Column(Integer, nullable=False, default=0)
+    n_nota_geral = Column(Integer, nullable=False, default=0)
+    soma_nota_diretor = Column(Integer, nullable=False, default=0)
+    n_nota_diretor = Column(Integer, nullable=False, default=0)
+
+class EmpresaProdutoResumo(Base):
+    __tablename__ = "empresa_produto_resumo"
+    __table_args__ = {'schema': 'public'}
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    id_empresa = Column(Integer, ForeignKey('public.empresas.id_empresa'), index=True)
+    nome_produto = Column(String)
+    n_detalhes = Column(Integer, nullable=False, default=0)
\ No newline at end of file
@@ -0,0 +1,107 @@
+import base64
+import binascii
+import json
+from fastapi import HTTPException, Request, status
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+from app.api import expand as expand_relations
+from app.api.export import stream_export
+from app.api.responses import FastJSONResponse, rows_as_dicts
+
+DEFAULT_LIMIT = 100
+MAX_LIMIT = 1000
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+# Faixa do BIGINT: fora dela o driver recusa o parâmetro (OverflowError no SQLite, DataError no Postgres).
+INT_MIN, INT_MAX = -(2**63), 2**63 - 1
+
+
+def encode_cursor(last_key) -> str:
+    raw = json.dumps({"k": last_key}, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, python_type: type | None = None):
+    """Valor gravado no cursor; com `python_type`, recusa valores de outro tipo ou, para
+    inteiros, fora da faixa de 64 bits (400)."""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        value = json.loads(base64.urlsafe_b64decode(padded.encode()))["k"]
+    except (binascii.Error, ValueError, KeyError, TypeError):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Cursor inválido.")
+    # bool é subclasse de int, mas `true` não é uma chave válida.
+    if python_type is not None and (not isinstance(value, python_type) or isinstance(value, bool)):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Cursor inválido.")
+    if python_type is int and not INT_MIN <= value <= INT_MAX:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Cursor inválido.")
+    return value
+
+
+# Tag do cache de respostas de cada tabela, quando difere do nome dela.
+CACHE_TAGS = {"avaliacoes_diretor_empresa": "avaliacoes"}
+
+
+def _tags(model, tree: dict) -> set[str]:
+    tags = {CACHE_TAGS.get(model.__tablename__, model.__tablename__)}
+    for name, subtree in tree.items():
+        tags |= _tags(model.__mapper__.relationships[name].mapper.class_, subtree)
+    return tags
+
+
+def list_tags(model):
+    """Para `conditional_response`: as tags da tabela listada e das relações pedidas em expand."""
+    def tags_for(request: Request) -> tuple[str, ...]:
+        return tuple(sorted(_tags(model, expand_relations.parse_expand(model, request.query_params.get("expand")))))
+    return tags_for
+
+
+def primary_key_column(model):
+    return model.__mapper__.primary_key[0]
+
+
+def select_columns(model, fields: str | None):
+    columns = model.__table__.columns
+    if not fields:
+        return list(columns)
+
+    names = [name.strip() for name in fields.split(",") if name.strip()]
+    invalid = [name for name in names if name not in columns]
+    if invalid:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Campo(s) inválido(s): {', '.join(invalid)}.",
+        )
+    return [columns[name] for name in dict.fromkeys(names)]
+
+
+def keyset_select(model, cursor: str | None, fields: str | None):
+    pk = primary_key_column(model)
+    columns = select_columns(model, fields)
+    stmt = select(*columns) if pk in columns else select(*columns, pk)
+    if cursor is not None:
+        stmt = stmt.where(pk > decode_cursor(cursor, pk.type.python_type))
+    return stmt.order_by(pk), [column.key for column in columns]
+
+
+def paginate(db: Session, model, cursor: str | None, limit: int, fields: str | None, export_format: str = "json", expand: str | None = None):
+    stmt, keys = keyset_select(model, cursor, fields)
+    tree = expand_relations.parse_expand(model, expand)
+    if export_format != "json":
+        if tree:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="expand só está disponível com format=json.")
+        return stream_export(db, stmt, keys, export_format, model.__tablename__)
+
+    # As chaves das relações entram no fim do SELECT; rows_as_dicts ignora o que passa de `keys`.
+    selected = set(stmt.selected_columns)
+    stmt = stmt.add_columns(*(column for column in expand_relations.local_columns(model, tree) if column not in selected))
+    rows = db.execute(stmt.limit(limit + 1)).all()
+
+    headers = {}
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last_key = rows[-1]._mapping[primary_key_column(model).key]
+        headers[NEXT_CURSOR_HEADER] = encode_cursor(last_key)
+
+    items = rows_as_dicts(rows, keys)
+    if tree:
+        expand_relations.attach(db, model, rows, items, tree)
+    return FastJSONResponse(items, headers=headers)
@@ -0,0 +1,37 @@
+"""Serialização direta para bytes JSON, sem passar pelo `jsonable_encoder` do FastAPI.
+
+Os handlers montam dicts a partir de tuplas de linha (`rows_as_dicts`) e devolvem
+`FastJSONResponse`, que codifica com orjson; sem orjson instalado cai no `json` da stdlib.
+"""
+import json
+from decimal import Decimal
+from fastapi.encoders import decimal_encoder, jsonable_encoder
+from fastapi.responses import JSONResponse
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - dependência opcional
+    orjson = None
+
+
+def _default(value):
+    # Como o jsonable_encoder: Decimal sem casas vira int, com casas vira float.
+    if isinstance(value, Decimal):
+        return decimal_encoder(value)
+    return jsonable_encoder(value)
+
+
+def dumps(content) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(content, default=_default, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(content, default=_default, ensure_ascii=False, allow_nan=False, separators=(",", ":")).encode()
+
+
+class FastJSONResponse(JSONResponse):
+    def render(self, content) -> bytes:
+        return dumps(content)
+
+
+def rows_as_dicts(rows, keys) -> list[dict]:
+    """Tuplas de linha → dicts com as chaves informadas (colunas extras no fim são ignoradas)."""
+    return [dict(zip(keys, row)) for row in rows]
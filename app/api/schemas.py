@@ -1,4 +1,4 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from typing import Optional
 from datetime import date
 
@@ -16,11 +16,19 @@ class FaturamentoBase(BaseModel):
     id_empresa: int
     faturamento_mensal: float
     faturamento_anual: float
+    ano: int | None = None
+    mes: int | None = Field(None, ge=1, le=12)
+
+class FaturamentoCreate(FaturamentoBase):
+    ano: int = Field(ge=1900, le=2100)
+    mes: int = Field(ge=1, le=12)
 
 class FaturamentoUpdate(BaseModel):
     id_empresa: int | None = None
     faturamento_mensal: float | None = None
     faturamento_anual: float | None = None
+    ano: int | None = Field(None, ge=1900, le=2100)
+    mes: int | None = Field(None, ge=1, le=12)
 
 class Faturamento(FaturamentoBase):
     id_faturamento: int
@@ -31,11 +39,19 @@ class ProdutosVendidosBase(BaseModel):
     id_faturamento: int
     nome_produto: str
     produtos_vendidos: int
+    ano: int | None = None
+    mes: int | None = Field(None, ge=1, le=12)
+
+class ProdutosVendidosCreate(ProdutosVendidosBase):
+    ano: int = Field(ge=1900, le=2100)
+    mes: int = Field(ge=1, le=12)
 
 class ProdutosVendidosUpdate(BaseModel):
     id_faturamento: int | None = None
     nome_produto: str | None = None
     produtos_vendidos: int | None = None
+    ano: int | None = Field(None, ge=1900, le=2100)
+    mes: int | None = Field(None, ge=1, le=12)
 
 class ProdutosVendidos(ProdutosVendidosBase):
     id_venda: int
@@ -85,4 +101,29 @@ class AvaliacoesDiretorEmpresaCreate(AvaliacoesDiretorEmpresaBase):
 class AvaliacoesDiretorEmpresa(AvaliacoesDiretorEmpresaBase):
     id_avaliacao: int
     class Config:
-        from_attributes = True
\ No newline at end of file
+        from_attributes = True
+
+class FaturamentoBulk(FaturamentoCreate):
+    id_faturamento: int | None = None
+
+class ProdutosVendidosBulk(ProdutosVendidosCreate):
+    id_venda: int | None = None
+
+class DetalhesProdutosBulk(DetalhesProdutosBase):
+    id_produto: int | None = None
+
+class AvaliacoesDiretorEmpresaBulk(AvaliacoesDiretorEmpresaBase):
+    id_avaliacao: int | None = None
+
+class BulkItemResult(BaseModel):
+    indice: int
+    status: str
+    id: int | None = None
+    erro: str | None = None
+
+class BulkResult(BaseModel):
+    criados: int
+    atualizados: int
+    ignorados: int
+    erros: int
+    itens: list[BulkItemResult]
\ No newline at end of file
@@ -0,0 +1,122 @@
+"""Busca por nome em empresas e produtos, ordenada por relevância e paginada por cursor.
+
+Cada termo da busca casa por prefixo ("fer" acha "Ferreira") e todos precisam aparecer.
+No PostgreSQL a relevância é o maior entre o `ts_rank` do tsvector e a similaridade de
+trigramas, que também traz resultados com erro de digitação ("ferrera"). No SQLite a busca
+usa as tabelas FTS5 e a relevância é o bm25, sem tolerância a erros de digitação. Os índices
+vêm da migração 0006.
+
+O cursor guarda (relevância, id) da última linha; a ordem é relevância decrescente e id. A
+ordenação e o `LIMIT` da página rodam no banco, sobre o índice de busca, antes do JOIN com a
+tabela: só as linhas da página são lidas da tabela base, e a página é a das melhores
+correspondências entre todas, não de um recorte.
+"""
+import math
+import re
+from dataclasses import dataclass
+from fastapi import HTTPException, status
+from sqlalchemy import Float, and_, cast, column, func, literal_column, or_, select, table
+from sqlalchemy.orm import Session
+from app.api import models as api_models
+from app.api.pagination import INT_MAX, INT_MIN, NEXT_CURSOR_HEADER, decode_cursor, encode_cursor
+from app.api.responses import FastJSONResponse, rows_as_dicts
+
+MAX_TERMOS = 8
+TERMO = re.compile(r"\w+", re.UNICODE)
+
+
+@dataclass(frozen=True)
+class Busca:
+    model: type
+    colunas: tuple[str, ...]
+    campos: tuple[str, ...]
+
+    @property
+    def pk(self):
+        return self.model.__mapper__.primary_key[0]
+
+    @property
+    def tabela_fts(self) -> str:
+        return f"{self.model.__tablename__}_busca"
+
+
+EMPRESAS = Busca(api_models.Empresas, ("nome_empresa", "diretor_empresa"), ("id_empresa", "nome_empresa", "diretor_empresa"))
+PRODUTOS = Busca(
+    api_models.DetalhesProdutos,
+    ("nome_produto", "categoria"),
+    ("id_produto", "id_empresa", "nome_produto", "categoria", "preco_unitario"),
+)
+
+
+def termos(q: str) -> list[str]:
+    encontrados = [termo.lower() for termo in TERMO.findall(q)][:MAX_TERMOS]
+    if not encontrados:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Busca vazia: informe ao menos uma palavra.")
+    return encontrados
+
+
+def _texto(busca: Busca):
+    # Constantes como literal (não parâmetro): a expressão precisa ser idêntica à dos índices
+    # da migração 0006, inclusive com o asyncpg, que envia os parâmetros à parte.
+    colunas = [func.coalesce(busca.model.__table__.c[nome], literal_column("''")) for nome in busca.colunas]
+    texto = colunas[0]
+    for coluna in colunas[1:]:
+        texto = texto.op("||")(literal_column("' '")).op("||")(coluna)
+    return texto
+
+
+def _postgresql(busca: Busca, lista: list[str]):
+    texto = _texto(busca)
+    vetor = func.to_tsvector(literal_column("'simple'"), texto)
+    consulta = func.to_tsquery(literal_column("'simple'"), " & ".join(f"{termo}:*" for termo in lista))
+    frase = " ".join(lista)
+    # ts_rank e word_similarity são real (float4); o cursor guarda o valor como double. Sem o
+    # cast, o `score = :ultimo` do keyset compara float4 com float8 e a linha de empate some.
+    score = cast(func.greatest(func.ts_rank(vetor, consulta), func.word_similarity(frase, texto)), Float(53))
+    return busca.pk, score, or_(vetor.op("@@")(consulta), texto.op("%>")(frase))
+
+
+def _sqlite(busca: Busca, lista: list[str]):
+    # Só a tabela FTS5: o JOIN com a tabela base fica para as linhas da página.
+    fts = table(busca.tabela_fts, column("rowid"), column(busca.tabela_fts))
+    # Termos entre aspas: o que o usuário digitar não vira operador do FTS5.
+    expressao = " ".join(f'"{termo}"*' for termo in lista)
+    score = -func.bm25(fts.c[busca.tabela_fts])
+    return fts.c.rowid, score, fts.c[busca.tabela_fts].match(expressao)
+
+
+def _cursor(cursor: str) -> tuple[float, int]:
+    ultimo = decode_cursor(cursor)
+    if not (
+        isinstance(ultimo, list) and len(ultimo) == 2
+        and isinstance(ultimo[0], (int, float)) and not isinstance(ultimo[0], bool) and math.isfinite(ultimo[0])
+        and isinstance(ultimo[1], int) and not isinstance(ultimo[1], bool) and INT_MIN <= ultimo[1] <= INT_MAX
+    ):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Cursor inválido.")
+    return ultimo[0], ultimo[1]
+
+
+def search_stmt(busca: Busca, dialect: str, q: str, cursor: str | None, limit: int):
+    id_, score, filtro = (_postgresql if dialect == "postgresql" else _sqlite)(busca, termos(q))
+    relevancia = score.label("score")
+    pagina = select(id_.label("id"), relevancia).where(filtro)
+    if cursor is not None:
+        ultimo_score, ultimo_id = _cursor(cursor)
+        pagina = pagina.where(or_(score < ultimo_score, and_(score == ultimo_score, id_ > ultimo_id)))
+    pagina = pagina.order_by(relevancia.desc(), id_).limit(limit + 1).subquery()
+    columns = [busca.model.__table__.c[campo] for campo in busca.campos]
+    return (
+        select(*columns, pagina.c.score)
+        .join(pagina, pagina.c.id == busca.pk)
+        .order_by(pagina.c.score.desc(), busca.pk)
+    )
+
+
+def search(db: Session, busca: Busca, q: str, cursor: str | None, limit: int):
+    stmt = search_stmt(busca, db.get_bind().dialect.name, q, cursor, limit)
+    rows = db.execute(stmt).all()
+    headers = {}
+    if len(rows) > limit:
+        rows = rows[:limit]
+        headers[NEXT_CURSOR_HEADER] = encode_cursor([rows[-1].score, rows[-1]._mapping[busca.pk.key]])
+    return FastJSONResponse(rows_as_dicts(rows, [*busca.campos, "score"]), headers=headers)
@@ -0,0 +1,115 @@
+"""Séries mensais por empresa, agregadas no banco e limitadas ao intervalo pedido.
+
+Os filtros comparam `(ano, mes)` como tupla, o que casa com o início dos índices
+`ix_faturamento_periodo` e `ix_produtos_vendidos_periodo`: só o trecho do intervalo é lido.
+Com `id_empresa` o filtro usa `ix_faturamento_empresa_periodo`.
+"""
+from fastapi import HTTPException, status
+from sqlalchemy import func, literal, select, tuple_
+from app.api import models as api_models
+
+Empresas = api_models.Empresas
+Faturamento = api_models.Faturamento
+ProdutosVendidos = api_models.ProdutosVendidos
+
+PERIODO_PATTERN = r"^\d{4}-(0[1-9]|1[0-2])$"
+JANELA_MESES = 12
+
+
+def parse_periodos(de: str, ate: str) -> tuple[tuple[int, int], tuple[int, int]]:
+    inicio = tuple(int(part) for part in de.split("-"))
+    fim = tuple(int(part) for part in ate.split("-"))
+    if inicio > fim:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Período inválido: 'de' é posterior a 'ate'.")
+    return inicio, fim
+
+
+def meses_antes(periodo: tuple[int, int], meses: int) -> tuple[int, int]:
+    indice = periodo[0] * 12 + periodo[1] - 1 - meses
+    return indice // 12, indice % 12 + 1
+
+
+def _no_intervalo(model, inicio, fim):
+    periodo = tuple_(model.ano, model.mes)
+    return [periodo >= tuple_(literal(inicio[0]), literal(inicio[1])), periodo <= tuple_(literal(fim[0]), literal(fim[1]))]
+
+
+def _com_nome(subquery, *columns):
+    return (
+        select(subquery.c.id_empresa, Empresas.nome_empresa, subquery.c.ano, subquery.c.mes, *columns)
+        .join(Empresas, Empresas.id_empresa == subquery.c.id_empresa)
+        .order_by(subquery.c.id_empresa, subquery.c.ano, subquery.c.mes)
+    )
+
+
+def faturamento_mensal_stmt(inicio, fim, id_empresa: int | None = None):
+    filtro = [Faturamento.id_empresa == id_empresa] if id_empresa is not None else []
+    mensal = (
+        select(
+            Faturamento.id_empresa,
+            Faturamento.ano,
+            Faturamento.mes,
+            func.sum(Faturamento.faturamento_mensal).label("soma_faturamento_mensal"),
+            func.avg(Faturamento.faturamento_mensal).label("media_faturamento_mensal"),
+            func.count(Faturamento.faturamento_mensal).label("n_faturamentos"),
+        )
+        .where(*filtro, *_no_intervalo(Faturamento, inicio, fim))
+        .group_by(Faturamento.ano, Faturamento.mes, Faturamento.id_empresa)
+        .subquery()
+    )
+    return _com_nome(mensal, mensal.c.soma_faturamento_mensal, mensal.c.media_faturamento_mensal, mensal.c.n_faturamentos)
+
+
+def acumulado_12m_stmt(inicio, fim, id_empresa: int | None = None):
+    """Soma dos 12 meses terminados em cada mês com faturamento dentro de [inicio, fim].
+
+    A leitura começa 11 meses antes de `inicio`, o mínimo para fechar a primeira janela.
+    """
+    filtro = [Faturamento.id_empresa == id_empresa] if id_empresa is not None else []
+    mensal = (
+        select(
+            Faturamento.id_empresa,
+            Faturamento.ano,
+            Faturamento.mes,
+            (Faturamento.ano * 12 + Faturamento.mes).label("indice"),
+            func.sum(Faturamento.faturamento_mensal).label("soma"),
+        )
+        .where(*filtro, *_no_intervalo(Faturamento, meses_antes(inicio, JANELA_MESES - 1), fim))
+        .group_by(Faturamento.ano, Faturamento.mes, Faturamento.id_empresa)
+        .subquery()
+    )
+    janela = dict(partition_by=mensal.c.id_empresa, order_by=mensal.c.indice, range_=(-(JANELA_MESES - 1), 0))
+    acumulado = select(
+        mensal.c.id_empresa,
+        mensal.c.ano,
+        mensal.c.mes,
+        func.sum(mensal.c.soma).over(**janela).label("faturamento_12m"),
+        func.count().over(**janela).label("meses_com_faturamento"),
+    ).subquery()
+    return _com_nome(acumulado, acumulado.c.faturamento_12m, acumulado.c.meses_com_faturamento).where(
+        tuple_(acumulado.c.ano, acumulado.c.mes) >= tuple_(literal(inicio[0]), literal(inicio[1]))
+    )
+
+
+def produtos_vendidos_mensal_stmt(inicio, fim, id_empresa: int | None = None):
+    filtro = [Faturamento.id_empresa == id_empresa] if id_empresa is not None else []
+    mensal = (
+        select(
+            Faturamento.id_empresa,
+            ProdutosVendidos.ano,
+            ProdutosVendidos.mes,
+            func.sum(ProdutosVendidos.produtos_vendidos).label("soma_produtos_vendidos"),
+            func.avg(ProdutosVendidos.produtos_vendidos).label("media_produtos_vendidos"),
+            func.count(ProdutosVendidos.produtos_vendidos).label("n_vendas"),
+        )
+        .join(Faturamento, Faturamento.id_faturamento == ProdutosVendidos.id_faturamento)
+        .where(*filtro, *_no_intervalo(ProdutosVendidos, inicio, fim))
+        .group_by(ProdutosVendidos.ano, ProdutosVendidos.mes, Faturamento.id_empresa)
+        .subquery()
+    )
+    return _com_nome(mensal, mensal.c.soma_produtos_vendidos, mensal.c.media_produtos_vendidos, mensal.c.n_vendas)
+
+
+FATURAMENTO_MENSAL_KEYS = ["id_empresa", "nome_empresa", "ano", "mes", "soma_faturamento_mensal", "media_faturamento_mensal", "n_faturamentos"]
+ACUMULADO_12M_KEYS = ["id_empresa", "nome_empresa", "ano", "mes", "faturamento_12m", "meses_com_faturamento"]
+PRODUTOS_VENDIDOS_MENSAL_KEYS = ["id_empresa", "nome_empresa", "ano", "mes", "soma_produtos_vendidos", "media_produtos_vendidos", "n_vendas"]
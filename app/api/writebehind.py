@@ -0,0 +1,139 @@
+"""Fila write-behind: o POST responde 202 e a gravação acontece depois, em lotes.
+
+Com `AVALIACOES_WRITE_BEHIND=1`, `POST /api/avaliacoes/` valida o corpo, põe a avaliação numa
+fila em memória (no máximo `WRITE_BEHIND_QUEUE_SIZE` itens; cheia, responde 503) e devolve 202
+sem tocar no banco. Uma tarefa do event loop grava a fila com `bulk.bulk_insert` (um INSERT de
+várias linhas, agregados e commit numa transação) sempre que junta `WRITE_BEHIND_BATCH_SIZE`
+itens ou a cada `WRITE_BEHIND_FLUSH_SECONDS`, e então invalida a tag do cache.
+
+As avaliações só aparecem nas leituras depois da gravação, e a FK da empresa só é conferida
+nela: itens recusados pelo banco são descartados, com log e métrica. No encerramento o
+lifespan chama `stop()`, que grava o que restou; um processo morto à força perde a fila.
+"""
+import asyncio
+import logging
+import math
+import os
+import time
+from collections import deque
+from fastapi import HTTPException, status
+from fastapi.responses import JSONResponse
+from app import metrics
+from app.api import bulk
+from app.api.cache import response_cache
+from database import DB_ASYNC, AsyncSessionLocal, SessionLocal, get_async_engine, get_engine, run_db
+
+AVALIACOES_WRITE_BEHIND = os.environ.get("AVALIACOES_WRITE_BEHIND", "").lower() in ("1", "true", "yes")
+WRITE_BEHIND_QUEUE_SIZE = int(os.environ.get("WRITE_BEHIND_QUEUE_SIZE", "10000"))
+WRITE_BEHIND_BATCH_SIZE = int(os.environ.get("WRITE_BEHIND_BATCH_SIZE", "500"))
+WRITE_BEHIND_FLUSH_SECONDS = float(os.environ.get("WRITE_BEHIND_FLUSH_SECONDS", "0.2"))
+# Falhas seguidas toleradas ao drenar a fila no encerramento antes de desistir dos itens.
+DRAIN_ATTEMPTS = 3
+
+logger = logging.getLogger(__name__)
+
+
+class WriteBehindQueue:
+    def __init__(self, name: str, spec: bulk.BulkSpec, tag: str, enabled: bool, max_size: int, batch_size: int, interval: float):
+        self.name = name
+        self.spec = spec
+        self.tag = tag
+        self.enabled = enabled
+        self.max_size = max_size
+        self.batch_size = max(batch_size, 1)
+        self.interval = interval
+        self._items: deque[dict] = deque()
+        self._wake: asyncio.Event | None = None
+        self._task: asyncio.Task | None = None
+        self._stopping = False
+
+    def __len__(self):
+        return len(self._items)
+
+    def _start(self):
+        # Sob o lifespan a tarefa nasce no primeiro envio; sem lifespan também funciona.
+        if self._task is None or self._task.done():
+            self._wake = asyncio.Event()
+            self._stopping = False
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    def accept(self, data: dict) -> JSONResponse:
+        """Enfileira um item já validado; chamado no event loop pelo handler."""
+        if len(self._items) >= self.max_size:
+            metrics.WRITE_BEHIND_ROWS.inc(self.name, "recusado")
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Fila de gravação cheia; tente novamente em instantes.",
+                headers={"Retry-After": str(max(1, math.ceil(self.interval)))},
+            )
+        self._start()
+        self._items.append(data)
+        if len(self._items) >= self.batch_size:
+            self._wake.set()
+        return JSONResponse({"status": "enfileirado", "fila": len(self._items)}, status_code=status.HTTP_202_ACCEPTED)
+
+    async def _write(self, rows: list[dict]) -> dict:
+        if DB_ASYNC:
+            async with AsyncSessionLocal(bind=get_async_engine()) as db:
+                return await run_db(db, bulk.bulk_insert, self.spec, rows)
+        with SessionLocal(bind=get_engine()) as db:
+            return await run_db(db, bulk.bulk_insert, self.spec, rows)
+
+    async def flush(self) -> int:
+        """Grava tudo o que está na fila, em lotes; devolve quantos lotes falharam."""
+        failures = 0
+        while self._items:
+            batch = [self._items.popleft() for _ in range(min(self.batch_size, len(self._items)))]
+            start = time.perf_counter()
+            try:
+                result = await self._write(batch)
+            except Exception:
+                # Banco fora do ar ou erro no lote inteiro: os itens voltam para o início da fila.
+                self._items.extendleft(reversed(batch))
+                logger.exception("Falha ao gravar %d itens da fila %s.", len(batch), self.name)
+                return failures + 1
+            finally:
+                metrics.WRITE_BEHIND_FLUSH.observe(time.perf_counter() - start, self.name)
+            errors = [item for item in result["itens"] if item["status"] == "erro"]
+            if errors:
+                logger.warning("Fila %s descartou %d itens recusados pelo banco, ex.: %s", self.name, len(errors), errors[0]["erro"])
+            metrics.WRITE_BEHIND_ROWS.inc(self.name, "gravado", amount=len(batch) - len(errors))
+            metrics.WRITE_BEHIND_ROWS.inc(self.name, "descartado", amount=len(errors))
+            response_cache.invalidate(self.tag)
+        return failures
+
+    async def _run(self):
+        backoff = self.interval
+        while True:
+            try:
+                await asyncio.wait_for(self._wake.wait(), backoff)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+            if self._stopping:
+                break
+            # Depois de uma falha, espera o dobro (até 30 s) antes de tentar de novo.
+            backoff = min(backoff * 2, 30.0) if await self.flush() else self.interval
+
+        for attempt in range(DRAIN_ATTEMPTS):
+            if not await self.flush():
+                return
+            await asyncio.sleep(self.interval * (attempt + 1))
+        logger.error("Fila %s encerrada com %d itens não gravados.", self.name, len(self._items))
+        metrics.WRITE_BEHIND_ROWS.inc(self.name, "descartado", amount=len(self._items))
+        self._items.clear()
+
+    async def stop(self):
+        """Chamado no encerramento do lifespan: grava o que restou e encerra a tarefa."""
+        if self._task is None:
+            return
+        self._stopping = True
+        self._wake.set()
+        await self._task
+        self._task = None
+
+
+avaliacoes_queue = WriteBehindQueue(
+    "avaliacoes", bulk.AVALIACOES, "avaliacoes", AVALIACOES_WRITE_BEHIND,
+    WRITE_BEHIND_QUEUE_SIZE, WRITE_BEHIND_BATCH_SIZE, WRITE_BEHIND_FLUSH_SECONDS,
+)
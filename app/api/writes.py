@@ -0,0 +1,40 @@
+from fastapi import HTTPException, status
+from sqlalchemy import insert, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from database import is_foreign_key_violation
+
+
+def _execute_returning(db: Session, stmt, parent_missing: str | None):
+    try:
+        return db.scalars(stmt).one_or_none()
+    except IntegrityError as exc:
+        db.rollback()
+        # A FK substitui o SELECT de existência do pai: o erro vira o mesmo 404 de antes.
+        if parent_missing and is_foreign_key_violation(exc):
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=parent_missing)
+        raise
+
+
+def insert_returning(db: Session, model, data: dict, parent_missing: str | None = None):
+    """INSERT ... RETURNING em um único comando, sem o refresh depois do commit."""
+    return _execute_returning(db, insert(model).values(**data).returning(model), parent_missing)
+
+
+def update_returning(db: Session, model, key, data: dict, not_found: str, parent_missing: str | None = None):
+    """UPDATE ... RETURNING pela chave primária; 404 quando nenhuma linha é afetada."""
+    pk = model.__mapper__.primary_key[0]
+    if data:
+        stmt = (
+            update(model)
+            .where(pk == key)
+            .values(**data)
+            .returning(model)
+            .execution_options(synchronize_session=False)
+        )
+        row = _execute_returning(db, stmt, parent_missing)
+    else:
+        row = db.get(model, key)
+    if row is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=not_found)
+    return row
@@ -1,9 +1,37 @@
+import asyncio
 import os
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta, timezone
 from jose import JWTError, jwt
 from passlib.context import CryptContext
+from app import metrics
+from app.auth.revocation import revocations
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+BCRYPT_ROUNDS = int(os.environ.get("BCRYPT_ROUNDS", "12"))
+PASSWORD_HASH_WORKERS = int(os.environ.get("PASSWORD_HASH_WORKERS", str(os.cpu_count() or 1)))
+PASSWORD_HASH_QUEUE_SIZE = int(os.environ.get("PASSWORD_HASH_QUEUE_SIZE", "32"))
+
+# min/max iguais ao custo configurado fazem o verify_and_update devolver um novo hash
+# sempre que o custo salvo for diferente, tanto para cima quanto para baixo.
+pwd_context = CryptContext(
+    schemes=["bcrypt"],
+    deprecated="auto",
+    bcrypt__default_rounds=BCRYPT_ROUNDS,
+    bcrypt__min_rounds=BCRYPT_ROUNDS,
+    bcrypt__max_rounds=BCRYPT_ROUNDS,
+)
+
+# O bcrypt libera o GIL, então um pool de threads dedicado usa vários núcleos sem
+# ocupar o event loop nem o threadpool do Starlette.
+_password_executor = ThreadPoolExecutor(max_workers=PASSWORD_HASH_WORKERS, thread_name_prefix="bcrypt")
+_password_slots = threading.BoundedSemaphore(PASSWORD_HASH_WORKERS + PASSWORD_HASH_QUEUE_SIZE)
+
+
+class PasswordPoolBusy(Exception):
+    pass
 
 SECRET_KEY = os.environ.get("SECRET_KEY", "uma-chave-secreta-forte-e-randomica")
 ALGORITHM = "HS256"
@@ -16,8 +44,60 @@ def hash_password(password: str):
 def verify_password(plain_password: str, hashed_password: str):
     return pwd_context.verify(plain_password, hashed_password)
 
+def _timed(func, *args):
+    start = time.perf_counter()
+    try:
+        return func(*args)
+    finally:
+        metrics.PASSWORD_HASH.observe(time.perf_counter() - start, func.__name__)
+
+async def _run_password_task(func, *args):
+    if not _password_slots.acquire(blocking=False):
+        raise PasswordPoolBusy()
+    try:
+        future = _password_executor.submit(_timed, func, *args)
+    except BaseException:
+        _password_slots.release()
+        raise
+    # A vaga só é liberada quando o bcrypt termina, mesmo que a requisição seja cancelada.
+    future.add_done_callback(lambda _: _password_slots.release())
+    return await asyncio.wrap_future(future)
+
+_dummy_hash = None
+
+def dummy_password_hash():
+    """Hash de uma senha aleatória com o custo atual, verificado quando o email não existe."""
+    global _dummy_hash
+    if _dummy_hash is None:
+        _dummy_hash = pwd_context.hash(new_token_id())
+    return _dummy_hash
+
+def dummy_verify(password: str):
+    pwd_context.verify_and_update(password, dummy_password_hash())
+    return False, None
+
+async def hash_password_async(password: str):
+    return await _run_password_task(pwd_context.hash, password)
+
+async def verify_and_update_password_async(plain_password: str, hashed_password: str):
+    return await _run_password_task(pwd_context.verify_and_update, plain_password, hashed_password)
+
+async def dummy_verify_async(plain_password: str):
+    return await _run_password_task(dummy_verify, plain_password)
+
+def warm_up():
+    """Carrega o backend do bcrypt e o JWT antes da primeira requisição de login."""
+    pwd_context.handler().get_backend()
+    # No pool do bcrypt, que o interpretador espera ao sair: uma thread daemon encerrada no
+    # meio do hash (código Rust) derruba o processo com abort.
+    _password_executor.submit(dummy_password_hash).result()
+    decode_token(create_access_token({"sub": "warm-up"}))
+
+def new_token_id() -> str:
+    return uuid.uuid4().hex
+
 def create_access_token(data: dict, expires_delta: timedelta | None = None):
-    to_encode = data.copy()
+    to_encode = {"jti": new_token_id(), **data}
     if expires_delta:
         expire = datetime.now(timezone.utc) + expires_delta
     else:
@@ -27,7 +107,7 @@ def create_access_token(data: dict, expires_delta: timedelta | None = None):
     return encoded_jwt
 
 def create_refresh_token(data: dict, expires_delta: timedelta | None = None):
-    to_encode = data.copy()
+    to_encode = {"jti": new_token_id(), **data}
     if expires_delta:
         expire = datetime.now(timezone.utc) + expires_delta
     else:
@@ -36,9 +116,23 @@ def create_refresh_token(data: dict, expires_delta: timedelta | None = None):
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
-def decode_token(token: str):
+def decode_token(token: str, check_revoked: bool = True):
     try:
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        return payload
     except JWTError:
-        return None
\ No newline at end of file
+        return None
+    if check_revoked and revocations.is_revoked(payload.get("jti"), payload.get("fam")):
+        return None
+    return payload
+
+def is_family_revoked(family: str) -> bool:
+    return revocations.is_revoked(family)
+
+def revoke_token(payload: dict) -> bool:
+    """Revoga o `jti` do token até o `exp` dele; devolve False se já estava revogado."""
+    return revocations.revoke(payload["jti"], int(payload["exp"]))
+
+def revoke_family(family: str):
+    """Revoga todos os tokens da sessão. Nenhum token da família vive mais que um refresh novo."""
+    expires_at = datetime.now(timezone.utc) + timedelta(days=REFRESH_TOKEN_EXPIRE_DAYS)
+    revocations.revoke(family, int(expires_at.timestamp()))
\ No newline at end of file
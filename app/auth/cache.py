@@ -0,0 +1,93 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+from sqlalchemy import event, inspect
+from app.auth.models import User
+from app.shared import SharedGenerations, shared_generations
+
+USER_CACHE_SIZE = int(os.environ.get("AUTH_USER_CACHE_SIZE", "10000"))
+USER_CACHE_TTL_SECONDS = int(os.environ.get("AUTH_USER_CACHE_TTL_SECONDS", "300"))
+TRUST_TOKEN_CLAIMS = os.environ.get("AUTH_TRUST_TOKEN_CLAIMS", "").lower() in ("1", "true", "yes")
+
+
+class UserCache:
+    """LRU com expiração dos usuários já resolvidos, indexado pelo `sub` do token.
+
+    Com `shared`, `invalidate` também vale para os outros workers: cada entrada guarda a geração
+    do seu `sub` e é descartada se ela mudou.
+    """
+
+    def __init__(self, max_size: int, ttl_seconds: int, shared: SharedGenerations | None = None):
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self.shared = shared
+        self._entries: OrderedDict[str, tuple[float, User, int]] = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, sub: str) -> User | None:
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(sub)
+            if entry is None or entry[0] <= now or entry[2] != self._generation(sub):
+                if entry is not None:
+                    del self._entries[sub]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(sub)
+            self.hits += 1
+            return entry[1]
+
+    def set(self, sub: str, user: User, token_exp: float | None = None):
+        if self.max_size <= 0:
+            return
+        expires_at = time.time() + self.ttl_seconds
+        if token_exp is not None:
+            expires_at = min(expires_at, token_exp)
+        principal = User(id=user.id, email=user.email)
+        with self._lock:
+            self._entries[sub] = (expires_at, principal, self._generation(sub))
+            self._entries.move_to_end(sub)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def _generation(self, sub: str) -> int:
+        return self.shared.get(f"user:{sub}") if self.shared is not None else 0
+
+    def invalidate(self, sub: str):
+        with self._lock:
+            if self.shared is not None:
+                self.shared.bump(f"user:{sub}")
+            self._entries.pop(sub, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "max_size": self.max_size,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_ratio": self.hits / lookups if lookups else 0.0,
+            }
+
+
+user_cache = UserCache(USER_CACHE_SIZE, USER_CACHE_TTL_SECONDS, shared_generations())
+
+
+@event.listens_for(User, "after_update")
+@event.listens_for(User, "after_delete")
+def _invalidate_user(mapper, connection, target):
+    user_cache.invalidate(target.email)
+    old_emails = inspect(target).attrs.email.history.deleted
+    for email in old_emails or ():
+        user_cache.invalidate(email)
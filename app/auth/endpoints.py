@@ -1,11 +1,15 @@
+import math
 from typing import Annotated
-from fastapi import APIRouter, Depends, HTTPException, status, Form
+from fastapi import APIRouter, Depends, HTTPException, Request, status, Form
+from fastapi.concurrency import run_in_threadpool
 from fastapi.security import OAuth2PasswordRequestForm, OAuth2PasswordBearer
 from sqlalchemy.orm import Session
-from app.auth.auth import verify_password, create_access_token, create_refresh_token, decode_token, hash_password
+from app.auth.auth import PasswordPoolBusy, create_access_token, create_refresh_token, decode_token, dummy_verify_async, hash_password_async, is_family_revoked, new_token_id, revoke_family, revoke_token, verify_and_update_password_async
+from app.auth.cache import TRUST_TOKEN_CLAIMS, user_cache
+from app.auth.ratelimit import client_ip, login_email_bucket, login_ip_bucket
 from app.auth.schemas import Token, UserLogin
 from app.auth.models import User
-from database import get_db 
+from database import get_db, run_db 
 
 router = APIRouter()
 
@@ -14,15 +18,39 @@ oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/auth/token")
 def get_user_by_email(db: Session, email: str):
     return db.query(User).filter(User.email == email).first()
 
-def authenticate_user(db: Session, email: str, password: str):
-    user = get_user_by_email(db, email)
+def _password_pool_busy():
+    return HTTPException(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        detail="Servidor ocupado, tente novamente em instantes.",
+        headers={"Retry-After": "1"},
+    )
+
+def _too_many_attempts(retry_after: float):
+    return HTTPException(
+        status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+        detail="Muitas tentativas de login, tente novamente mais tarde.",
+        headers={"Retry-After": str(math.ceil(retry_after))},
+    )
+
+def _store_rehashed_password(db: Session, user: User, new_hash: str):
+    user.hashed_password = new_hash
+    db.commit()
+    db.refresh(user)
+
+async def authenticate_user(db: Session, email: str, password: str):
+    user = await run_db(db, get_user_by_email, email)
     if not user:
+        # Mesmo custo de um email existente: o tempo de resposta não revela quem tem conta.
+        await dummy_verify_async(password)
         return False
-    if not verify_password(password, user.hashed_password):
+    valid, new_hash = await verify_and_update_password_async(password, user.hashed_password)
+    if not valid:
         return False
+    if new_hash:
+        await run_db(db, _store_rehashed_password, user, new_hash)
     return user
 
-def get_current_user(db: Session = Depends(get_db), token: Annotated[str, Depends(oauth2_scheme)] = None):
+async def get_current_user(db: Session = Depends(get_db), token: Annotated[str, Depends(oauth2_scheme)] = None):
     payload = decode_token(token)
     if not payload or payload.get("sub") is None or payload.get("type") != "access":
         raise HTTPException(
@@ -31,60 +59,116 @@ def get_current_user(db: Session = Depends(get_db), token: Annotated[str, Depend
             headers={"WWW-Authenticate": "Bearer"},
         )
     user_email = payload.get("sub")
-    user = get_user_by_email(db, user_email)
+    if TRUST_TOKEN_CLAIMS:
+        return User(id=payload.get("uid"), email=user_email)
+
+    user = user_cache.get(user_email)
+    if user is not None:
+        return user
+
+    user = await run_db(db, get_user_by_email, user_email)
     if user is None:
         raise HTTPException(status_code=404, detail="Usuário não encontrado")
+    user_cache.set(user_email, user, payload.get("exp"))
     return user
 
-@router.post("/register")
-def register_user(user: UserLogin, db: Session = Depends(get_db)):
-    if get_user_by_email(db, user.email):
-        raise HTTPException(status_code=400, detail="Email já cadastrado")
-    
-    hashed_password = hash_password(user.password)
-    new_user = User(email=user.email, hashed_password=hashed_password)
-    
+def _issue_tokens(user: User, family: str):
+    claims = {"sub": user.email, "uid": user.id, "fam": family}
+    return {"access_token": create_access_token(data=claims), "refresh_token": create_refresh_token(data=claims), "token_type": "bearer"}
+
+def _create_user(db: Session, email: str, hashed_password: str):
+    new_user = User(email=email, hashed_password=hashed_password)
     db.add(new_user)
     db.commit()
     db.refresh(new_user)
+    return new_user
+
+@router.post("/register")
+async def register_user(user: UserLogin, db: Session = Depends(get_db)):
+    if await run_db(db, get_user_by_email, user.email):
+        raise HTTPException(status_code=400, detail="Email já cadastrado")
+    
+    try:
+        hashed_password = await hash_password_async(user.password)
+    except PasswordPoolBusy:
+        raise _password_pool_busy()
+
+    await run_db(db, _create_user, user.email, hashed_password)
     return {"message": "Usuário cadastrado com sucesso!"}
 
 @router.post("/token", response_model=Token)
 async def login_for_access_and_refresh_token(
+    request: Request,
     form_data: Annotated[OAuth2PasswordRequestForm, Depends()], 
     db: Session = Depends(get_db)
 ):
-    user = authenticate_user(db, form_data.username, form_data.password)
+    email_key = form_data.username.strip().lower()
+    retry_after = login_ip_bucket.consume(client_ip(request)) or login_email_bucket.check(email_key)
+    if retry_after:
+        raise _too_many_attempts(retry_after)
+
+    try:
+        user = await authenticate_user(db, form_data.username, form_data.password)
+    except PasswordPoolBusy:
+        raise _password_pool_busy()
     if not user:
+        login_email_bucket.consume(email_key)
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Credenciais de usuário ou senha incorretas",
             headers={"WWW-Authenticate": "Bearer"},
         )
-    access_token = create_access_token(data={"sub": user.email})
-    refresh_token = create_refresh_token(data={"sub": user.email})
-    return {"access_token": access_token, "refresh_token": refresh_token, "token_type": "bearer"}
+    return _issue_tokens(user, new_token_id())
 
 @router.post("/token/refresh", response_model=Token)
 async def refresh_access_token(
     refresh_token: Annotated[str, Form()], 
     db: Session = Depends(get_db)
 ):
-    payload = decode_token(refresh_token)
-    if not payload or payload.get("sub") is None or payload.get("type") != "refresh":
+    invalid = HTTPException(
+        status_code=status.HTTP_401_UNAUTHORIZED,
+        detail="Token de atualização inválido",
+        headers={"WWW-Authenticate": "Bearer"},
+    )
+    # Sem checar a revogação aqui: um jti já usado precisa chegar à detecção de reuso abaixo.
+    payload = decode_token(refresh_token, check_revoked=False)
+    if not payload or payload.get("sub") is None or payload.get("type") != "refresh" or payload.get("jti") is None or payload.get("fam") is None:
+        raise invalid
+    if is_family_revoked(payload["fam"]):
+        raise invalid
+
+    # Cada refresh token vale uma vez. Se ele já foi trocado, alguém guardou uma cópia:
+    # a família inteira (todos os tokens desta sessão) é revogada.
+    if not await run_in_threadpool(revoke_token, payload):
+        await run_in_threadpool(revoke_family, payload["fam"])
+        raise invalid
+
+    user_email = payload.get("sub")
+    user = await run_db(db, get_user_by_email, user_email)
+    if user is None:
+        raise HTTPException(status_code=404, detail="Usuário não encontrado")
+
+    return _issue_tokens(user, payload["fam"])
+
+@router.post("/logout")
+async def logout(token: Annotated[str, Depends(oauth2_scheme)]):
+    payload = decode_token(token)
+    if not payload or payload.get("type") != "access" or payload.get("jti") is None:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Token de atualização inválido",
+            detail="Token de acesso inválido",
             headers={"WWW-Authenticate": "Bearer"},
         )
-    user_email = payload.get("sub")
-    user = get_user_by_email(db, user_email)
-    if user is None:
-        raise HTTPException(status_code=404, detail="Usuário não encontrado")
-    
-    access_token = create_access_token(data={"sub": user.email})
-    return {"access_token": access_token, "refresh_token": refresh_token, "token_type": "bearer"}
+    if payload.get("fam") is not None:
+        await run_in_threadpool(revoke_family, payload["fam"])
+    else:
+        await run_in_threadpool(revoke_token, payload)
+    return {"message": "Sessão encerrada."}
 
 @router.get("/users/me")
 async def read_users_me(current_user: Annotated[User, Depends(get_current_user)]):
-    return {"email": current_user.email}
\ No newline at end of file
+    return {"email": current_user.email}
+
+@router.get("/cache/stats")
+async def read_user_cache_stats(current_user: Annotated[User, Depends(get_current_user)]):
+    return user_cache.stats()
\ No newline at end of file
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String
+from sqlalchemy import BigInteger, Column, Float, Index, Integer, String
 from database import Base 
 
 class User(Base):
@@ -7,4 +7,17 @@ class User(Base):
 
     id = Column(Integer, primary_key=True, index=True)
     email = Column(String, unique=True, index=True)
-    hashed_password = Column(String)
\ No newline at end of file
+    hashed_password = Column(String)
+
+class RevokedToken(Base):
+    __tablename__ = "revoked_tokens"
+    __table_args__ = (
+        Index("ix_revoked_tokens_created_at", "created_at"),
+        {'schema': 'public'},
+    )
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    token_id = Column(String, unique=True, nullable=False)
+    expires_at = Column(BigInteger, nullable=False, index=True)
+    # Instante da revogação (epoch); cursor da sincronização entre workers.
+    created_at = Column(Float, nullable=False, default=0)
@@ -0,0 +1,147 @@
+"""Limite de tentativas de login (token bucket), checado antes de qualquer bcrypt.
+
+Dois baldes: por IP, que paga uma ficha a cada tentativa e segura quem dispara logins em massa,
+e por email, que só paga quando a senha está errada, para que um ataque a outras contas não
+bloqueie quem acerta a própria senha.
+
+Atrás de um balanceador, o IP da conexão é o dele, e todos os clientes dividiriam um balde só.
+`TRUSTED_PROXIES` (IPs ou redes separados por vírgula) lista os proxies cujo X-Forwarded-For
+vale: o cliente é o último endereço da cadeia que não é um desses proxies. De qualquer outra
+origem o cabeçalho é ignorado, senão bastaria inventá-lo para ganhar um balde novo a cada
+tentativa.
+"""
+import ipaddress
+import os
+import threading
+import time
+from collections import OrderedDict
+from app import metrics
+from app.shared import SharedBuckets, shared_buckets
+
+LOGIN_RATE_IP_PER_MINUTE = float(os.environ.get("LOGIN_RATE_IP_PER_MINUTE", "30"))
+LOGIN_RATE_IP_BURST = float(os.environ.get("LOGIN_RATE_IP_BURST", "10"))
+LOGIN_RATE_EMAIL_PER_MINUTE = float(os.environ.get("LOGIN_RATE_EMAIL_PER_MINUTE", "5"))
+LOGIN_RATE_EMAIL_BURST = float(os.environ.get("LOGIN_RATE_EMAIL_BURST", "5"))
+LOGIN_RATE_MAX_KEYS = int(os.environ.get("LOGIN_RATE_MAX_KEYS", "100000"))
+TRUSTED_PROXIES = tuple(
+    ipaddress.ip_network(proxy.strip(), strict=False)
+    for proxy in os.environ.get("TRUSTED_PROXIES", "").split(",")
+    if proxy.strip()
+)
+
+
+def _trusted_proxy(host: str) -> bool:
+    try:
+        address = ipaddress.ip_address(host)
+    except ValueError:
+        return False
+    return any(address in network for network in TRUSTED_PROXIES)
+
+
+def client_ip(request) -> str:
+    """O IP do cliente para o balde: o da conexão, ou o do X-Forwarded-For vindo de um proxy confiável."""
+    host = request.client.host if request.client else "desconhecido"
+    if not TRUSTED_PROXIES or not _trusted_proxy(host):
+        return host
+    # Cada proxy acrescenta à direita quem falou com ele; só o trecho dos proxies confiáveis é fidedigno.
+    for forwarded in reversed(request.headers.get("x-forwarded-for", "").split(",")):
+        forwarded = forwarded.strip()
+        if not forwarded:
+            continue
+        host = forwarded
+        if not _trusted_proxy(host):
+            break
+    return host
+
+
+def _take(state, now: float, rate: float, burst: float, cost: float):
+    """Uma rodada do token bucket: devolve o novo estado e quantos segundos esperar (0 = liberado)."""
+    if state is None:
+        tokens = burst
+    else:
+        tokens = min(burst, state[0] + (now - state[1]) * rate)
+    needed = max(cost, 1)
+    if tokens < needed:
+        return (tokens, now), (needed - tokens) / rate
+    return (tokens - cost, now), 0.0
+
+
+class RateLimitBackend:
+    """Onde ficam os baldes. Um backend compartilhado (Redis, por exemplo) só precisa de `take`."""
+
+    def take(self, key: str, rate: float, burst: float, cost: float) -> float:
+        raise NotImplementedError
+
+
+class MemoryRateLimitBackend(RateLimitBackend):
+    """Baldes por processo, no máximo `max_keys`; os menos usados saem primeiro.
+
+    Um balde descartado volta cheio, então a memória fica limitada ao custo de, sob uma
+    enxurrada de chaves novas, esquecer as mais antigas.
+    """
+
+    def __init__(self, max_keys: int):
+        self.max_keys = max_keys
+        self._buckets: OrderedDict[str, tuple[float, float]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def take(self, key, rate, burst, cost):
+        now = time.monotonic()
+        with self._lock:
+            state, retry_after = _take(self._buckets.get(key), now, rate, burst, cost)
+            self._buckets[key] = state
+            self._buckets.move_to_end(key)
+            while len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+        return retry_after
+
+
+class SharedRateLimitBackend(RateLimitBackend):
+    """Baldes no arquivo compartilhado entre os workers (`SHARED_STATE_DIR`)."""
+
+    def __init__(self, buckets: SharedBuckets):
+        self.buckets = buckets
+
+    def take(self, key, rate, burst, cost):
+        # Relógio de parede: o monotônico de cada processo tem uma origem diferente.
+        now = time.time()
+        return self.buckets.update(key, lambda state: _take(state, now, rate, burst, cost))
+
+
+class TokenBucket:
+    def __init__(self, name: str, per_minute: float, burst: float, backend: RateLimitBackend):
+        self.name = name
+        self.rate = per_minute / 60
+        self.burst = burst
+        self.backend = backend
+
+    @property
+    def enabled(self) -> bool:
+        return self.rate > 0 and self.burst > 0
+
+    def _take(self, key: str, cost: float) -> float:
+        if not self.enabled:
+            return 0.0
+        retry_after = self.backend.take(f"{self.name}:{key}", self.rate, self.burst, cost)
+        if retry_after:
+            metrics.LOGIN_THROTTLED.inc(self.name)
+        return retry_after
+
+    def check(self, key: str) -> float:
+        """Segundos até sobrar uma ficha, sem gastar nenhuma."""
+        return self._take(key, 0)
+
+    def consume(self, key: str) -> float:
+        return self._take(key, 1)
+
+
+def _backend() -> RateLimitBackend:
+    buckets = shared_buckets()
+    if buckets is not None:
+        return SharedRateLimitBackend(buckets)
+    return MemoryRateLimitBackend(LOGIN_RATE_MAX_KEYS)
+
+
+_login_backend = _backend()
+login_ip_bucket = TokenBucket("ip", LOGIN_RATE_IP_PER_MINUTE, LOGIN_RATE_IP_BURST, _login_backend)
+login_email_bucket = TokenBucket("email", LOGIN_RATE_EMAIL_PER_MINUTE, LOGIN_RATE_EMAIL_BURST, _login_backend)
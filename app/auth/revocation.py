@@ -0,0 +1,194 @@
+"""Revogação de tokens antes do `exp`.
+
+`decode_token` consulta `revocations.is_revoked` a cada token: um dict em memória (O(1)) com
+os `jti` e as famílias revogados, mais um heap por expiração que descarta as entradas que já
+venceriam de qualquer jeito. A consulta nunca toca o banco: a persistência fica num backend
+plugável (o padrão grava na tabela `revoked_tokens`) e `sync_periodically`, tarefa do
+lifespan, traz no threadpool o que os outros workers revogaram, assim que o contador
+compartilhado `auth:revocations` muda ou a cada `REVOCATION_POLL_SECONDS` (outros hosts não
+mexem no contador).
+
+A sincronização anda por `created_at`, relendo a janela `REVOCATION_SYNC_OVERLAP_SECONDS`
+antes do cursor: uma linha que ficou visível depois de outra mais nova (commit fora de ordem,
+relógios um pouco diferentes entre hosts) ainda é vista, e reler as que já estão na memória
+não muda nada.
+"""
+import asyncio
+import heapq
+import logging
+import os
+import threading
+import time
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import delete, insert, select
+from sqlalchemy.exc import IntegrityError
+from app.auth.models import RevokedToken
+from app.shared import SharedGenerations, shared_generations
+
+REVOCATION_BACKEND = os.environ.get("REVOCATION_BACKEND", "database").lower()
+REVOCATION_SYNC_SECONDS = float(os.environ.get("REVOCATION_SYNC_SECONDS", "1"))
+REVOCATION_POLL_SECONDS = float(os.environ.get("REVOCATION_POLL_SECONDS", "30"))
+REVOCATION_SYNC_OVERLAP_SECONDS = float(os.environ.get("REVOCATION_SYNC_OVERLAP_SECONDS", "10"))
+REVOCATION_RETRY_SECONDS = 5
+REVOCATION_PURGE_SECONDS = 3600
+
+logger = logging.getLogger(__name__)
+
+
+class RevocationBackend:
+    """Armazenamento persistente das revogações.
+
+    `add` precisa ser atômico entre processos: devolve False se a chave já existia, que é o
+    que a rotação usa para detectar um refresh token reaproveitado.
+    """
+
+    def add(self, token_id: str, expires_at: int) -> bool:
+        raise NotImplementedError
+
+    def since(self, cursor: float, now: int) -> tuple[list[tuple[str, int]], float]:
+        """Entradas ainda válidas gravadas a partir do instante `cursor`, e o `created_at` mais novo."""
+        raise NotImplementedError
+
+    def purge(self, now: int) -> None:
+        raise NotImplementedError
+
+
+class DatabaseRevocationBackend(RevocationBackend):
+    def _engine(self):
+        from database import get_engine
+
+        return get_engine()
+
+    def add(self, token_id, expires_at):
+        try:
+            with self._engine().begin() as conn:
+                conn.execute(insert(RevokedToken).values(token_id=token_id, expires_at=expires_at, created_at=time.time()))
+        except IntegrityError:
+            return False
+        return True
+
+    def since(self, cursor, now):
+        stmt = (
+            select(RevokedToken.created_at, RevokedToken.token_id, RevokedToken.expires_at)
+            .where(RevokedToken.created_at >= cursor, RevokedToken.expires_at > now)
+            .order_by(RevokedToken.created_at, RevokedToken.id)
+        )
+        with self._engine().connect() as conn:
+            rows = conn.execute(stmt).all()
+        return [(token_id, expires_at) for _, token_id, expires_at in rows], rows[-1][0] if rows else cursor
+
+    def purge(self, now):
+        with self._engine().begin() as conn:
+            conn.execute(delete(RevokedToken).where(RevokedToken.expires_at <= now))
+
+
+class RevocationStore:
+    def __init__(self, backend: RevocationBackend | None = None, shared: SharedGenerations | None = None):
+        self.backend = backend
+        self.shared = shared
+        self._expires: dict[str, int] = {}
+        self._heap: list[tuple[int, str]] = []
+        self._lock = threading.Lock()
+        self._cursor = 0.0
+        self._generation = None
+        self._synced_at = 0.0
+        self._retry_at = 0.0
+        self._purged_at = time.time()
+
+    def __len__(self):
+        return len(self._expires)
+
+    def _add_local(self, token_id: str, expires_at: int) -> bool:
+        current = self._expires.get(token_id)
+        if current is not None and current >= expires_at:
+            return False
+        self._expires[token_id] = expires_at
+        heapq.heappush(self._heap, (expires_at, token_id))
+        return current is None
+
+    def _evict(self, now: float):
+        heap = self._heap
+        while heap and heap[0][0] <= now:
+            expires_at, token_id = heapq.heappop(heap)
+            # Entradas regravadas com expiração maior deixam a antiga no heap; só a atual apaga.
+            if self._expires.get(token_id) == expires_at:
+                del self._expires[token_id]
+
+    def _generation_now(self):
+        return self.shared.get("auth:revocations") if self.shared is not None else None
+
+    def _stale(self, now: float) -> bool:
+        if now < self._retry_at:
+            return False
+        return (
+            self._synced_at == 0.0
+            or self._generation_now() != self._generation
+            or now - self._synced_at >= REVOCATION_POLL_SECONDS
+        )
+
+    def load(self) -> bool:
+        """Traz do backend o que outros processos revogaram; bloqueia, então roda no threadpool.
+
+        Falhas só atrasam a propagação: a próxima tentativa vem depois de `REVOCATION_RETRY_SECONDS`.
+        """
+        if self.backend is None:
+            return True
+        now = time.time()
+        # Lido antes da consulta: um bump durante ela deixa o store desatualizado e força outra volta.
+        generation = self._generation_now()
+        try:
+            entries, cursor = self.backend.since(self._cursor - REVOCATION_SYNC_OVERLAP_SECONDS, int(now))
+        except Exception:
+            logger.exception("Falha ao carregar tokens revogados")
+            self._retry_at = now + REVOCATION_RETRY_SECONDS
+            return False
+        with self._lock:
+            for token_id, expires_at in entries:
+                self._add_local(token_id, expires_at)
+            self._evict(now)
+            self._cursor = max(self._cursor, cursor)
+        self._generation = generation
+        self._synced_at = now
+        return True
+
+    async def sync_periodically(self):
+        """Tarefa do lifespan: mantém o store em dia sem que `is_revoked` espere pelo banco."""
+        while True:
+            if self._stale(time.time()):
+                await run_in_threadpool(self.load)
+            await asyncio.sleep(REVOCATION_SYNC_SECONDS)
+
+    def is_revoked(self, *token_ids: str | None) -> bool:
+        now = time.time()
+        expires = self._expires
+        for token_id in token_ids:
+            expires_at = expires.get(token_id) if token_id is not None else None
+            if expires_at is not None and expires_at > now:
+                return True
+        return False
+
+    def revoke(self, token_id: str, expires_at: int) -> bool:
+        """Revoga `token_id` até `expires_at`; devolve False se ele já estava revogado."""
+        now = time.time()
+        if self.backend is not None:
+            added = self.backend.add(token_id, expires_at)
+            if self.shared is not None:
+                self.shared.bump("auth:revocations")
+            if now - self._purged_at >= REVOCATION_PURGE_SECONDS:
+                self._purged_at = now
+                self.backend.purge(int(now))
+        with self._lock:
+            self._evict(now)
+            added_locally = self._add_local(token_id, expires_at)
+        return added if self.backend is not None else added_locally
+
+
+def _backend() -> RevocationBackend | None:
+    if REVOCATION_BACKEND == "memory":
+        return None
+    if REVOCATION_BACKEND == "database":
+        return DatabaseRevocationBackend()
+    raise RuntimeError(f"REVOCATION_BACKEND desconhecido: {REVOCATION_BACKEND}")
+
+
+revocations = RevocationStore(_backend(), shared_generations())
@@ -0,0 +1,205 @@
+"""Compressão das respostas negociada pelo Accept-Encoding (zstd, br, gzip).
+
+Respostas de texto (JSON, NDJSON, CSV) a partir de `COMPRESSION_MIN_BYTES` saem comprimidas
+com o algoritmo de maior `q` que o cliente aceita; no empate vale a ordem de `ENCODINGS`. O
+gzip vem da biblioteca padrão; brotli e zstd só entram com os pacotes `brotli` e `zstandard`
+instalados. Corpos a partir de `COMPRESSION_THREAD_BYTES` são comprimidos no threadpool, para
+não parar o event loop; exports em streaming são comprimidos pedaço a pedaço.
+
+O corpo comprimido é outra representação, então o ETag ganha o sufixo da codificação
+(`"abc"` → `"abc-gzip"`); `strip_encoding` tira o sufixo antes de comparar o If-None-Match. O
+304 repete o ETag com o sufixo quando é essa a versão que o cliente mandou no If-None-Match.
+"""
+import functools
+import gzip
+import os
+import zlib
+from fastapi.concurrency import run_in_threadpool
+from starlette.datastructures import Headers, MutableHeaders
+from app import metrics
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - dependência opcional
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:  # pragma: no cover - dependência opcional
+    zstandard = None
+
+COMPRESSION_ENABLED = os.environ.get("COMPRESSION_ENABLED", "1").lower() in ("1", "true", "yes")
+COMPRESSION_MIN_BYTES = int(os.environ.get("COMPRESSION_MIN_BYTES", "1024"))
+COMPRESSION_THREAD_BYTES = int(os.environ.get("COMPRESSION_THREAD_BYTES", str(256 * 1024)))
+# Níveis rápidos: o corpo é gerado a cada requisição, então CPU por resposta pesa mais que o
+# último ponto percentual de razão de compressão.
+GZIP_LEVEL = int(os.environ.get("COMPRESSION_GZIP_LEVEL", "5"))
+BROTLI_QUALITY = int(os.environ.get("COMPRESSION_BROTLI_QUALITY", "4"))
+ZSTD_LEVEL = int(os.environ.get("COMPRESSION_ZSTD_LEVEL", "3"))
+
+COMPRESSIBLE_TYPES = ("application/json", "application/x-ndjson", "text/")
+
+
+def _gzip_stream():
+    return zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 31)
+
+
+class _BrotliStream:
+    def __init__(self):
+        self._compressor = brotli.Compressor(quality=BROTLI_QUALITY)
+
+    def compress(self, data: bytes) -> bytes:
+        return self._compressor.process(data)
+
+    def flush(self) -> bytes:
+        return self._compressor.finish()
+
+
+def _zstd_compress(data: bytes) -> bytes:
+    # O ZstdCompressor não pode ser usado por duas threads ao mesmo tempo; criar um é barato.
+    return zstandard.ZstdCompressor(level=ZSTD_LEVEL).compress(data)
+
+
+def _zstd_stream():
+    return zstandard.ZstdCompressor(level=ZSTD_LEVEL).compressobj()
+
+
+# Codificação → (compressão de um corpo inteiro, fábrica de compressor incremental), em ordem de preferência.
+ENCODINGS = {}
+if zstandard is not None:
+    ENCODINGS["zstd"] = (_zstd_compress, _zstd_stream)
+if brotli is not None:
+    ENCODINGS["br"] = (lambda data: brotli.compress(data, quality=BROTLI_QUALITY), _BrotliStream)
+ENCODINGS["gzip"] = (lambda data: gzip.compress(data, GZIP_LEVEL, mtime=0), _gzip_stream)
+
+
+@functools.lru_cache(maxsize=256)
+def negotiate(accept_encoding: str) -> str | None:
+    """A codificação disponível que o cliente prefere, ou None (identidade)."""
+    weights = {}
+    for part in accept_encoding.lower().split(","):
+        name, _, params = part.partition(";")
+        weight = 1.0
+        for param in params.split(";"):
+            key, _, value = param.strip().partition("=")
+            if key == "q":
+                try:
+                    weight = float(value)
+                except ValueError:
+                    weight = 0.0
+        if name.strip():
+            weights[name.strip()] = weight
+    best, best_weight = None, 0.0
+    for name in ENCODINGS:
+        weight = weights.get(name, weights.get("*", 0.0))
+        if weight > best_weight:
+            best, best_weight = name, weight
+    return best
+
+
+def strip_encoding(etag: str) -> str:
+    """`"abc-gzip"` → `"abc"`: o ETag da representação sem compressão."""
+    for name in ENCODINGS:
+        suffix = f'-{name}"'
+        if etag.endswith(suffix):
+            return etag[: -len(suffix)] + '"'
+    return etag
+
+
+class CompressionMiddleware:
+    """Middleware ASGI puro: o corpo passa por aqui uma vez, sem o reempacotamento do BaseHTTPMiddleware."""
+
+    def __init__(self, app, minimum_size: int = COMPRESSION_MIN_BYTES, thread_size: int = COMPRESSION_THREAD_BYTES):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.thread_size = thread_size
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        request_headers = Headers(scope=scope)
+        encoding = negotiate(request_headers.get("accept-encoding", ""))
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+        await self.app(scope, receive, _Responder(self, encoding, send, request_headers.get("if-none-match", "")))
+
+
+def _with_encoding(etag: str, encoding: str) -> str:
+    return f'{etag[:-1]}-{encoding}"'
+
+
+class _Responder:
+    def __init__(self, middleware: CompressionMiddleware, encoding: str, send, if_none_match: str = ""):
+        self.middleware = middleware
+        self.encoding = encoding
+        self.if_none_match = if_none_match
+        self.compress, self.stream_factory = ENCODINGS[encoding]
+        self.send = send
+        self.start = None
+        self.stream = None
+        self.passthrough = False
+
+    def _compressible(self, headers: Headers) -> bool:
+        return (
+            self.start["status"] not in (204, 304)
+            and "content-encoding" not in headers
+            and headers.get("content-type", "").startswith(COMPRESSIBLE_TYPES)
+        )
+
+    async def _run(self, func, data: bytes) -> bytes:
+        if len(data) >= self.middleware.thread_size:
+            return await run_in_threadpool(func, data)
+        return func(data)
+
+    def _count(self, raw: int, compressed: int):
+        if metrics.METRICS_ENABLED:
+            metrics.COMPRESSION_BYTES.inc(self.encoding, "entrada", amount=raw)
+            metrics.COMPRESSION_BYTES.inc(self.encoding, "saida", amount=compressed)
+
+    async def __call__(self, message):
+        if message["type"] == "http.response.start":
+            self.start = message
+            return
+        if message["type"] != "http.response.body" or self.passthrough:
+            await self.send(message)
+            return
+
+        body = message.get("body", b"")
+        more_body = message.get("more_body", False)
+        if self.stream is None:
+            headers = MutableHeaders(scope=self.start)
+            if self.start["status"] == 304:
+                # O 304 vale pela representação que o cliente tem: a comprimida, se foi ela que ele validou.
+                etag = headers.get("etag")
+                if etag and etag.endswith('"') and _with_encoding(etag, self.encoding) in self.if_none_match:
+                    headers["ETag"] = _with_encoding(etag, self.encoding)
+            if not self._compressible(headers) or (not more_body and len(body) < self.middleware.minimum_size):
+                self.passthrough = True
+                await self.send(self.start)
+                await self.send(message)
+                return
+            headers["Content-Encoding"] = self.encoding
+            headers.add_vary_header("Accept-Encoding")
+            etag = headers.get("etag")
+            if etag and etag.endswith('"'):
+                headers["ETag"] = _with_encoding(etag, self.encoding)
+            if not more_body:
+                compressed = await self._run(self.compress, body)
+                self._count(len(body), len(compressed))
+                headers["Content-Length"] = str(len(compressed))
+                await self.send(self.start)
+                await self.send({"type": "http.response.body", "body": compressed})
+                return
+            # Streaming: o tamanho final não é conhecido.
+            del headers["Content-Length"]
+            self.stream = self.stream_factory()
+            await self.send(self.start)
+
+        compressed = await self._run(self.stream.compress, body) if body else b""
+        if not more_body:
+            compressed += self.stream.flush()
+        self._count(len(body), len(compressed))
+        if compressed or not more_body:
+            await self.send({"type": "http.response.body", "body": compressed, "more_body": more_body})
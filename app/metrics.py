@@ -0,0 +1,326 @@
+"""Métricas do processo no formato texto do Prometheus.
+
+Contadores e histogramas simples, protegidos por lock, sem dependência externa. O middleware
+em main.py mede as requisições, os hooks de cursor em database.py medem o SQL e
+`TimedQueuePool` mede a espera por conexão do pool.
+
+Com vários workers (`SHARED_STATE_DIR`), cada um grava suas métricas em
+`<SHARED_STATE_DIR>/metrics/<pid>.json` e o /metrics soma contadores e histogramas de todos.
+Gauges não são somados: cada worker aparece com o label `worker` (o pid). O arquivo de um
+worker encerrado tem contadores e histogramas incorporados a `retired.json` (não podem
+diminuir) e é apagado, pelo `child_exit` do gunicorn ou pelo próximo `publish()`.
+"""
+import asyncio
+import bisect
+import fcntl
+import json
+import logging
+import os
+import re
+import threading
+import time
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+from app.shared import SHARED_STATE_DIR
+
+METRICS_ENABLED = os.environ.get("METRICS_ENABLED", "1").lower() in ("1", "true", "yes")
+SLOW_QUERY_MS = float(os.environ.get("SLOW_QUERY_MS", "0"))
+METRICS_PUBLISH_SECONDS = float(os.environ.get("METRICS_PUBLISH_SECONDS", "5"))
+METRICS_DIR = os.path.join(SHARED_STATE_DIR, "metrics") if SHARED_STATE_DIR else None
+if METRICS_DIR:
+    os.makedirs(METRICS_DIR, exist_ok=True)
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+SQL_BUCKETS = (0.0001, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1.0, 5.0)
+COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 25, 50, 100)
+
+slow_query_log = logging.getLogger("app.sql.slow")
+
+
+def _format_labels(names, values):
+    if not names:
+        return ""
+    pairs = ",".join(f'{name}="{_escape(value)}"' for name, value in zip(names, values))
+    return "{" + pairs + "}"
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_value(value) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labels=()):
+        self.name = name
+        self.documentation = documentation
+        self.labels = tuple(labels)
+        self._values: dict[tuple, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *label_values, amount: float = 1):
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0) + amount
+
+    def collect(self) -> dict:
+        with self._lock:
+            return dict(self._values)
+
+    @staticmethod
+    def merge(left, right):
+        return left + right
+
+    def samples(self, values):
+        for label_values, value in sorted(values.items()):
+            yield f"{self.name}{_format_labels(self.labels, label_values)} {_format_value(value)}"
+
+
+class Histogram:
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labels=(), buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labels = tuple(labels)
+        self.buckets = tuple(buckets)
+        # Por combinação de labels: [contagem por bucket..., soma, total].
+        self._values: dict[tuple, list] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, *label_values):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            state = self._values.get(label_values)
+            if state is None:
+                state = self._values[label_values] = [0] * (len(self.buckets) + 1) + [0.0, 0]
+            state[index] += 1
+            state[-2] += value
+            state[-1] += 1
+
+    def collect(self) -> dict:
+        with self._lock:
+            return {key: list(state) for key, state in self._values.items()}
+
+    @staticmethod
+    def merge(left, right):
+        return [a + b for a, b in zip(left, right)]
+
+    def samples(self, values):
+        names = (*self.labels, "le")
+        for label_values, state in sorted(values.items()):
+            cumulative = 0
+            for bound, count in zip((*self.buckets, float("inf")), state):
+                cumulative += count
+                labels = _format_labels(names, (*label_values, _format_value(bound)))
+                yield f"{self.name}_bucket{labels} {cumulative}"
+            labels = _format_labels(self.labels, label_values)
+            yield f"{self.name}_sum{labels} {_format_value(state[-2])}"
+            yield f"{self.name}_count{labels} {state[-1]}"
+
+
+class Gauge:
+    """Valor lido na hora da coleta; `func` devolve um número ou {labels: número}."""
+
+    kind = "gauge"
+
+    def __init__(self, name: str, documentation: str, func, labels=()):
+        self.name = name
+        self.documentation = documentation
+        self.labels = tuple(labels)
+        self.func = func
+
+    def collect(self) -> dict:
+        values = self.func()
+        return values if isinstance(values, dict) else {(): values}
+
+    def samples(self, values):
+        # Com vários workers, `_collect_all` acrescenta o pid de cada um no fim das chaves.
+        labels = (*self.labels, "worker") if METRICS_DIR else self.labels
+        for label_values, value in sorted(values.items()):
+            yield f"{self.name}{_format_labels(labels, label_values)} {_format_value(value)}"
+
+
+REGISTRY = []
+
+
+def register(metric):
+    REGISTRY.append(metric)
+    return metric
+
+
+REQUESTS = register(Counter("http_requests_total", "Requisições HTTP atendidas.", ("method", "route", "status")))
+REQUEST_DURATION = register(Histogram("http_request_duration_seconds", "Latência das requisições HTTP.", ("method", "route")))
+REQUEST_SQL_STATEMENTS = register(Histogram("http_request_sql_statements", "Comandos SQL por requisição.", ("route",), COUNT_BUCKETS))
+REQUEST_SQL_SECONDS = register(Counter("http_request_sql_seconds_total", "Tempo gasto em SQL pelas requisições de cada rota.", ("route",)))
+SQL_DURATION = register(Histogram("db_statement_duration_seconds", "Duração de cada comando SQL.", (), SQL_BUCKETS))
+SQL_ROWS = register(Counter("db_rows_total", "Linhas informadas pelo driver (rowcount) nos comandos SQL."))
+SLOW_STATEMENTS = register(Counter("db_slow_statements_total", "Comandos SQL acima de SLOW_QUERY_MS."))
+POOL_CHECKOUT = register(Histogram("db_pool_checkout_seconds", "Espera para obter uma conexão do pool.", (), SQL_BUCKETS))
+PASSWORD_HASH = register(Histogram("password_hash_seconds", "Tempo de bcrypt no pool de workers.", ("operation",)))
+LOGIN_THROTTLED = register(Counter("auth_login_throttled_total", "Tentativas de login barradas pelo limite.", ("bucket",)))
+WRITE_BEHIND_FLUSH = register(Histogram("write_behind_flush_seconds", "Duração de cada gravação em lote da fila write-behind.", ("queue",)))
+WRITE_BEHIND_ROWS = register(Counter("write_behind_rows_total", "Itens da fila write-behind por destino (gravado, recusado, descartado).", ("queue", "status")))
+COMPRESSION_BYTES = register(Counter("http_compression_bytes_total", "Bytes antes (entrada) e depois (saida) da compressão das respostas.", ("encoding", "direction")))
+
+
+RETIRED = "retired"
+
+
+def _pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+def snapshot() -> dict:
+    return {metric.name: {json.dumps(list(key)): value for key, value in metric.collect().items()} for metric in REGISTRY}
+
+
+def _load(path: str) -> dict | None:
+    try:
+        with open(path) as file:
+            return json.load(file)
+    except (OSError, ValueError):
+        return None
+
+
+def _write(path: str, data: dict):
+    temporary = f"{path}.{os.getpid()}.tmp"
+    with open(temporary, "w") as file:
+        json.dump(data, file)
+    os.replace(temporary, path)
+
+
+def retire(pid: int):
+    """Incorpora contadores e histogramas de um worker encerrado a `retired.json` e apaga o arquivo dele."""
+    if not METRICS_DIR:
+        return
+    with open(os.path.join(METRICS_DIR, "retire.lock"), "a") as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        path = os.path.join(METRICS_DIR, f"{pid}.json")
+        data = _load(path)
+        if data is None:
+            return
+        retired_path = os.path.join(METRICS_DIR, f"{RETIRED}.json")
+        retired = _load(retired_path) or {}
+        for metric in REGISTRY:
+            if metric.kind == "gauge":
+                continue
+            values = retired.setdefault(metric.name, {})
+            for key, value in data.get(metric.name, {}).items():
+                values[key] = metric.merge(values[key], value) if key in values else value
+        _write(retired_path, retired)
+        os.remove(path)
+
+
+def _retire_dead_workers():
+    for file_name in os.listdir(METRICS_DIR):
+        worker = file_name[:-5]
+        if file_name.endswith(".json") and worker.isdigit() and not _pid_alive(int(worker)):
+            retire(int(worker))
+
+
+def publish():
+    """Grava as métricas deste worker para que o /metrics de qualquer worker as some."""
+    if not METRICS_DIR:
+        return
+    _write(os.path.join(METRICS_DIR, f"{os.getpid()}.json"), snapshot())
+    _retire_dead_workers()
+
+
+def _collect_all() -> dict:
+    if not METRICS_DIR:
+        return {metric.name: metric.collect() for metric in REGISTRY}
+
+    publish()
+    merged = {metric.name: {} for metric in REGISTRY}
+    for file_name in os.listdir(METRICS_DIR):
+        if not file_name.endswith(".json"):
+            continue
+        data = _load(os.path.join(METRICS_DIR, file_name))
+        if data is None:
+            continue
+        worker = file_name[:-5]
+        for metric in REGISTRY:
+            values = merged[metric.name]
+            for key, value in data.get(metric.name, {}).items():
+                key = tuple(json.loads(key))
+                if metric.kind == "gauge":
+                    values[(*key, worker)] = value
+                else:
+                    values[key] = metric.merge(values[key], value) if key in values else value
+    return merged
+
+
+def render() -> str:
+    values = _collect_all()
+    lines = []
+    for metric in REGISTRY:
+        lines.append(f"# HELP {metric.name} {metric.documentation}")
+        lines.append(f"# TYPE {metric.name} {metric.kind}")
+        lines.extend(metric.samples(values[metric.name]))
+    return "\n".join(lines) + "\n"
+
+
+async def publish_periodically():
+    """Tarefa do lifespan: mantém o arquivo deste worker atualizado enquanto ele roda."""
+    try:
+        while True:
+            await asyncio.sleep(METRICS_PUBLISH_SECONDS)
+            publish()
+    finally:
+        publish()
+
+
+_LITERALS = re.compile(r"'(?:[^']|'')*'|%\(\w+\)s|\$\d+|\b\d+(?:\.\d+)?\b")
+_LISTS = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+_SPACES = re.compile(r"\s+")
+
+
+def normalize_statement(statement: str) -> str:
+    """Tira literais, listas de parâmetros e espaços extras para agrupar consultas iguais."""
+    statement = _LITERALS.sub("?", statement)
+    statement = _LISTS.sub("(?)", statement)
+    return _SPACES.sub(" ", statement).strip()
+
+
+def observe_statement(seconds: float, rowcount: int, statement: str):
+    SQL_DURATION.observe(seconds)
+    if rowcount > 0:
+        SQL_ROWS.inc(amount=rowcount)
+    if SLOW_QUERY_MS and seconds * 1000 >= SLOW_QUERY_MS:
+        SLOW_STATEMENTS.inc()
+        slow_query_log.warning("%.1f ms: %s", seconds * 1000, normalize_statement(statement))
+
+
+def observe_request(method: str, route: str, status_code: int, seconds: float, statements: int, sql_seconds: float):
+    REQUESTS.inc(method, route, str(status_code))
+    REQUEST_DURATION.observe(seconds, method, route)
+    REQUEST_SQL_STATEMENTS.observe(statements, route)
+    REQUEST_SQL_SECONDS.inc(route, amount=sql_seconds)
+
+
+class _TimedCheckout:
+    def connect(self):
+        start = time.perf_counter()
+        try:
+            return super().connect()
+        finally:
+            POOL_CHECKOUT.observe(time.perf_counter() - start)
+
+
+class TimedQueuePool(_TimedCheckout, QueuePool):
+    pass
+
+
+class TimedAsyncQueuePool(_TimedCheckout, AsyncAdaptedQueuePool):
+    pass
@@ -0,0 +1,122 @@
+"""Estado compartilhado entre os processos workers (ver gunicorn.conf.py).
+
+Com `SHARED_STATE_DIR` definido, os caches publicam as invalidações em contadores de geração
+num arquivo mapeado em memória, o limite de tentativas de login guarda os baldes de fichas
+num arquivo do mesmo tipo, e as métricas de cada worker são somadas no /metrics. Sem a
+variável (um processo só) nada disso é usado.
+"""
+import fcntl
+import mmap
+import os
+import struct
+import threading
+import zlib
+
+SHARED_STATE_DIR = os.environ.get("SHARED_STATE_DIR")
+
+
+class SharedGenerations:
+    """Contadores de 64 bits, um slot por nome (hash); colisões só causam invalidações extras."""
+
+    SLOTS = 4096
+    SLOT_SIZE = 8
+
+    def __init__(self, path: str):
+        size = self.SLOTS * self.SLOT_SIZE
+        self._fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o600)
+        if os.fstat(self._fd).st_size < size:
+            os.ftruncate(self._fd, size)
+        self._map = mmap.mmap(self._fd, size)
+
+    def _offset(self, name: str) -> int:
+        return zlib.crc32(name.encode()) % self.SLOTS * self.SLOT_SIZE
+
+    def get(self, name: str) -> int:
+        return struct.unpack_from("Q", self._map, self._offset(name))[0]
+
+    def bump(self, name: str) -> int:
+        offset = self._offset(name)
+        # O lock de registro cobre só o slot, então incrementos em slots diferentes não competem.
+        fcntl.lockf(self._fd, fcntl.LOCK_EX, self.SLOT_SIZE, offset)
+        try:
+            value = struct.unpack_from("Q", self._map, offset)[0] + 1
+            struct.pack_into("Q", self._map, offset, value)
+            return value
+        finally:
+            fcntl.lockf(self._fd, fcntl.LOCK_UN, self.SLOT_SIZE, offset)
+
+
+class SharedBuckets:
+    """Token buckets num arquivo mapeado: por slot, (fichas, instante da última atualização).
+
+    Chaves que caem no mesmo slot dividem o balde, o que só deixa o limite mais restrito.
+    """
+
+    SLOTS = 65536
+    SLOT_SIZE = 16
+
+    def __init__(self, path: str):
+        size = self.SLOTS * self.SLOT_SIZE
+        self._fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o600)
+        if os.fstat(self._fd).st_size < size:
+            os.ftruncate(self._fd, size)
+        self._map = mmap.mmap(self._fd, size)
+
+    def update(self, key: str, func):
+        """Aplica `func(estado) -> (novo_estado, resultado)` sob o lock do slot; estado vazio é None."""
+        offset = zlib.crc32(key.encode()) % self.SLOTS * self.SLOT_SIZE
+        fcntl.lockf(self._fd, fcntl.LOCK_EX, self.SLOT_SIZE, offset)
+        try:
+            tokens, updated_at = struct.unpack_from("dd", self._map, offset)
+            state, result = func((tokens, updated_at) if updated_at else None)
+            struct.pack_into("dd", self._map, offset, *state)
+            return result
+        finally:
+            fcntl.lockf(self._fd, fcntl.LOCK_UN, self.SLOT_SIZE, offset)
+
+
+_generations = None
+_buckets = None
+_lock = threading.Lock()
+
+
+def shared_generations() -> SharedGenerations | None:
+    global _generations
+    if not SHARED_STATE_DIR:
+        return None
+    if _generations is None:
+        with _lock:
+            if _generations is None:
+                _generations = SharedGenerations(os.path.join(SHARED_STATE_DIR, "generations"))
+    return _generations
+
+
+def shared_token() -> str | None:
+    """Valor aleatório do diretório compartilhado, o mesmo em todos os workers que o usam."""
+    if not SHARED_STATE_DIR:
+        return None
+    path = os.path.join(SHARED_STATE_DIR, "token")
+    if not os.path.exists(path):
+        # O link é atômico: se dois workers sobem juntos, vale o primeiro e o outro lê o dele.
+        temp = f"{path}.{os.getpid()}"
+        with open(temp, "w") as file:
+            file.write(os.urandom(8).hex())
+        try:
+            os.link(temp, path)
+        except FileExistsError:
+            pass
+        finally:
+            os.unlink(temp)
+    with open(path) as file:
+        return file.read()
+
+
+def shared_buckets() -> SharedBuckets | None:
+    global _buckets
+    if not SHARED_STATE_DIR:
+        return None
+    if _buckets is None:
+        with _lock:
+            if _buckets is None:
+                _buckets = SharedBuckets(os.path.join(SHARED_STATE_DIR, "buckets"))
+    return _buckets
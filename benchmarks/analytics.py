@@ -0,0 +1,125 @@
+"""Relatórios do frame NumPy contra o SQL equivalente executado a cada requisição.
+
+    python -m benchmarks.analytics --empresas 250000   # 1M linhas de faturamento
+
+Mede a carga completa do frame, a atualização incremental após escritas e, para cada
+relatório, a mediana por chamada; confere também que os dois caminhos dão o mesmo resultado.
+"""
+import argparse
+import math
+import statistics
+import time
+
+from sqlalchemy import func, select, update
+from sqlalchemy.orm import Session
+
+from app.api import analytics, endpoints
+from app.api import models as api_models
+from app.api.responses import rows_as_dicts
+from benchmarks.common import engine, seed
+
+Empresas = api_models.Empresas
+Faturamento = api_models.Faturamento
+Resumo = api_models.EmpresaResumo
+
+
+def sql_ranking(db, n, descending):
+    stmt = endpoints.melhores_diretores_stmt(n) if descending else endpoints.piores_diretores_stmt(n)
+    return rows_as_dicts(db.execute(stmt), ["diretor_empresa", "faturamento_anual"])
+
+
+def sql_percentis(db, ps):
+    column = Faturamento.faturamento_anual
+    if db.get_bind().dialect.name == "postgresql":
+        values = db.execute(select(*(func.percentile_cont(p / 100).within_group(column) for p in ps))).one()
+        return dict(zip(ps, values))
+    # Sem percentile_cont: interpolação linear entre as duas linhas vizinhas de cada posição.
+    total = db.execute(select(func.count(column))).scalar()
+    resultado = {}
+    for p in ps:
+        position = (total - 1) * p / 100
+        lower, upper, *_ = db.execute(select(column).where(column.is_not(None)).order_by(column).limit(2).offset(math.floor(position))).scalars().all() + [None]
+        resultado[p] = lower + (upper - lower) * (position - math.floor(position)) if upper is not None else lower
+    return resultado
+
+
+def sql_zscores(db, limite, n):
+    column = Faturamento.faturamento_anual
+    mean, mean_sq = db.execute(select(func.avg(column), func.avg(column * column))).one()
+    std = math.sqrt(mean_sq - mean * mean)
+    distance = func.abs(column - mean)
+    stmt = select(Faturamento.id_faturamento).where(distance >= limite * std).order_by(distance.desc(), Faturamento.id_faturamento).limit(n)
+    return db.execute(stmt).scalars().all()
+
+
+def sql_pearson(db):
+    totais = (
+        select(Faturamento.id_empresa, func.sum(Faturamento.faturamento_anual).label("total"))
+        .join(Empresas, Empresas.id_empresa == Faturamento.id_empresa)
+        .where(Faturamento.faturamento_anual.is_not(None))
+        .group_by(Faturamento.id_empresa)
+        .subquery()
+    )
+    x = totais.c.total
+    y = Resumo.soma_nota_geral * 1.0 / Resumo.n_nota_geral
+    n, sx, sy, sxy, sxx, syy = db.execute(
+        select(func.count(), func.sum(x), func.sum(y), func.sum(x * y), func.sum(x * x), func.sum(y * y))
+        .select_from(totais).join(Resumo, Resumo.id_empresa == totais.c.id_empresa).where(Resumo.n_nota_geral > 0)
+    ).one()
+    return (n * sxy - sx * sy) / math.sqrt((n * sxx - sx * sx) * (n * syy - sy * sy))
+
+
+def timed(func, repeat):
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples), result
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--empresas", type=int, default=250_000)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--changed-rows", type=int, default=100)
+    args = parser.parse_args()
+
+    seed(args.empresas, vendas_por_faturamento=1)
+    ps = [25, 50, 75, 90, 99]
+    with Session(engine) as db:
+        start = time.perf_counter()
+        frame = analytics.report_frame.get(db)
+        load_ms = (time.perf_counter() - start) * 1000
+        megabytes = sum(getattr(frame, name).nbytes for name in frame.__dataclass_fields__) / 2**20
+        print(f"frame: {len(frame.fat_id):,} faturamentos, {len(frame.emp_id):,} empresas, carga {load_ms:.0f} ms, {megabytes:.0f} MiB (sem as strings)")
+
+        casos = [
+            ("piores 10", lambda: sql_ranking(db, 10, False), lambda: analytics.ranking(frame, 10, False), lambda a, b: a == b),
+            ("melhores 10", lambda: sql_ranking(db, 10, True), lambda: analytics.ranking(frame, 10, True), lambda a, b: a == b),
+            ("percentis", lambda: sql_percentis(db, ps), lambda: analytics.percentis(frame, "faturamento_anual", ps),
+             lambda a, b: all(math.isclose(a[p], b["percentis"][f"p{p:g}"], rel_tol=1e-9) for p in ps)),
+            ("z-scores |z|>=1.7", lambda: sql_zscores(db, 1.7, 100), lambda: analytics.zscores(frame, "faturamento_anual", 1.7, 100),
+             lambda a, b: a == [row["id_faturamento"] for row in b]),
+            ("correlação (pearson)", lambda: sql_pearson(db), lambda: analytics.correlacoes(frame),
+             lambda a, b: math.isclose(a, b[0]["pearson"], rel_tol=1e-6, abs_tol=1e-9)),
+        ]
+        print(f"{'relatório':<22} {'SQL ms':>9} {'frame ms':>9} {'ganho':>8}  resultado")
+        for name, sql, vectorized, same in casos:
+            sql_ms, expected = timed(sql, args.repeat)
+            frame_ms, actual = timed(vectorized, args.repeat)
+            print(f"{name:<22} {sql_ms:>9.2f} {frame_ms:>9.2f} {sql_ms / frame_ms:>7.0f}x  {'igual' if same(expected, actual) else 'DIFERENTE'}")
+
+        ids = list(range(1, len(frame.fat_id) + 1, max(1, len(frame.fat_id) // args.changed_rows)))[:args.changed_rows]
+        db.execute(update(Faturamento).where(Faturamento.id_faturamento.in_(ids)).values(faturamento_anual=Faturamento.faturamento_anual * 2))
+        db.commit()
+        analytics.report_frame.notify_faturamento(ids)
+        analytics.response_cache.invalidate("faturamento")
+        start = time.perf_counter()
+        frame = analytics.report_frame.get(db)
+        print(f"atualização incremental de {len(ids)} linhas: {(time.perf_counter() - start) * 1000:.0f} ms"
+              f" ({'igual à carga completa' if analytics.ranking(frame, 10, True) == sql_ranking(db, 10, True) else 'DIFERENTE'})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+"""Requisições/s do modo síncrono (threadpool) contra o modo DB_ASYNC=1.
+
+    python -m benchmarks.async_mode --requests 2000 --concurrency 100
+
+Cada modo roda num subprocesso, porque o modo é escolhido na importação de database.py.
+"""
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import time
+
+import httpx
+
+
+async def _load(requests: int, concurrency: int):
+    from benchmarks.common import app, client
+
+    headers = dict(client().headers)
+    semaphore = asyncio.Semaphore(concurrency)
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", headers=headers) as http:
+        async def one(i):
+            async with semaphore:
+                response = await http.get("/api/empresas/", params={"limit": 20, "fields": "nome_empresa"})
+                response.raise_for_status()
+
+        await one(0)
+        start = time.perf_counter()
+        await asyncio.gather(*(one(i) for i in range(requests)))
+        return requests / (time.perf_counter() - start)
+
+
+def worker(args):
+    from benchmarks.common import seed
+
+    seed(args.empresas)
+    print(json.dumps({"rps": asyncio.run(_load(args.requests, args.concurrency))}))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=2_000)
+    parser.add_argument("--concurrency", type=int, default=100)
+    parser.add_argument("--empresas", type=int, default=1_000)
+    parser.add_argument("--worker", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        return worker(args)
+
+    for label, flag in (("sync ", ""), ("async", "1")):
+        env = {**os.environ, "DB_ASYNC": flag}
+        output = subprocess.run(
+            [sys.executable, "-m", "benchmarks.async_mode", "--worker", "--requests", str(args.requests),
+             "--concurrency", str(args.concurrency), "--empresas", str(args.empresas)],
+            env=env, check=True, capture_output=True, text=True,
+        ).stdout
+        rps = json.loads(output.strip().splitlines()[-1])["rps"]
+        print(f"{label}: {rps:8.1f} req/s")
+
+
+if __name__ == "__main__":
+    main()
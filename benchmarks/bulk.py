@@ -0,0 +1,40 @@
+"""Linhas/s do POST unitário contra o endpoint em lote.
+
+    python -m benchmarks.bulk --rows 2000
+"""
+import argparse
+import time
+
+from benchmarks.common import client, seed
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=2_000)
+    parser.add_argument("--empresas", type=int, default=100)
+    args = parser.parse_args()
+
+    rows = [
+        {"id_empresa": i % args.empresas + 1, "nota_diretor": i % 10, "nota_geral_empresa": (i * 7) % 10, "comentario": "carga"}
+        for i in range(args.rows)
+    ]
+
+    seed(args.empresas)
+    with client() as http:
+        start = time.perf_counter()
+        for row in rows:
+            http.post("/api/avaliacoes/", json=row).raise_for_status()
+        unitario = args.rows / (time.perf_counter() - start)
+
+        start = time.perf_counter()
+        response = http.post("/api/avaliacoes/bulk", json=rows)
+        response.raise_for_status()
+        lote = args.rows / (time.perf_counter() - start)
+        assert response.json()["criados"] == args.rows
+
+    print(f"POST unitário: {unitario:10.1f} linhas/s")
+    print(f"POST em lote : {lote:10.1f} linhas/s ({lote / unitario:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,171 @@
+"""Banco, dados e cliente compartilhados pelos benchmarks.
+
+O banco vem de `--database-url` ou BENCH_DATABASE_URL, nunca do DATABASE_URL da aplicação:
+`reset_database` apaga todas as tabelas. Sem nenhum dos dois, é um SQLite temporário. Fora de
+um SQLite no diretório temporário, apagar exige `--yes-drop` (ou BENCH_YES_DROP=1):
+
+    python -m benchmarks.suite run --database-url postgresql+psycopg2://bench@localhost/bench --yes-drop
+"""
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from sqlalchemy.engine import make_url
+
+
+def _pop_argument(name: str, with_value: bool = False):
+    # Opções comuns a todos os benchmarks: saem de sys.argv antes do argparse de cada um.
+    args = sys.argv
+    for index in range(1, len(args)):
+        if args[index] == name and (not with_value or index + 1 < len(args)):
+            value = args[index + 1] if with_value else True
+            del args[index:index + 1 + with_value]
+            return value
+        if with_value and args[index].startswith(name + "="):
+            return args.pop(index).partition("=")[2]
+    return None
+
+
+def is_temporary_database(url: str) -> bool:
+    """SQLite em memória ou num arquivo dentro do diretório temporário do sistema."""
+    parsed = make_url(url)
+    if parsed.get_backend_name() != "sqlite":
+        return False
+    if not parsed.database or parsed.database == ":memory:":
+        return True
+    return os.path.realpath(parsed.database).startswith(os.path.realpath(tempfile.gettempdir()) + os.sep)
+
+
+_DB_DIR = tempfile.mkdtemp(prefix="api-bench-")
+BENCH_DATABASE_URL = (
+    _pop_argument("--database-url", with_value=True)
+    or os.environ.get("BENCH_DATABASE_URL")
+    or f"sqlite:///{os.path.join(_DB_DIR, 'bench.db')}"
+)
+BENCH_YES_DROP = bool(_pop_argument("--yes-drop")) or os.environ.get("BENCH_YES_DROP", "").lower() in ("1", "true", "yes")
+# Subprocessos (workers, gunicorn) herdam o mesmo banco e a mesma confirmação.
+os.environ["BENCH_DATABASE_URL"] = os.environ["DATABASE_URL"] = BENCH_DATABASE_URL
+if BENCH_YES_DROP:
+    os.environ["BENCH_YES_DROP"] = "1"
+
+from fastapi.testclient import TestClient  # noqa: E402
+from sqlalchemy import insert  # noqa: E402
+from sqlalchemy.orm import Session  # noqa: E402
+
+import migrations  # noqa: E402
+from app.api import aggregates, models as api_models  # noqa: E402
+from app.auth.auth import create_access_token, hash_password  # noqa: E402
+from app.auth.models import User  # noqa: E402
+from database import Base, engine  # noqa: E402
+from main import app  # noqa: E402
+
+BENCH_EMAIL = "bench@example.com"
+PERIODO_INICIO = 2021
+PERIODO_MESES = 48
+
+
+def reset_database():
+    if not (BENCH_YES_DROP or is_temporary_database(BENCH_DATABASE_URL)):
+        shown = make_url(BENCH_DATABASE_URL).render_as_string(hide_password=True)
+        raise RuntimeError(f"reset_database apagaria as tabelas de {shown}; confirme com --yes-drop (ou BENCH_YES_DROP=1).")
+    Base.metadata.drop_all(bind=engine)
+    migrations.metadata.drop_all(bind=engine)
+    migrations.upgrade(engine)
+    with engine.begin() as conn:
+        conn.execute(insert(User).values(email=BENCH_EMAIL, hashed_password=hash_password("bench")))
+
+
+def _periodo(offset: int) -> dict:
+    return {"ano": PERIODO_INICIO + offset // 12, "mes": offset % 12 + 1}
+
+
+ROWS_PER_CHUNK = 50_000
+
+
+def _insert_chunks(conn, model, rows):
+    """Insere um gerador de linhas em lotes, sem montar a tabela inteira na memória."""
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) == ROWS_PER_CHUNK:
+            conn.execute(insert(model), chunk)
+            chunk = []
+    if chunk:
+        conn.execute(insert(model), chunk)
+
+
+def rows_per_empresa(faturamentos_por_empresa: int = 4, vendas_por_faturamento: int = 3) -> int:
+    """Linhas geradas por empresa em todas as tabelas; converte um total de linhas em `empresas`."""
+    return 1 + faturamentos_por_empresa * (1 + vendas_por_faturamento) + 2 + 2
+
+
+def seed(empresas: int, faturamentos_por_empresa: int = 4, vendas_por_faturamento: int = 3, seed_value: int = 42):
+    rng = random.Random(seed_value)
+    reset_database()
+    total_faturamentos = empresas * faturamentos_por_empresa
+    # Só o período de cada faturamento fica na memória: as vendas herdam ano e mês dele.
+    periodos = []
+
+    def faturamentos():
+        for i in range(1, total_faturamentos + 1):
+            row = {"id_faturamento": i, "id_empresa": (i - 1) // faturamentos_por_empresa + 1,
+                   "faturamento_mensal": rng.uniform(1e3, 1e5), "faturamento_anual": rng.uniform(1e4, 1e6),
+                   **_periodo(rng.randrange(PERIODO_MESES))}
+            periodos.append((row["ano"], row["mes"]))
+            yield row
+
+    def vendas():
+        for i in range(1, total_faturamentos * vendas_por_faturamento + 1):
+            ano, mes = periodos[(i - 1) // vendas_por_faturamento]
+            yield {"id_venda": i, "id_faturamento": (i - 1) // vendas_por_faturamento + 1,
+                   "nome_produto": f"Produto {i % 500}", "produtos_vendidos": rng.randint(1, 1000), "ano": ano, "mes": mes}
+
+    with engine.begin() as conn:
+        _insert_chunks(conn, api_models.Empresas, (
+            {"id_empresa": i, "nome_empresa": f"Empresa {i}", "diretor_empresa": f"Diretor {i % 997}"}
+            for i in range(1, empresas + 1)
+        ))
+        _insert_chunks(conn, api_models.Faturamento, faturamentos())
+        _insert_chunks(conn, api_models.ProdutosVendidos, vendas())
+        _insert_chunks(conn, api_models.DetalhesProdutos, (
+            {"id_produto": i, "id_empresa": (i - 1) // 2 + 1, "nome_produto": f"Produto {i % 500}",
+             "categoria": f"Categoria {i % 20}", "preco_unitario": rng.uniform(1, 500),
+             "margem_lucro_percentual": rng.uniform(1, 60), "data_lancamento": None}
+            for i in range(1, empresas * 2 + 1)
+        ))
+        _insert_chunks(conn, api_models.AvaliacoesDiretorEmpresa, (
+            {"id_avaliacao": i, "id_empresa": (i - 1) // 2 + 1, "nota_diretor": rng.randint(0, 10),
+             "nota_geral_empresa": rng.randint(0, 10), "comentario": "ok"}
+            for i in range(1, empresas * 2 + 1)
+        ))
+    with Session(engine) as db:
+        aggregates.refresh_empresas(db)
+        db.commit()
+
+
+def client():
+    token = create_access_token(data={"sub": BENCH_EMAIL})
+    return TestClient(app, headers={"Authorization": f"Bearer {token}"})
+
+
+def measure(http, method: str, url: str, repeat: int = 20, **kwargs):
+    latencies = []
+    tracemalloc.start()
+    for _ in range(repeat):
+        start = time.perf_counter()
+        response = http.request(method, url, **kwargs)
+        latencies.append((time.perf_counter() - start) * 1000)
+        response.raise_for_status()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    latencies.sort()
+    return {
+        "p50_ms": statistics.median(latencies),
+        "p99_ms": latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))],
+        "peak_kib": peak / 1024,
+        "bytes": len(response.content),
+    }
@@ -0,0 +1,76 @@
+"""Bytes na rede e CPU por resposta com cada Accept-Encoding, e o ganho do GET condicional.
+
+    python -m benchmarks.compression --empresas 5000 --repeat 30
+
+Para cada rota e codificação disponível (identity, gzip e, com os pacotes instalados, br e
+zstd) mede p50, CPU do processo por resposta (servidor e cliente no mesmo processo; o corpo é
+lido cru, sem descomprimir) e bytes de corpo e cabeçalhos. Depois repete os relatórios com o
+If-None-Match do ETag recebido: 304 sem corpo, sem SQL e sem consultar o cache.
+"""
+import argparse
+import statistics
+import time
+
+from app.compression import ENCODINGS
+from benchmarks.common import client, seed
+
+ROTAS = [
+    ("/api/empresas/", {"limit": 1000, "expand": "faturamentos,avaliacoes"}),
+    ("/api/faturamento/", {"limit": 1000}),
+    ("/api/produtos/", {"format": "ndjson"}),
+    ("/api/insights/maior_lucro/", {}),
+    ("/api/dashboard/", {}),
+]
+CONDICIONAIS = ["/api/insights/maior_lucro/", "/api/faturamento_mensal_por_empresa/", "/api/dashboard/"]
+
+
+def medir(http, url, params, repeat, headers):
+    latencies, wire = [], 0
+    cpu = time.process_time()
+    for _ in range(repeat):
+        start = time.perf_counter()
+        with http.stream("GET", url, params=params, headers=headers) as response:
+            body = sum(len(chunk) for chunk in response.iter_raw())
+        latencies.append((time.perf_counter() - start) * 1000)
+        if response.status_code not in (200, 304):
+            raise RuntimeError(f"{url}: status {response.status_code}")
+        wire = body + sum(len(key) + len(value) + 4 for key, value in response.headers.raw)
+    return {
+        "p50_ms": statistics.median(latencies),
+        "cpu_ms": (time.process_time() - cpu) * 1000 / repeat,
+        "bytes": wire,
+        "status": response.status_code,
+        "sql": response.headers.get("x-sql-statements", "-"),
+        "etag": response.headers.get("etag"),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--empresas", type=int, default=5_000)
+    parser.add_argument("--repeat", type=int, default=30)
+    args = parser.parse_args()
+
+    seed(args.empresas)
+    encodings = ["identity", *ENCODINGS]
+    with client() as http:
+        print(f"{'rota':<38} {'codificação':<11} {'p50 ms':>8} {'CPU ms':>8} {'bytes':>10} {'razão':>7}")
+        for url, params in ROTAS:
+            http.get(url, params=params).raise_for_status()
+            identity = None
+            for encoding in encodings:
+                result = medir(http, url, params, args.repeat, {"Accept-Encoding": encoding})
+                identity = identity or result
+                print(f"{url:<38} {encoding:<11} {result['p50_ms']:>8.2f} {result['cpu_ms']:>8.2f} {result['bytes']:>10} {identity['bytes'] / result['bytes']:>6.1f}x")
+
+        print(f"\n{'rota':<38} {'requisição':<14} {'status':>6} {'p50 ms':>8} {'CPU ms':>8} {'bytes':>10} {'SQL':>4}")
+        for url in CONDICIONAIS:
+            headers = {"Accept-Encoding": ", ".join(ENCODINGS)}
+            completa = medir(http, url, {}, args.repeat, headers)
+            condicional = medir(http, url, {}, args.repeat, {**headers, "If-None-Match": completa["etag"]})
+            for nome, result in (("completa", completa), ("If-None-Match", condicional)):
+                print(f"{url:<38} {nome:<14} {result['status']:>6} {result['p50_ms']:>8.2f} {result['cpu_ms']:>8.2f} {result['bytes']:>10} {result['sql']:>4}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+"""Uma visualização do dashboard: oito requisições aos endpoints contra uma a /api/dashboard/.
+
+    python -m benchmarks.dashboard --empresas 20000 --views 30
+    DB_ASYNC=1 python -m benchmarks.dashboard
+
+As oito requisições saem em paralelo, como num navegador. Mede a latência da visualização, o
+CPU do processo, os comandos SQL e as conexões tiradas do pool por visualização, com o cache
+de respostas desligado (tudo calculado) e ligado (tudo em cache).
+"""
+import argparse
+import asyncio
+import statistics
+import time
+
+import httpx
+from sqlalchemy import event
+from sqlalchemy.pool import Pool
+
+from app.api.cache import response_cache
+from benchmarks.common import app, client, seed
+
+PAGINA = {
+    "insights": "/api/insights/",
+    "maior_lucro": "/api/insights/maior_lucro/",
+    "media_notas_diretor": "/api/media_notas_diretor/",
+    "pioresdiretores": "/api/pioresdiretores/",
+    "melhoresdiretores": "/api/melhoresdiretores/",
+    "faturamento_mensal_por_empresa": "/api/faturamento_mensal_por_empresa/",
+    "faturamento_por_produto": "/api/faturamento_por_produto",
+    "correlacoes": "/api/analytics/correlacoes/",
+}
+
+checkouts = [0]
+event.listen(Pool, "checkout", lambda *args: checkouts.__setitem__(0, checkouts[0] + 1))
+
+
+async def view(http, modo):
+    if modo == "endpoints":
+        responses = await asyncio.gather(*(http.get(url) for url in PAGINA.values()))
+    else:
+        responses = [await http.get("/api/dashboard/", params={"relatorios": list(PAGINA), "consistente": modo == "consistente"})]
+    for response in responses:
+        response.raise_for_status()
+    return sum(int(response.headers["x-sql-statements"]) for response in responses)
+
+
+async def run(modo, views, headers):
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", headers=headers, timeout=None) as http:
+        await view(http, modo)
+        latencies, statements = [], 0
+        checkouts[0] = 0
+        cpu = time.process_time()
+        for _ in range(views):
+            start = time.perf_counter()
+            statements += await view(http, modo)
+            latencies.append((time.perf_counter() - start) * 1000)
+        cpu = time.process_time() - cpu
+    return statistics.median(latencies), cpu * 1000 / views, statements / views, checkouts[0] / views
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--empresas", type=int, default=20_000)
+    parser.add_argument("--views", type=int, default=30)
+    args = parser.parse_args()
+
+    seed(args.empresas)
+    headers = dict(client().headers)
+    max_size = response_cache.max_size
+    print(f"{'cache':<9} {'modo':<12} {'p50 ms':>9} {'CPU ms':>9} {'SQL':>6} {'conexões':>9}")
+    for cache, size in (("desligado", 0), ("ligado", max_size)):
+        response_cache.max_size = size
+        for modo in ("endpoints", "dashboard", "consistente"):
+            p50, cpu, statements, connections = asyncio.run(run(modo, args.views, headers))
+            print(f"{cache:<9} {modo:<12} {p50:>9.1f} {cpu:>9.1f} {statements:>6.1f} {connections:>9.1f}")
+
+
+if __name__ == "__main__":
+    main()
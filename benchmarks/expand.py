@@ -0,0 +1,74 @@
+"""Comandos SQL e tempo de `/api/empresas/?expand=...` por tamanho de página.
+
+    python -m benchmarks.expand --empresas 2000
+
+Compara o endpoint com o ORM carregando as relações por acesso (lazy, o N+1) e com
+`selectinload`. Sai com código 1 se o número de comandos do endpoint mudar com o tamanho da
+página (o valor esperado é 1 + uma consulta por relação, mais nada).
+"""
+import argparse
+import sys
+import time
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session, selectinload
+
+from app.api import models as api_models
+from app.api.expand import parse_expand
+from benchmarks.common import client, engine, seed
+from database import count_statements
+
+EXPAND = "faturamentos.produtos_vendidos,avaliacoes"
+Empresas = api_models.Empresas
+Faturamento = api_models.Faturamento
+
+
+def _relations(tree) -> int:
+    return sum(1 + _relations(subtree) for subtree in tree.values())
+
+
+def orm(limit: int, eager: bool):
+    with Session(engine) as db, count_statements() as counter:
+        stmt = select(Empresas).order_by(Empresas.id_empresa).limit(limit)
+        if eager:
+            stmt = stmt.options(selectinload(Empresas.faturamentos).selectinload(Faturamento.produtos_vendidos), selectinload(Empresas.avaliacoes))
+        for empresa in db.scalars(stmt):
+            for faturamento in empresa.faturamentos:
+                faturamento.produtos_vendidos
+            empresa.avaliacoes
+        return counter[0]
+
+
+def timed(func):
+    start = time.perf_counter()
+    result = func()
+    return result, (time.perf_counter() - start) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--empresas", type=int, default=2_000)
+    args = parser.parse_args()
+
+    seed(args.empresas)
+    expected = 1 + _relations(parse_expand(Empresas, EXPAND))
+    ok = True
+    print(f"expand={EXPAND} (esperado: {expected} comandos)")
+    print(f"{'página':>7} {'endpoint':>17} {'ORM lazy':>19} {'selectinload':>19}")
+    with client() as http:
+        http.get("/api/empresas/", params={"limit": 1}).raise_for_status()
+        for limit in (1, 10, 100, 1000):
+            response, endpoint_ms = timed(lambda: http.get("/api/empresas/", params={"limit": limit, "expand": EXPAND}))
+            response.raise_for_status()
+            statements = int(response.headers["x-sql-statements"])
+            ok = ok and statements == expected
+            lazy, lazy_ms = timed(lambda: orm(limit, eager=False))
+            eager, eager_ms = timed(lambda: orm(limit, eager=True))
+            print(f"{limit:>7} {statements:>5} cmd {endpoint_ms:>7.1f} ms {lazy:>5} cmd {lazy_ms:>7.1f} ms {eager:>5} cmd {eager_ms:>7.1f} ms")
+    if not ok:
+        print(f"FALHOU: o endpoint deveria executar {expected} comandos em qualquer página")
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,31 @@
+"""Planos das consultas analíticas num banco migrado e populado.
+
+    python -m benchmarks.explain --empresas 5000
+
+Sai com código 1 se algum plano não usar os índices esperados (ver migrations/explain.py).
+"""
+import argparse
+import sys
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--empresas", type=int, default=5_000)
+    args = parser.parse_args()
+
+    from benchmarks.common import engine, seed
+    from migrations import explain
+
+    seed(args.empresas)
+    with engine.connect() as conn:
+        for name, (build, expected) in explain._checks(conn.dialect.name).items():
+            print(f"{name:24} usa {', '.join(sorted(explain.indexes_used(conn, build())))}")
+        conn.rollback()
+        failures = explain.check_plans(conn)
+    for name, problem in failures.items():
+        print(f"FALHOU {name}: {problem}")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
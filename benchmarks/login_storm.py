@@ -0,0 +1,79 @@
+"""p99 de /api durante uma rajada de logins.
+
+    python -m benchmarks.login_storm --logins 200 --concurrency 50
+"""
+import argparse
+import asyncio
+import time
+
+import httpx
+
+from app.auth import ratelimit
+from benchmarks.common import BENCH_EMAIL, app, client, seed
+
+
+def percentile(values, fraction):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * fraction))] if values else 0.0
+
+
+async def api_latencies(http, headers, stop: asyncio.Event, latencies: list):
+    while not stop.is_set():
+        start = time.perf_counter()
+        response = await http.get("/api/empresas/", params={"limit": 50}, headers=headers)
+        response.raise_for_status()
+        latencies.append((time.perf_counter() - start) * 1000)
+
+
+async def login_storm(http, logins: int, concurrency: int, statuses: dict):
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def login():
+        async with semaphore:
+            response = await http.post("/auth/token", data={"username": BENCH_EMAIL, "password": "bench"})
+            statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+
+    await asyncio.gather(*(login() for _ in range(logins)))
+
+
+async def run(logins: int, concurrency: int, baseline_seconds: float):
+    headers = dict(client().headers)
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as http:
+        baseline, during, statuses = [], [], {}
+
+        stop = asyncio.Event()
+        task = asyncio.create_task(api_latencies(http, headers, stop, baseline))
+        await asyncio.sleep(baseline_seconds)
+        stop.set()
+        await task
+
+        stop = asyncio.Event()
+        task = asyncio.create_task(api_latencies(http, headers, stop, during))
+        start = time.perf_counter()
+        await login_storm(http, logins, concurrency, statuses)
+        elapsed = time.perf_counter() - start
+        stop.set()
+        await task
+
+    print(f"sem logins : p50 {percentile(baseline, 0.5):7.2f} ms  p99 {percentile(baseline, 0.99):7.2f} ms  ({len(baseline)} reqs)")
+    print(f"com logins : p50 {percentile(during, 0.5):7.2f} ms  p99 {percentile(during, 0.99):7.2f} ms  ({len(during)} reqs)")
+    print(f"logins     : {logins} em {elapsed:.2f}s, status {statuses}")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--logins", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--empresas", type=int, default=1_000)
+    parser.add_argument("--baseline-seconds", type=float, default=2.0)
+    args = parser.parse_args()
+
+    seed(args.empresas)
+    # Aqui interessa o pool do bcrypt sob carga, não o limite de login (ver login_throttle).
+    ratelimit.login_ip_bucket.rate = ratelimit.login_email_bucket.rate = 0
+    asyncio.run(run(args.logins, args.concurrency, args.baseline_seconds))
+
+
+if __name__ == "__main__":
+    main()
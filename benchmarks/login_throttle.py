@@ -0,0 +1,86 @@
+"""Logins de um usuário legítimo enquanto outros IPs disparam senhas erradas.
+
+Roda o mesmo ataque com o limite de login desligado e ligado e compara a taxa de sucesso e a
+latência do usuário legítimo, os status que o atacante recebe e quantos bcrypt rodaram.
+
+    python -m benchmarks.login_throttle --seconds 10 --attacker-ips 5 --concurrency 20
+"""
+import argparse
+import asyncio
+import random
+import time
+
+import httpx
+
+from app import metrics
+from app.auth import ratelimit
+from benchmarks.common import BENCH_EMAIL, app, reset_database
+from benchmarks.login_storm import percentile
+
+
+def _bcrypt_calls() -> int:
+    return sum(state[-1] for state in metrics.PASSWORD_HASH.collect().values())
+
+
+async def attacker(ip: str, stop: asyncio.Event, concurrency: int, statuses: dict):
+    transport = httpx.ASGITransport(app=app, client=(ip, 40000))
+    rng = random.Random(ip)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as http:
+        async def worker():
+            while not stop.is_set():
+                email = f"vitima{rng.randrange(100_000)}@example.com"
+                response = await http.post("/auth/token", data={"username": email, "password": "errada"})
+                statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+                if response.status_code == 429:
+                    await asyncio.sleep(0.01)
+
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+
+
+async def legitimate(stop: asyncio.Event, interval: float, results: list):
+    transport = httpx.ASGITransport(app=app, client=("10.0.0.1", 40000))
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as http:
+        while not stop.is_set():
+            start = time.perf_counter()
+            response = await http.post("/auth/token", data={"username": BENCH_EMAIL, "password": "bench"})
+            results.append((response.status_code, (time.perf_counter() - start) * 1000))
+            await asyncio.sleep(interval)
+
+
+async def run(seconds: float, attacker_ips: int, concurrency: int, interval: float):
+    stop = asyncio.Event()
+    statuses, results = {}, []
+    bcrypt_before = _bcrypt_calls()
+    tasks = [asyncio.create_task(attacker(f"203.0.113.{i}", stop, concurrency, statuses)) for i in range(1, attacker_ips + 1)]
+    tasks.append(asyncio.create_task(legitimate(stop, interval, results)))
+    await asyncio.sleep(seconds)
+    stop.set()
+    await asyncio.gather(*tasks)
+    return statuses, results, _bcrypt_calls() - bcrypt_before
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--seconds", type=float, default=10.0)
+    parser.add_argument("--attacker-ips", type=int, default=5)
+    parser.add_argument("--concurrency", type=int, default=20, help="requisições simultâneas por IP atacante")
+    parser.add_argument("--interval", type=float, default=1.0, help="pausa entre os logins do usuário legítimo")
+    args = parser.parse_args()
+
+    reset_database()
+    buckets = (ratelimit.login_ip_bucket, ratelimit.login_email_bucket)
+    configured = [bucket.rate for bucket in buckets]
+    for label, enabled in (("sem limite", False), ("com limite", True)):
+        for bucket, rate in zip(buckets, configured):
+            bucket.rate = rate if enabled else 0
+            bucket.backend = ratelimit.MemoryRateLimitBackend(ratelimit.LOGIN_RATE_MAX_KEYS)
+        statuses, results, bcrypt_calls = asyncio.run(run(args.seconds, args.attacker_ips, args.concurrency, args.interval))
+        ok = [latency for status_code, latency in results if status_code == 200]
+        print(f"{label}:")
+        print(f"  legítimo : {len(ok)}/{len(results)} logins ok, p50 {percentile(ok, 0.5):7.1f} ms  p99 {percentile(ok, 0.99):7.1f} ms")
+        print(f"  atacante : {sum(statuses.values())} tentativas, status {dict(sorted(statuses.items()))}")
+        print(f"  bcrypt   : {bcrypt_calls} execuções ({bcrypt_calls / args.seconds:.1f}/s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+"""Custo da instrumentação: latência com METRICS_ENABLED=0 contra METRICS_ENABLED=1.
+
+    python -m benchmarks.metrics_overhead --requests 2000
+
+Cada variante roda num subprocesso, porque o pool cronometrado é escolhido na importação.
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+ENDPOINTS = (
+    ("/api/empresas/", {"limit": 20}),
+    ("/api/faturamento/", {"limit": 100}),
+    ("/api/insights/", {}),
+)
+
+
+def worker(args):
+    from benchmarks.common import client, measure, seed
+
+    seed(args.empresas)
+    results = {}
+    with client() as http:
+        for url, params in ENDPOINTS:
+            measure(http, "GET", url, repeat=50, params=params)
+            results[url] = measure(http, "GET", url, repeat=args.requests, params=params)["p50_ms"]
+    print(json.dumps(results))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=2_000)
+    parser.add_argument("--empresas", type=int, default=1_000)
+    parser.add_argument("--worker", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        return worker(args)
+
+    runs = {}
+    for flag in ("0", "1"):
+        # Sem cache de respostas, senão /insights mediria só o cache.
+        env = {**os.environ, "METRICS_ENABLED": flag, "RESPONSE_CACHE_SIZE": "0"}
+        output = subprocess.run(
+            [sys.executable, "-m", "benchmarks.metrics_overhead", "--worker",
+             "--requests", str(args.requests), "--empresas", str(args.empresas)],
+            env=env, check=True, capture_output=True, text=True,
+        ).stdout
+        runs[flag] = json.loads(output.strip().splitlines()[-1])
+
+    for url, _ in ENDPOINTS:
+        off, on = runs["0"][url], runs["1"][url]
+        print(f"{url:24} sem métricas {off:7.3f} ms  com métricas {on:7.3f} ms  ({(on / off - 1) * 100:+.1f}%)")
+
+    # A diferença de ponta a ponta costuma ficar dentro do ruído; o custo por chamada é mais estável.
+    from app import metrics
+
+    n = 100_000
+    per_statement = timeit.timeit(lambda: metrics.observe_statement(0.0005, 10, "SELECT 1"), number=n) / n * 1e6
+    per_request = timeit.timeit(lambda: metrics.observe_request("GET", "/api/empresas/", 200, 0.01, 2, 0.001), number=n) / n * 1e6
+    print(f"custo por comando SQL: {per_statement:.2f} µs  por requisição: {per_request:.2f} µs")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,27 @@
+"""Latência e memória de uma página de /api/empresas/ conforme a tabela cresce.
+
+    python -m benchmarks.pagination --scales 1000 10000 100000
+"""
+import argparse
+
+from benchmarks.common import client, measure, seed
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--scales", type=int, nargs="+", default=[1_000, 10_000, 100_000])
+    parser.add_argument("--limit", type=int, default=100)
+    args = parser.parse_args()
+
+    print(f"{'empresas':>10} {'p50 ms':>8} {'p99 ms':>8} {'pico KiB':>10}")
+    for scale in args.scales:
+        seed(scale)
+        with client() as http:
+            first = http.get("/api/empresas/", params={"limit": args.limit})
+            cursor = first.headers.get("X-Next-Cursor")
+            result = measure(http, "GET", "/api/empresas/", params={"limit": args.limit, "cursor": cursor, "fields": "nome_empresa"})
+        print(f"{scale:>10} {result['p50_ms']:>8.2f} {result['p99_ms']:>8.2f} {result['peak_kib']:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,146 @@
+"""Primário e réplica em dois arquivos SQLite: roteamento, read-your-writes, failover e timeout.
+
+    python -m benchmarks.replicas --empresas 5000
+    DB_ASYNC=1 python -m benchmarks.replicas
+
+A "replicação" é uma cópia do arquivo do primário; depois dela o primário recebe empresas que
+a réplica não tem, e isso mostra de onde veio cada leitura. Uma segunda réplica aponta para um
+caminho que não abre, para exercitar o failover. No fim mede escritas concorrendo com leituras
+pesadas, com as leituras no primário e na réplica: as conexões tiradas do pool do primário
+mostram a separação; a latência, num processo só, continua limitada pela CPU. Sai com
+código 1 se alguma verificação falhar.
+"""
+import os
+import tempfile
+
+_DIR = tempfile.mkdtemp(prefix="api-replicas-")
+PRIMARY = os.path.join(_DIR, "primario.db")
+REPLICA = os.path.join(_DIR, "replica.db")
+os.environ["BENCH_DATABASE_URL"] = f"sqlite:///{PRIMARY}"
+os.environ["DATABASE_REPLICA_URLS"] = f"sqlite:///{REPLICA},sqlite:///{os.path.join(_DIR, 'ausente', 'replica.db')}"
+os.environ.setdefault("DB_REPLICA_LAG_SECONDS", "1")
+os.environ.setdefault("REPORT_STATEMENT_TIMEOUT_SECONDS", "0.005")
+
+import argparse  # noqa: E402
+import asyncio  # noqa: E402
+import shutil  # noqa: E402
+import time  # noqa: E402
+
+import httpx  # noqa: E402
+from sqlalchemy import event, insert  # noqa: E402
+
+from app.api import models as api_models  # noqa: E402
+from app.api.pagination import encode_cursor  # noqa: E402
+from benchmarks.common import app, client, engine, seed  # noqa: E402
+from database import DB_ASYNC, DB_REPLICA_LAG_SECONDS, get_async_engine, get_engine, replicas  # noqa: E402
+
+checkouts = {"primário": 0, "réplica": 0}
+# Leitura pesada sem cache nem timeout de relatório: página grande com relações.
+LEITURA = {"limit": 1000, "expand": "faturamentos.produtos_vendidos,avaliacoes"}
+
+
+def _count_checkouts(target, name):
+    pool = target.sync_engine.pool if DB_ASYNC else target.pool
+    event.listen(pool, "checkout", lambda *args: checkouts.__setitem__(name, checkouts[name] + 1))
+
+
+def preparar(empresas: int):
+    seed(empresas)
+    engine.dispose()
+    shutil.copyfile(PRIMARY, REPLICA)
+    with engine.begin() as conn:
+        conn.execute(insert(api_models.Empresas), [{"id_empresa": empresas + 1, "nome_empresa": "Só no primário", "diretor_empresa": "Diretor"}])
+
+
+async def ultimas_empresas(http, empresas: int) -> list[str]:
+    response = await http.get("/api/empresas/", params={"cursor": encode_cursor(empresas - 1), "fields": "nome_empresa"})
+    response.raise_for_status()
+    return [row["nome_empresa"] for row in response.json()]
+
+
+async def carga_mista(transport, headers, writes: int, reads: int, concorrencia: int) -> tuple[float, float]:
+    latencies = []
+    # Sem limite, centenas de escritas esperam o lock do SQLite e estouram o busy timeout.
+    semaphore = asyncio.Semaphore(concorrencia)
+
+    async def escrita(http, i):
+        async with semaphore:
+            start = time.perf_counter()
+            response = await http.post("/api/avaliacoes/", json={"id_empresa": 1, "nota_diretor": i % 10, "nota_geral_empresa": 5, "comentario": "carga"})
+            latencies.append((time.perf_counter() - start) * 1000)
+        response.raise_for_status()
+
+    async def leitura(http):
+        async with semaphore:
+            (await http.get("/api/empresas/", params=LEITURA)).raise_for_status()
+
+    # Clientes separados: o cookie das escritas mandaria as leituras para o primário.
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", headers=headers, timeout=None) as writer, \
+            httpx.AsyncClient(transport=transport, base_url="http://bench", headers=headers, timeout=None) as reader:
+        await asyncio.gather(*(escrita(writer, i) for i in range(writes)), *(leitura(reader) for _ in range(reads)))
+    latencies.sort()
+    return latencies[len(latencies) // 2], latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))]
+
+
+async def run(args) -> bool:
+    ok = True
+
+    def check(descricao, condicao):
+        nonlocal ok
+        ok = ok and condicao
+        print(f"{'ok   ' if condicao else 'FALHA'} {descricao}")
+
+    headers = dict(client().headers)
+    transport = httpx.ASGITransport(app=app, raise_app_exceptions=False)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", headers=headers, timeout=None) as http:
+        statuses = [(await http.get("/api/empresas/", params={"limit": 1})).status_code for _ in range(10)]
+        check(f"rodízio com uma réplica fora do ar: {statuses.count(200)} de 10 leituras ok, só a primeira na réplica ruim falhou", statuses.count(200) >= 9)
+        check(f"réplica ruim fora do rodízio: {replicas.healthy()}", replicas.healthy()[("1",)] == 0)
+
+        nomes = await ultimas_empresas(http, args.empresas)
+        check("GET lê da réplica (sem a empresa só do primário)", "Só no primário" not in nomes)
+
+        response = await http.post("/api/empresas/", json={"nome_empresa": "Nova", "diretor_empresa": "Diretor"})
+        response.raise_for_status()
+        check("POST marca o cliente para ler do primário", "db_primario_ate" in response.headers.get("set-cookie", ""))
+        check("o mesmo cliente lê a própria escrita", "Nova" in await ultimas_empresas(http, args.empresas))
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", headers=headers) as outro:
+            check("outro cliente continua na réplica", "Nova" not in await ultimas_empresas(outro, args.empresas))
+        await asyncio.sleep(DB_REPLICA_LAG_SECONDS + 0.1)
+        check("passado o atraso, o cliente volta para a réplica", "Nova" not in await ultimas_empresas(http, args.empresas))
+
+        response = await http.get("/api/insights/maior_lucro/")
+        if DB_ASYNC:
+            print(f"---   timeout por comando não se aplica ao aiosqlite (status {response.status_code})")
+        else:
+            check(f"relatório acima do timeout responde 503 (status {response.status_code})", response.status_code == 503)
+
+    _count_checkouts(replicas.engine(0, DB_ASYNC), "réplica")
+    _count_checkouts(get_async_engine() if DB_ASYNC else get_engine(), "primário")
+    print(f"\n{args.escritas} escritas e {args.leituras} leituras de 1000 empresas com relações, {args.concorrencia} em voo")
+    print(f"{'leituras em':<12} {'escrita p50':>12} {'escrita p99':>12} {'conexões primário':>18} {'conexões réplica':>17}")
+    urls = replicas.urls
+    for destino in ("primário", "réplica"):
+        replicas.urls = urls if destino == "réplica" else []
+        for name in checkouts:
+            checkouts[name] = 0
+        p50, p99 = await carga_mista(transport, headers, args.escritas, args.leituras, args.concorrencia)
+        print(f"{destino:<12} {p50:>9.1f} ms {p99:>9.1f} ms {checkouts['primário']:>18} {checkouts['réplica']:>17}")
+    replicas.urls = urls
+    return ok
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--empresas", type=int, default=5_000)
+    parser.add_argument("--escritas", type=int, default=200)
+    parser.add_argument("--leituras", type=int, default=20)
+    parser.add_argument("--concorrencia", type=int, default=10)
+    args = parser.parse_args()
+
+    preparar(args.empresas)
+    return 0 if asyncio.run(run(args)) else 1
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,75 @@
+"""Custo da checagem de revogação em `decode_token` com muitas entradas revogadas.
+
+Mede `is_revoked` sozinho (acerto e erro) e `decode_token` inteiro com o store vazio e com
+`--entries` revogações, além da memória do store e do tempo para carregá-lo do banco.
+
+    python -m benchmarks.revocation --entries 1000000
+"""
+import argparse
+import time
+import timeit
+import tracemalloc
+
+from sqlalchemy import insert
+
+from app.auth import auth
+from app.auth.models import RevokedToken
+from app.auth.revocation import DatabaseRevocationBackend, RevocationStore
+from benchmarks.common import engine, reset_database
+
+
+def _per_call_us(statement, number):
+    return min(timeit.repeat(statement, number=number, repeat=5)) / number * 1e6
+
+
+def _decode_cost(store, token, number):
+    previous = auth.revocations
+    auth.revocations = store
+    try:
+        return _per_call_us(lambda: auth.decode_token(token), number)
+    finally:
+        auth.revocations = previous
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--entries", type=int, default=1_000_000)
+    parser.add_argument("--load-rows", type=int, default=200_000, help="linhas para medir a carga a partir do banco")
+    parser.add_argument("--number", type=int, default=20_000)
+    args = parser.parse_args()
+
+    expires_at = int(time.time()) + 3600
+    token = auth.create_access_token({"sub": "bench@example.com", "fam": auth.new_token_id()})
+    decoded = auth.decode_token(token, check_revoked=False)
+
+    empty = RevocationStore()
+    tracemalloc.start()
+    full = RevocationStore()
+    for _ in range(args.entries):
+        full.revoke(auth.new_token_id(), expires_at)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    revoked_id = next(iter(full._expires))
+
+    print(f"{'cenário':<44} {'µs/chamada':>11}")
+    print(f"{'is_revoked, store vazio':<44} {_per_call_us(lambda: empty.is_revoked(decoded['jti'], decoded['fam']), args.number):>11.3f}")
+    print(f"{f'is_revoked, {args.entries:,} entradas, erro':<44} {_per_call_us(lambda: full.is_revoked(decoded['jti'], decoded['fam']), args.number):>11.3f}")
+    print(f"{f'is_revoked, {args.entries:,} entradas, acerto':<44} {_per_call_us(lambda: full.is_revoked(revoked_id), args.number):>11.3f}")
+    print(f"{'jwt.decode sem checagem':<44} {_per_call_us(lambda: auth.decode_token(token, check_revoked=False), args.number // 10):>11.3f}")
+    print(f"{'decode_token, store vazio':<44} {_decode_cost(empty, token, args.number // 10):>11.3f}")
+    print(f"{f'decode_token, {args.entries:,} entradas':<44} {_decode_cost(full, token, args.number // 10):>11.3f}")
+    print()
+    print(f"memória do store com {args.entries:,} entradas: {peak / 2**20:.0f} MiB")
+
+    if args.load_rows:
+        reset_database()
+        with engine.begin() as conn:
+            conn.execute(insert(RevokedToken), [{"token_id": auth.new_token_id(), "expires_at": expires_at} for _ in range(args.load_rows)])
+        store = RevocationStore(DatabaseRevocationBackend())
+        start = time.perf_counter()
+        store.load()
+        print(f"carga do banco: {len(store):,} entradas em {time.perf_counter() - start:.2f} s")
+
+
+if __name__ == "__main__":
+    main()
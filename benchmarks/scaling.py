@@ -0,0 +1,129 @@
+"""Requisições/s com 1, 2, 4... workers do gunicorn (gunicorn.conf.py).
+
+    python -m benchmarks.scaling --workers 1 2 4 --seconds 10 --concurrency 64
+
+Usa BENCH_DATABASE_URL se definida (um Postgres local, com --yes-drop) ou um SQLite temporário. A carga
+vem de processos clientes separados, para que o gerador não seja o gargalo. Para cada contagem
+de workers também confere se uma escrita invalida o cache de /insights em todos os workers e
+se o /metrics soma as requisições de todos eles.
+"""
+import argparse
+import asyncio
+import multiprocessing
+import os
+import re
+import socket
+import subprocess
+import sys
+import time
+
+import httpx
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _wait_ready(base_url: str, timeout: float = 60):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            if httpx.get(f"{base_url}/", timeout=1).status_code == 200:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.2)
+    raise RuntimeError("gunicorn não respondeu a tempo.")
+
+
+async def _load(base_url: str, headers: dict, seconds: float, concurrency: int) -> int:
+    done = 0
+    deadline = time.monotonic() + seconds
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=base_url, headers=headers, limits=limits, timeout=30) as http:
+        async def user():
+            nonlocal done
+            while time.monotonic() < deadline:
+                response = await http.get("/api/empresas/", params={"limit": 20})
+                response.raise_for_status()
+                done += 1
+
+        await asyncio.gather(*(user() for _ in range(concurrency)))
+    return done
+
+
+def _client_process(args):
+    return asyncio.run(_load(*args))
+
+
+def _check_shared_state(http: httpx.Client, requests_sent: int) -> dict:
+    # Espalha leituras de /insights pelos workers, escreve em um deles e lê de novo.
+    before = [http.get("/api/insights/").json() for _ in range(20)]
+    total_before = sum(row["faturamento_total_anual"] or 0 for row in before[-1])
+    http.post("/api/faturamento/", json={"id_empresa": 1, "faturamento_mensal": 1, "faturamento_anual": 1_000_000, "ano": 2024, "mes": 1}).raise_for_status()
+    after = [http.get("/api/insights/").json() for _ in range(20)]
+    stale = sum(1 for rows in after if sum(row["faturamento_total_anual"] or 0 for row in rows) == total_before)
+
+    time.sleep(float(os.environ.get("METRICS_PUBLISH_SECONDS", "0.5")) * 3)
+    text = http.get("/metrics").text
+    counted = sum(float(value) for value in re.findall(r'http_requests_total\{method="GET",route="/api/empresas/",status="200"\} (\S+)', text))
+    return {"stale_reads": stale, "metrics_counted": int(counted), "requests_sent": requests_sent}
+
+
+def run(workers: int, args, env: dict, headers: dict):
+    port = _free_port()
+    base_url = f"http://127.0.0.1:{port}"
+    server = subprocess.Popen(
+        [sys.executable, "-m", "gunicorn", "-c", os.path.join(ROOT, "gunicorn.conf.py"), "main:create_app()"],
+        cwd=ROOT, env={**env, "WEB_CONCURRENCY": str(workers), "PORT": str(port)},
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    try:
+        _wait_ready(base_url)
+        warm_up = asyncio.run(_load(base_url, headers, 1, args.concurrency))
+        per_client = max(1, args.concurrency // args.client_processes)
+        with multiprocessing.Pool(args.client_processes) as pool:
+            start = time.perf_counter()
+            counts = pool.map(_client_process, [(base_url, headers, args.seconds, per_client)] * args.client_processes)
+            elapsed = time.perf_counter() - start
+        with httpx.Client(base_url=base_url, headers=headers, timeout=30) as http:
+            checks = _check_shared_state(http, warm_up + sum(counts))
+        return sum(counts) / elapsed, checks
+    finally:
+        server.terminate()
+        server.wait(timeout=30)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--seconds", type=float, default=10)
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--client-processes", type=int, default=max(1, os.cpu_count() // 2))
+    parser.add_argument("--empresas", type=int, default=1_000)
+    args = parser.parse_args()
+
+    from benchmarks.common import client, seed
+
+    seed(args.empresas)
+    headers = dict(client().headers)
+    env = {**os.environ, "METRICS_PUBLISH_SECONDS": os.environ.get("METRICS_PUBLISH_SECONDS", "0.5")}
+    print(f"{os.cpu_count()} núcleos, {args.client_processes} processo(s) cliente, concorrência {args.concurrency}")
+
+    baseline = None
+    for workers in args.workers:
+        rps, checks = run(workers, args, env, headers)
+        baseline = baseline or rps
+        print(
+            f"{workers:2d} worker(s): {rps:8.1f} req/s  ({rps / baseline:4.2f}x)  "
+            f"leituras velhas após escrita: {checks['stale_reads']}/20  "
+            f"/metrics: {checks['metrics_counted']} de {checks['requests_sent']} requisições"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+"""Latência da busca sobre um milhão de produtos, contra o LIKE que os clientes fariam sem índice.
+
+    python -m benchmarks.search --produtos 1000000
+
+Nomes e categorias saem de um vocabulário gerado (sílabas): prefixos curtos casam com milhares
+de linhas e palavras inteiras com centenas, como num catálogo. Mede a primeira página e a
+décima (via cursor) de cada busca. O LIKE devolve as primeiras linhas por id, sem relevância.
+"""
+import argparse
+import random
+import statistics
+import time
+
+from sqlalchemy import func, insert, or_, select
+from sqlalchemy.orm import Session
+
+from app.api import models as api_models, search
+from benchmarks.common import engine, reset_database
+
+SILABAS = ["ba", "be", "ca", "co", "da", "de", "fa", "fer", "ga", "lu", "ma", "mi", "na", "no", "pa", "pe", "ra", "ri", "sa", "so", "ta", "to", "va", "vi", "xa", "zo"]
+
+
+def vocabulario(rng, tamanho):
+    palavras = set()
+    while len(palavras) < tamanho:
+        palavras.add("".join(rng.choice(SILABAS) for _ in range(rng.randint(2, 4))))
+    return sorted(palavras)
+
+
+def popular(produtos: int, empresas: int, seed_value: int = 7):
+    rng = random.Random(seed_value)
+    palavras = vocabulario(rng, 5_000)
+    categorias = [palavra.title() for palavra in rng.sample(palavras, 50)]
+    reset_database()
+    with engine.begin() as conn:
+        conn.execute(insert(api_models.Empresas), [
+            {"id_empresa": i, "nome_empresa": " ".join(rng.choice(palavras).title() for _ in range(2)), "diretor_empresa": rng.choice(palavras).title()}
+            for i in range(1, empresas + 1)
+        ])
+        lote = 100_000
+        for inicio in range(1, produtos + 1, lote):
+            conn.execute(insert(api_models.DetalhesProdutos), [
+                {"id_produto": i, "id_empresa": rng.randint(1, empresas),
+                 "nome_produto": " ".join(rng.choice(palavras) for _ in range(rng.randint(2, 3))).capitalize(),
+                 "categoria": rng.choice(categorias), "preco_unitario": rng.uniform(1, 500),
+                 "margem_lucro_percentual": rng.uniform(1, 60), "data_lancamento": None}
+                for i in range(inicio, min(inicio + lote, produtos + 1))
+            ])
+
+
+def buscas(db) -> list[str]:
+    """Buscas tiradas de um produto real: prefixo curto, palavra, duas palavras, nome e categoria."""
+    model = api_models.DetalhesProdutos
+    nome, categoria = db.execute(select(model.nome_produto, model.categoria).where(model.id_produto == 12_345)).one()
+    palavras = nome.lower().split()
+    return [palavras[0][:3], palavras[0], f"{palavras[0]} {palavras[1][:3]}", nome.lower(), categoria.lower(), f"{categoria.lower()} {palavras[1]}"]
+
+
+def like_stmt(q: str, limit: int):
+    model = api_models.DetalhesProdutos
+    filtros = [or_(model.nome_produto.ilike(f"%{termo}%"), model.categoria.ilike(f"%{termo}%")) for termo in search.termos(q)]
+    return select(model.id_produto, model.nome_produto).where(*filtros).order_by(model.id_produto).limit(limit)
+
+
+def timed(func, repeat):
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        samples.append((time.perf_counter() - start) * 1000)
+    samples.sort()
+    return statistics.median(samples), samples[-1], result
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--produtos", type=int, default=1_000_000)
+    parser.add_argument("--empresas", type=int, default=50_000)
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--limit", type=int, default=20)
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    popular(args.produtos, args.empresas)
+    print(f"{args.produtos:,} produtos populados (com as triggers do FTS5) em {time.perf_counter() - start:.0f} s")
+
+    with Session(engine) as db:
+        print(f"{'busca':<24} {'casam':>8} {'p50 ms':>8} {'max ms':>8} {'pág. 10':>8} {'LIKE ms':>9}")
+        for q in buscas(db):
+            total = db.execute(select(func.count()).where(
+                search._sqlite(search.PRODUTOS, search.termos(q))[2])).scalar() if engine.dialect.name == "sqlite" else -1
+            p50, worst, response = timed(lambda: search.search(db, search.PRODUTOS, q, None, args.limit), args.repeat)
+            cursor = response.headers.get("X-Next-Cursor")
+            for _ in range(8):
+                if cursor:
+                    cursor = search.search(db, search.PRODUTOS, q, cursor, args.limit).headers.get("X-Next-Cursor")
+            page10 = timed(lambda: search.search(db, search.PRODUTOS, q, cursor, args.limit), args.repeat)[0] if cursor else float("nan")
+            like = timed(lambda: db.execute(like_stmt(q, args.limit)).all(), 3)[0]
+            print(f"{q:<24} {total:>8} {p50:>8.2f} {worst:>8.2f} {page10:>8.2f} {like:>9.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+"""Linhas por segundo ao serializar listagens grandes, do banco até os bytes JSON.
+
+Compara o caminho antigo (objetos ORM ou dicts passando por `jsonable_encoder` + `json`) com
+tuplas de linha codificadas direto por `app.api.responses.dumps` (orjson quando instalado) e
+com um `TypeAdapter` do pydantic.
+
+    python -m benchmarks.serialization --rows 100000
+"""
+import argparse
+import json
+import time
+
+from fastapi.encoders import jsonable_encoder
+from pydantic import TypeAdapter
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from app.api import models as api_models
+from app.api import responses
+from app.api import schemas as api_schemas
+from benchmarks.common import engine, seed
+
+Faturamento = api_models.Faturamento
+KEYS = ["id_faturamento", "id_empresa", "faturamento_mensal", "faturamento_anual"]
+
+
+def orm_jsonable(db):
+    objects = db.scalars(select(Faturamento)).all()
+    return json.dumps(jsonable_encoder([api_schemas.Faturamento.model_validate(obj) for obj in objects])).encode()
+
+
+def dicts_jsonable(db):
+    rows = db.execute(select(*(getattr(Faturamento, key) for key in KEYS))).all()
+    return json.dumps(jsonable_encoder([{key: row._mapping[key] for key in KEYS} for row in rows])).encode()
+
+
+def tuples_fast(db):
+    rows = db.execute(select(*(getattr(Faturamento, key) for key in KEYS))).all()
+    return responses.dumps(responses.rows_as_dicts(rows, KEYS))
+
+
+_ADAPTER = TypeAdapter(list[api_schemas.Faturamento])
+
+
+def tuples_type_adapter(db):
+    rows = db.execute(select(*(getattr(Faturamento, key) for key in KEYS))).all()
+    return _ADAPTER.dump_json(_ADAPTER.validate_python(responses.rows_as_dicts(rows, KEYS)))
+
+
+PATHS = {
+    "orm + jsonable_encoder": orm_jsonable,
+    "dicts + jsonable_encoder": dicts_jsonable,
+    "tuplas + responses.dumps": tuples_fast,
+    "tuplas + TypeAdapter": tuples_type_adapter,
+}
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    seed(args.rows // 4 or 1)
+    print(f"encoder: {'orjson' if responses.orjson is not None else 'json (stdlib)'}")
+    print(f"{'caminho':<28} {'linhas':>8} {'melhor s':>9} {'linhas/s':>12} {'MiB':>7}")
+    for name, path in PATHS.items():
+        best = float("inf")
+        for _ in range(args.repeat):
+            with Session(engine) as db:
+                start = time.perf_counter()
+                body = path(db)
+                best = min(best, time.perf_counter() - start)
+        rows = len(json.loads(body))
+        print(f"{name:<28} {rows:>8} {best:>9.3f} {rows / best:>12,.0f} {len(body) / 2**20:>7.1f}")
+
+
+if __name__ == "__main__":
+    main()
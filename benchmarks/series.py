@@ -0,0 +1,104 @@
+"""Confere as séries por período contra um cálculo em Python sobre todas as linhas e mede o tempo.
+
+    python -m benchmarks.series --empresas 20000
+
+Sai com código 1 se algum endpoint divergir da referência.
+"""
+import argparse
+import math
+import sys
+import time
+from collections import defaultdict
+
+from sqlalchemy import select
+
+from app.api import models as api_models
+from benchmarks.common import PERIODO_INICIO, client, engine, seed
+
+Faturamento = api_models.Faturamento
+ProdutosVendidos = api_models.ProdutosVendidos
+
+
+def _indice(ano, mes):
+    return ano * 12 + mes - 1
+
+
+def _mensal(rows, inicio, fim, id_empresa):
+    grupos = defaultdict(list)
+    for empresa, ano, mes, valor in rows:
+        if inicio <= (ano, mes) <= fim and (id_empresa is None or empresa == id_empresa):
+            grupos[(empresa, ano, mes)].append(valor)
+    return {key: (sum(values), sum(values) / len(values), len(values)) for key, values in grupos.items()}
+
+
+def _acumulado_12m(rows, inicio, fim, id_empresa):
+    mensal = {key: soma for key, (soma, _, _) in _mensal(rows, (0, 1), fim, id_empresa).items()}
+    resultado = {}
+    for (empresa, ano, mes) in mensal:
+        if (ano, mes) < inicio:
+            continue
+        janela = [
+            soma for (outra, outro_ano, outro_mes), soma in mensal.items()
+            if outra == empresa and 0 <= _indice(ano, mes) - _indice(outro_ano, outro_mes) <= 11
+        ]
+        resultado[(empresa, ano, mes)] = (sum(janela), len(janela))
+    return resultado
+
+
+def _compare(name, expected, rows, fields, elapsed_ms):
+    actual = {(row["id_empresa"], row["ano"], row["mes"]): tuple(row[field] for field in fields) for row in rows}
+    problems = [key for key in expected.keys() | actual.keys() if key not in expected or key not in actual
+                or any(not math.isclose(a, b, rel_tol=1e-9, abs_tol=1e-6) for a, b in zip(expected[key], actual[key]))]
+    status = "ok" if not problems else f"{len(problems)} divergências, ex. {problems[:3]}"
+    print(f"  {name:<28} {len(actual):>7} linhas {elapsed_ms:>8.1f} ms  {status}")
+    return not problems
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--empresas", type=int, default=20_000)
+    args = parser.parse_args()
+
+    seed(args.empresas)
+    with engine.connect() as conn:
+        faturamentos = conn.execute(select(Faturamento.id_empresa, Faturamento.ano, Faturamento.mes, Faturamento.faturamento_mensal)).all()
+        vendas = conn.execute(
+            select(Faturamento.id_empresa, ProdutosVendidos.ano, ProdutosVendidos.mes, ProdutosVendidos.produtos_vendidos)
+            .join(Faturamento, Faturamento.id_faturamento == ProdutosVendidos.id_faturamento)
+        ).all()
+
+    ano = PERIODO_INICIO + 2
+    intervalos = [
+        ("3º trimestre", (ano, 7), (ano, 9), None),
+        ("ano inteiro", (ano, 1), (ano, 12), None),
+        ("uma empresa, tudo", (PERIODO_INICIO, 1), (PERIODO_INICIO + 3, 12), 1),
+    ]
+    ok = True
+    with client() as http:
+        for label, inicio, fim, id_empresa in intervalos:
+            params = {"de": f"{inicio[0]}-{inicio[1]:02d}", "ate": f"{fim[0]}-{fim[1]:02d}"}
+            if id_empresa is not None:
+                params["id_empresa"] = id_empresa
+            print(f"{label} ({params['de']} a {params['ate']}):")
+            for name, url, expected, fields in (
+                ("faturamento/mensal", "/api/faturamento/mensal/", _mensal(faturamentos, inicio, fim, id_empresa),
+                 ("soma_faturamento_mensal", "media_faturamento_mensal", "n_faturamentos")),
+                ("faturamento/acumulado_12m", "/api/faturamento/acumulado_12m/", _acumulado_12m(faturamentos, inicio, fim, id_empresa),
+                 ("faturamento_12m", "meses_com_faturamento")),
+                ("produtos_vendidos/mensal", "/api/produtos_vendidos/mensal/", _mensal(vendas, inicio, fim, id_empresa),
+                 ("soma_produtos_vendidos", "media_produtos_vendidos", "n_vendas")),
+            ):
+                start = time.perf_counter()
+                response = http.get(url, params=params)
+                elapsed = (time.perf_counter() - start) * 1000
+                response.raise_for_status()
+                ok = _compare(name, expected, response.json(), fields, elapsed) and ok
+
+        start = time.perf_counter()
+        http.get("/api/faturamento_mensal_por_empresa/").raise_for_status()
+        print(f"/faturamento_mensal_por_empresa/ (todas as linhas): {(time.perf_counter() - start) * 1000:.1f} ms")
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
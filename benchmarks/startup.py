@@ -0,0 +1,77 @@
+"""Tempo de subida: importação de main → primeira requisição autenticada respondida.
+
+    python -m benchmarks.startup --runs 5 --budget-seconds 3
+
+Cada medição roda num processo novo. Com --budget-seconds o comando sai com código 1 quando a
+mediana passa do limite, para rodar em CI.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+
+def worker():
+    start = time.perf_counter()
+    from main import create_app
+    imported = time.perf_counter()
+
+    from fastapi.testclient import TestClient
+    from app.auth.auth import create_access_token
+    from benchmarks.common import BENCH_EMAIL
+
+    headers = {"Authorization": f"Bearer {create_access_token(data={'sub': BENCH_EMAIL})}"}
+    created = time.perf_counter()
+    app = create_app()
+    with TestClient(app) as http:
+        http.get("/api/empresas/", params={"limit": 1}, headers=headers).raise_for_status()
+        served = time.perf_counter()
+    print(json.dumps({"import_s": imported - start, "first_request_s": served - created}))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--budget-seconds", type=float, help="falha se a mediana (importação + 1ª requisição) passar disso")
+    parser.add_argument("--no-warmup", action="store_true", help="sobe com STARTUP_WARMUP=0")
+    parser.add_argument("--json", action="store_true", help="imprime o resultado em JSON")
+    parser.add_argument("--worker", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        return worker()
+
+    from benchmarks.common import seed
+
+    seed(100)
+    env = {**os.environ, "STARTUP_WARMUP": "0" if args.no_warmup else "1"}
+    runs = []
+    for _ in range(args.runs):
+        start = time.perf_counter()
+        output = subprocess.run(
+            [sys.executable, "-m", "benchmarks.startup", "--worker"],
+            env=env, check=True, capture_output=True, text=True,
+        ).stdout
+        result = json.loads(output.strip().splitlines()[-1])
+        result["process_s"] = time.perf_counter() - start
+        runs.append(result)
+
+    summary = {key: statistics.median(run[key] for run in runs) for key in ("import_s", "first_request_s", "process_s")}
+    summary["total_s"] = summary["import_s"] + summary["first_request_s"]
+    if args.json:
+        print(json.dumps(summary))
+    else:
+        print(f"importação       {summary['import_s'] * 1000:8.1f} ms")
+        print(f"1ª requisição    {summary['first_request_s'] * 1000:8.1f} ms")
+        print(f"total            {summary['total_s'] * 1000:8.1f} ms  (processo inteiro {summary['process_s'] * 1000:.1f} ms)")
+    if args.budget_seconds is not None and summary["total_s"] > args.budget_seconds:
+        print(f"Acima do limite de {args.budget_seconds:.2f}s.", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
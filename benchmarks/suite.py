@@ -0,0 +1,298 @@
+"""Suíte de regressão: vazão, latência, comandos SQL e memória de cada endpoint.
+
+    python -m benchmarks.suite run --linhas 100000 --saida base.json
+    python -m benchmarks.suite run --linhas 100000 --saida novo.json
+    python -m benchmarks.suite compare base.json novo.json
+
+    BENCH_DATABASE_URL=postgresql+psycopg2://bench@localhost/bench python -m benchmarks.suite run --linhas 10000000 --yes-drop
+    DB_ASYNC=1 python -m benchmarks.suite run --cenarios empresas insights --concorrencia 8
+
+`--linhas` é o total somado das cinco tabelas (o `seed` de `benchmarks.common` gera
+`rows_per_empresa()` linhas por empresa); sem BENCH_DATABASE_URL o banco é um SQLite temporário.
+Com `--reaproveitar` o banco não é recriado, útil para repetir uma rodada sobre um Postgres
+já populado. As requisições passam pela aplicação ASGI inteira (middleware, autenticação,
+serialização) via httpx, sem servidor nem rede. O cache de respostas fica desligado, salvo com
+`--cache`, para medir o trabalho de cada endpoint e não o cache.
+
+Por cenário: vazão com `--concorrencia` requisições em voo, latência p50/p99, comandos SQL
+por requisição (header X-SQL-Statements) e pico de memória alocada pelo Python
+(tracemalloc, numa passada à parte para não distorcer a latência).
+
+O `compare` aponta regressões do segundo arquivo em relação ao primeiro: latência ou memória
+acima de `--tolerancia` por cento (o p99, mais ruidoso, tem `--tolerancia-p99`), vazão abaixo
+dela, ou qualquer comando SQL a mais. Sai com código 1 se houver alguma, para uso em CI.
+"""
+import os
+
+# O limite de tentativas de login barraria o cenário de login logo na décima requisição.
+os.environ.setdefault("LOGIN_RATE_IP_BURST", "1000000000")
+
+import argparse  # noqa: E402
+import asyncio  # noqa: E402
+import json  # noqa: E402
+import platform  # noqa: E402
+import subprocess  # noqa: E402
+import sys  # noqa: E402
+import time  # noqa: E402
+import tracemalloc  # noqa: E402
+from dataclasses import dataclass  # noqa: E402
+from datetime import datetime, timezone  # noqa: E402
+
+import httpx  # noqa: E402
+
+from app.api import analytics  # noqa: E402
+from app.api.cache import response_cache  # noqa: E402
+from benchmarks.common import BENCH_EMAIL, app, client, engine, rows_per_empresa, seed  # noqa: E402
+from database import DB_ASYNC  # noqa: E402
+
+# Diferenças de latência abaixo disto são ruído, qualquer que seja a porcentagem.
+MIN_DELTA_MS = 0.5
+
+
+@dataclass(frozen=True)
+class Cenario:
+    nome: str
+    metodo: str
+    url: str
+    params: dict | None = None
+    json: dict | None = None
+    data: dict | None = None
+    # Para endpoints caros de propósito (bcrypt), que não precisam de tantas repetições.
+    max_repeat: int | None = None
+
+
+PERIODO = {"de": "2021-01", "ate": "2024-12"}
+CENARIOS = [
+    Cenario("empresas", "GET", "/api/empresas/", {"limit": 100}),
+    Cenario("faturamento", "GET", "/api/faturamento/", {"limit": 100}),
+    Cenario("produtos", "GET", "/api/produtos/", {"limit": 100}),
+    Cenario("detalhes_produtos", "GET", "/api/detalhes_produtos/", {"limit": 100}),
+    Cenario("avaliacoes", "GET", "/api/avaliacoes/", {"limit": 100}),
+    Cenario("empresas_expand", "GET", "/api/empresas/", {"limit": 100, "expand": "faturamentos.produtos_vendidos,avaliacoes"}),
+    Cenario("empresas_csv", "GET", "/api/empresas/", {"limit": 1000, "format": "csv"}),
+    Cenario("insights", "GET", "/api/insights/"),
+    Cenario("maior_lucro", "GET", "/api/insights/maior_lucro/"),
+    Cenario("pioresdiretores", "GET", "/api/pioresdiretores/"),
+    Cenario("melhoresdiretores", "GET", "/api/melhoresdiretores/"),
+    Cenario("media_notas_diretor", "GET", "/api/media_notas_diretor/"),
+    Cenario("faturamento_por_produto", "GET", "/api/faturamento_por_produto"),
+    Cenario("faturamento_mensal_por_empresa", "GET", "/api/faturamento_mensal_por_empresa/"),
+    Cenario("faturamento_mensal", "GET", "/api/faturamento/mensal/", PERIODO),
+    Cenario("acumulado_12m", "GET", "/api/faturamento/acumulado_12m/", PERIODO),
+    Cenario("produtos_vendidos_mensal", "GET", "/api/produtos_vendidos/mensal/", PERIODO),
+    Cenario("busca_empresas", "GET", "/api/busca/empresas/", {"q": "empresa 12"}),
+    Cenario("busca_produtos", "GET", "/api/busca/produtos/", {"q": "produto 4"}),
+    Cenario("percentis", "GET", "/api/analytics/percentis/"),
+    Cenario("zscores", "GET", "/api/analytics/zscores/"),
+    Cenario("correlacoes", "GET", "/api/analytics/correlacoes/"),
+    Cenario("dashboard", "GET", "/api/dashboard/"),
+    Cenario("users_me", "GET", "/auth/users/me"),
+    Cenario("login", "POST", "/auth/token", data={"username": BENCH_EMAIL, "password": "bench"}, max_repeat=20),
+    # Escritas por último, para não mudar os dados das leituras.
+    Cenario("criar_avaliacao", "POST", "/api/avaliacoes/", json={"id_empresa": 1, "nota_diretor": 7, "nota_geral_empresa": 8, "comentario": "suite"}),
+    Cenario("atualizar_empresa", "PUT", "/api/empresas/1", json={"nome_empresa": "Empresa 1", "diretor_empresa": "Diretor 1"}),
+]
+if not analytics.available():
+    CENARIOS = [cenario for cenario in CENARIOS if not cenario.url.startswith("/api/analytics/")]
+
+METRICAS = (
+    # (campo, formato, maior é melhor)
+    ("req_s", "{:>9.1f}", True),
+    ("p50_ms", "{:>9.2f}", False),
+    ("p99_ms", "{:>9.2f}", False),
+    ("sql", "{:>5.1f}", False),
+    ("pico_kib", "{:>9.1f}", False),
+)
+ROTULOS = ("req/s", "p50 ms", "p99 ms", "SQL", "pico KiB")
+
+
+def percentile(samples, fraction):
+    return samples[min(len(samples) - 1, int(len(samples) * fraction))]
+
+
+async def request(http, cenario: Cenario):
+    response = await http.request(cenario.metodo, cenario.url, params=cenario.params, json=cenario.json, data=cenario.data)
+    if response.status_code >= 400:
+        raise RuntimeError(f"{cenario.nome}: {cenario.metodo} {cenario.url} respondeu {response.status_code}: {response.text[:200]}")
+    return response
+
+
+async def medir(http, cenario: Cenario, repeat: int, concorrencia: int, aquecimento: int, amostras_memoria: int) -> dict:
+    repeat = min(repeat, cenario.max_repeat or repeat)
+    for _ in range(aquecimento):
+        await request(http, cenario)
+
+    latencies, statements, sizes = [], [], []
+    semaphore = asyncio.Semaphore(concorrencia)
+
+    async def one():
+        async with semaphore:
+            start = time.perf_counter()
+            response = await request(http, cenario)
+            latencies.append((time.perf_counter() - start) * 1000)
+            statements.append(int(response.headers.get("x-sql-statements", 0)))
+            sizes.append(len(response.content))
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one() for _ in range(repeat)))
+    elapsed = time.perf_counter() - start
+
+    tracemalloc.start()
+    for _ in range(amostras_memoria):
+        await request(http, cenario)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    latencies.sort()
+    return {
+        "req_s": repeat / elapsed,
+        "p50_ms": percentile(latencies, 0.5),
+        "p99_ms": percentile(latencies, 0.99),
+        "sql": sum(statements) / len(statements),
+        "pico_kib": peak / 1024,
+        "bytes": max(sizes),
+        "repeticoes": repeat,
+    }
+
+
+async def run_all(cenarios, args) -> dict:
+    headers = dict(client().headers)
+    resultados = {}
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", headers=headers, timeout=None) as http:
+        for cenario in cenarios:
+            resultados[cenario.nome] = resultado = await medir(http, cenario, args.repeat, args.concorrencia, args.aquecimento, args.amostras_memoria)
+            print(f"{cenario.nome:<32}" + " ".join(formato.format(resultado[campo]) for campo, formato, _ in METRICAS), flush=True)
+    return resultados
+
+
+def _commit() -> str | None:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _cabecalho(primeira: str):
+    print(f"{primeira:<32}" + " ".join(f"{rotulo:>{len(formato.format(0))}}" for rotulo, (_, formato, _) in zip(ROTULOS, METRICAS)))
+
+
+def run(args) -> int:
+    nomes = {cenario.nome for cenario in CENARIOS}
+    desconhecidos = set(args.cenarios or ()) - nomes
+    if desconhecidos:
+        print(f"Cenários desconhecidos: {', '.join(sorted(desconhecidos))}. Disponíveis: {', '.join(sorted(nomes))}.")
+        return 2
+    cenarios = [cenario for cenario in CENARIOS if not args.cenarios or cenario.nome in args.cenarios]
+
+    empresas = max(1, args.linhas // rows_per_empresa())
+    if not args.reaproveitar:
+        start = time.perf_counter()
+        seed(empresas)
+        print(f"{empresas * rows_per_empresa():,} linhas ({empresas:,} empresas) em {engine.dialect.name}, populadas em {time.perf_counter() - start:.1f} s")
+    if not args.cache:
+        response_cache.max_size = 0
+
+    _cabecalho("cenário")
+    resultados = asyncio.run(run_all(cenarios, args))
+    saida = {
+        "meta": {
+            "data": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "commit": _commit(),
+            "python": platform.python_version(),
+            "dialeto": engine.dialect.name,
+            "db_async": DB_ASYNC,
+            "linhas": empresas * rows_per_empresa(),
+            "repeat": args.repeat,
+            "concorrencia": args.concorrencia,
+            "cache": args.cache,
+        },
+        "cenarios": resultados,
+    }
+    if args.saida:
+        with open(args.saida, "w", encoding="utf-8") as file:
+            json.dump(saida, file, indent=2, ensure_ascii=False)
+        print(f"Resultados gravados em {args.saida}")
+    return 0
+
+
+def regressoes(base: dict, novo: dict, tolerancia: float, tolerancia_p99: float) -> list[str]:
+    """Métricas de `novo` piores que as de `base` além da tolerância (em fração)."""
+    encontradas = []
+    for campo, _, maior_melhor in METRICAS:
+        antes, depois = base[campo], novo[campo]
+        limite = tolerancia_p99 if campo == "p99_ms" else tolerancia
+        if campo == "sql":
+            pior = depois > antes
+        elif maior_melhor:
+            pior = depois < antes / (1 + limite)
+        else:
+            pior = depois > antes * (1 + limite) and (not campo.endswith("_ms") or depois - antes > MIN_DELTA_MS)
+        if pior:
+            encontradas.append(campo)
+    return encontradas
+
+
+def compare(args) -> int:
+    with open(args.base, encoding="utf-8") as file:
+        base = json.load(file)
+    with open(args.novo, encoding="utf-8") as file:
+        novo = json.load(file)
+    for chave in ("dialeto", "db_async", "linhas", "concorrencia", "cache"):
+        if base["meta"].get(chave) != novo["meta"].get(chave):
+            print(f"Aviso: '{chave}' difere entre as rodadas ({base['meta'].get(chave)} → {novo['meta'].get(chave)}); a comparação pode não valer.")
+
+    falhas = 0
+    print(f"cenário ({base['meta'].get('commit')} → {novo['meta'].get('commit')})")
+    print(f"{'':<32}" + " ".join(f"{rotulo:>{len(formato.format(0)) + 7}}" for rotulo, (_, formato, _) in zip(ROTULOS, METRICAS)))
+    for nome, resultado in novo["cenarios"].items():
+        anterior = base["cenarios"].get(nome)
+        if anterior is None:
+            print(f"{nome:<32}(novo)")
+            continue
+        piores = regressoes(anterior, resultado, args.tolerancia / 100, args.tolerancia_p99 / 100)
+        colunas = []
+        for campo, formato, _ in METRICAS:
+            variacao = (resultado[campo] / anterior[campo] - 1) * 100 if anterior[campo] else 0.0
+            colunas.append(f"{formato.format(resultado[campo])}{'!' if campo in piores else ' '}{variacao:>+5.0f}%")
+        falhas += bool(piores)
+        print(f"{nome:<32}" + " ".join(colunas))
+    ausentes = sorted(base["cenarios"].keys() - novo["cenarios"].keys())
+    if ausentes:
+        print(f"Ausentes na rodada nova: {', '.join(ausentes)}")
+
+    if falhas:
+        print(f"{falhas} cenário(s) com regressão (marcadas com !; tolerância {args.tolerancia:.0f}%, p99 {args.tolerancia_p99:.0f}%, SQL nenhuma).")
+        return 1
+    print("Nenhuma regressão.")
+    return 0
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    subparsers = parser.add_subparsers(dest="comando", required=True)
+
+    run_parser = subparsers.add_parser("run", help="popula o banco e mede os cenários")
+    run_parser.add_argument("--linhas", type=int, default=100_000, help="total de linhas nas cinco tabelas (1k a 10M)")
+    run_parser.add_argument("--repeat", type=int, default=200)
+    run_parser.add_argument("--concorrencia", type=int, default=1)
+    run_parser.add_argument("--aquecimento", type=int, default=3)
+    run_parser.add_argument("--amostras-memoria", type=int, default=3)
+    run_parser.add_argument("--cenarios", nargs="+")
+    run_parser.add_argument("--cache", action="store_true", help="mantém o cache de respostas ligado")
+    run_parser.add_argument("--reaproveitar", action="store_true", help="não recria nem popula o banco")
+    run_parser.add_argument("--saida", help="arquivo JSON com os resultados")
+
+    compare_parser = subparsers.add_parser("compare", help="aponta regressões entre duas rodadas")
+    compare_parser.add_argument("base")
+    compare_parser.add_argument("novo")
+    compare_parser.add_argument("--tolerancia", type=float, default=15.0, help="em porcentagem")
+    # O p99 de poucas centenas de amostras é quase o máximo, e varia bem mais que a mediana.
+    compare_parser.add_argument("--tolerancia-p99", type=float, default=50.0, help="em porcentagem")
+
+    args = parser.parse_args()
+    return run(args) if args.comando == "run" else compare(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
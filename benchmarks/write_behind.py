@@ -0,0 +1,97 @@
+"""Rajada de POST /api/avaliacoes/: gravação síncrona contra a fila write-behind.
+
+    python -m benchmarks.write_behind --avaliacoes 5000 --concorrencia 100
+    DB_ASYNC=1 python -m benchmarks.write_behind
+
+Mede vazão, latência p50/p99 das respostas, conexões tiradas do pool e commits por
+avaliação. Na fila, o tempo total inclui esperar o `stop()` gravar tudo; no fim confere que
+as duas rodadas gravaram o mesmo número de linhas.
+"""
+import argparse
+import asyncio
+import random
+import time
+
+import httpx
+from sqlalchemy import event, func, select
+from sqlalchemy.engine import Engine
+from sqlalchemy.pool import Pool
+
+from app.api import models as api_models
+from app.api.writebehind import avaliacoes_queue
+from benchmarks.common import app, client, engine, seed
+
+checkouts = [0]
+commits = [0]
+event.listen(Pool, "checkout", lambda *args: checkouts.__setitem__(0, checkouts[0] + 1))
+event.listen(Engine, "commit", lambda *args: commits.__setitem__(0, commits[0] + 1))
+
+
+def percentile(samples, fraction):
+    return samples[min(len(samples) - 1, int(len(samples) * fraction))]
+
+
+async def burst(total, concurrency, empresas, headers):
+    rng = random.Random(3)
+    corpos = [{"id_empresa": rng.randint(1, empresas), "nota_diretor": rng.randint(0, 10), "nota_geral_empresa": rng.randint(0, 10), "comentario": "rajada"} for _ in range(total)]
+    latencies = []
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def post(http, corpo):
+        async with semaphore:
+            start = time.perf_counter()
+            response = await http.post("/api/avaliacoes/", json=corpo)
+            latencies.append((time.perf_counter() - start) * 1000)
+            response.raise_for_status()
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", headers=headers, timeout=None) as http:
+        # Com o cache de usuário frio, cada requisição da rajada buscaria o usuário no banco.
+        (await http.get("/api/avaliacoes/", params={"limit": 1})).raise_for_status()
+        checkouts[0] = commits[0] = 0
+        start = time.perf_counter()
+        await asyncio.gather(*(post(http, corpo) for corpo in corpos))
+        accepted = time.perf_counter() - start
+        await avaliacoes_queue.stop()
+        finished = time.perf_counter() - start
+    latencies.sort()
+    return accepted, finished, latencies, checkouts[0], commits[0]
+
+
+def contar():
+    with engine.connect() as conn:
+        return conn.execute(select(func.count()).select_from(api_models.AvaliacoesDiretorEmpresa)).scalar()
+
+
+async def run(args, headers):
+    for enabled in (False, True):
+        seed(args.empresas)
+        antes = contar()
+        avaliacoes_queue.enabled = enabled
+        accepted, finished, latencies, pool, commit_count = await burst(args.avaliacoes, args.concorrencia, args.empresas, headers)
+        linhas = contar() - antes
+        modo = "write-behind" if enabled else "síncrono"
+        print(f"{modo:<12} {args.avaliacoes / accepted:>10.0f} {args.avaliacoes / finished:>11.0f} {percentile(latencies, 0.5):>8.1f} {percentile(latencies, 0.99):>8.1f} {pool:>10} {commit_count:>8} {linhas:>7}")
+        if linhas != args.avaliacoes:
+            print(f"FALHOU: {args.avaliacoes - linhas} avaliações não gravadas")
+            return 1
+    return 0
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--empresas", type=int, default=2_000)
+    parser.add_argument("--avaliacoes", type=int, default=5_000)
+    parser.add_argument("--concorrencia", type=int, default=100)
+    args = parser.parse_args()
+
+    # Sem `with`: o lifespan do TestClient criaria o engine assíncrono em outro event loop.
+    headers = dict(client().headers)
+    print(f"{args.avaliacoes} avaliações, {args.concorrencia} em paralelo (lote {avaliacoes_queue.batch_size}, intervalo {avaliacoes_queue.interval}s)")
+    print(f"{'modo':<12} {'aceitas/s':>10} {'gravadas/s':>11} {'p50 ms':>8} {'p99 ms':>8} {'checkouts':>10} {'commits':>8} {'linhas':>7}")
+    # Um só event loop para as duas rodadas: o engine assíncrono fica preso ao loop que o criou.
+    return asyncio.run(run(args, headers))
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -1,21 +1,442 @@
+import asyncio
+import functools
+import itertools
+import logging
 import os
-from sqlalchemy import create_engine
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from fastapi import Request
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import DBAPIError, IntegrityError
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import Pool
 from dotenv import load_dotenv
+from app import metrics
 
 load_dotenv()
-DATABASE_URL = os.environ.get("DATABASE_URL")
+DB_ASYNC = os.environ.get("DB_ASYNC", "").lower() in ("1", "true", "yes")
+DB_POOL_WARMUP = int(os.environ.get("DB_POOL_WARMUP", "1"))
+# Réplicas de leitura (URLs separadas por vírgula); vazio, tudo vai para DATABASE_URL.
+DATABASE_REPLICA_URLS = [url.strip() for url in os.environ.get("DATABASE_REPLICA_URLS", "").split(",") if url.strip()]
+# Atraso máximo esperado das réplicas: por quanto tempo um cliente que escreveu lê do primário.
+DB_REPLICA_LAG_SECONDS = float(os.environ.get("DB_REPLICA_LAG_SECONDS", "5"))
+DB_REPLICA_RETRY_SECONDS = float(os.environ.get("DB_REPLICA_RETRY_SECONDS", "30"))
+DB_REPLICA_CHECK_SECONDS = float(os.environ.get("DB_REPLICA_CHECK_SECONDS", "5"))
+# Limite padrão de cada comando SQL; 0 desliga. Endpoints pesados usam `statement_timeout`.
+DB_STATEMENT_TIMEOUT_SECONDS = float(os.environ.get("DB_STATEMENT_TIMEOUT_SECONDS", "0"))
+PRIMARY_COOKIE = "db_primario_ate"
+SAFE_METHODS = ("GET", "HEAD", "OPTIONS")
+# Instruções da VM do SQLite entre duas verificações do prazo do comando.
+SQLITE_PROGRESS_STEPS = 10_000
 
-engine = create_engine(DATABASE_URL)
+logger = logging.getLogger(__name__)
 
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+def pool_limits(role: str = "primario") -> tuple[int, int]:
+    """(pool_size, max_overflow) de um engine conforme o papel dele no worker.
+
+    "primario" é o engine do modo (sync, ou async com DB_ASYNC=1): DB_POOL_SIZE/DB_MAX_OVERFLOW.
+    "auxiliar" é o engine sync que o modo async ainda abre para revogações, write-behind e
+    migrações: DB_AUX_POOL_SIZE/DB_AUX_MAX_OVERFLOW, pequeno por padrão. "replica" vale para
+    cada réplica, no servidor dela: DB_REPLICA_POOL_SIZE/DB_REPLICA_MAX_OVERFLOW, que por
+    padrão repetem os do primário.
+    """
+    size = int(os.environ.get("DB_POOL_SIZE", "5"))
+    overflow = int(os.environ.get("DB_MAX_OVERFLOW", "10"))
+    if role == "auxiliar":
+        return int(os.environ.get("DB_AUX_POOL_SIZE", "2")), int(os.environ.get("DB_AUX_MAX_OVERFLOW", "0"))
+    if role == "replica":
+        return (int(os.environ.get("DB_REPLICA_POOL_SIZE", str(size))),
+                int(os.environ.get("DB_REPLICA_MAX_OVERFLOW", str(overflow))))
+    return size, overflow
+
+
+def engine_options(url: str, role: str = "primario") -> dict:
+    pool_size, max_overflow = pool_limits(role)
+    options = {
+        "pool_size": pool_size,
+        "max_overflow": max_overflow,
+        "pool_timeout": float(os.environ.get("DB_POOL_TIMEOUT", "30")),
+        "pool_recycle": int(os.environ.get("DB_POOL_RECYCLE", "-1")),
+        "pool_pre_ping": os.environ.get("DB_POOL_PRE_PING", "").lower() in ("1", "true", "yes"),
+        # LIFO reusa as conexões mais recentes e deixa as ociosas expirarem pelo pool_recycle.
+        "pool_use_lifo": os.environ.get("DB_POOL_USE_LIFO", "").lower() in ("1", "true", "yes"),
+    }
+    if url.startswith("sqlite"):
+        # SQLite não tem o schema "public"; as tabelas ficam no banco principal.
+        options["execution_options"] = {"schema_translate_map": {"public": None}}
+    return options
+
+
+def _enable_sqlite_foreign_keys(dbapi_connection, connection_record):
+    # Sem o pragma o SQLite ignora as FKs, e os handlers dependem do erro de FK para o 404.
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA foreign_keys=ON")
+    cursor.close()
+
+
+def database_url() -> str:
+    url = os.environ.get("DATABASE_URL")
+    if not url:
+        raise RuntimeError("DATABASE_URL não configurada.")
+    return url
+
+
+def async_database_url(url: str) -> str:
+    scheme, _, rest = url.partition("://")
+    driver = {"postgres": "postgresql+asyncpg", "postgresql": "postgresql+asyncpg",
+              "postgresql+psycopg2": "postgresql+asyncpg", "sqlite": "sqlite+aiosqlite"}.get(scheme, scheme)
+    return f"{driver}://{rest}"
+
+
+SessionLocal = sessionmaker(autocommit=False, autoflush=False, expire_on_commit=False)
+AsyncSessionLocal = async_sessionmaker(autoflush=False, expire_on_commit=False)
 
 Base = declarative_base()
 
-def get_db():
-    db = SessionLocal()
+# Os engines só são criados no primeiro uso (lifespan, primeira sessão ou script), então
+# importar a aplicação não exige DATABASE_URL nem abre conexão.
+_engines = {}
+_engines_lock = threading.Lock()
+
+
+def _create_engine(url: str, use_async: bool, role: str = "primario"):
+    # O pool cronometrado alimenta a métrica de espera por conexão (db_pool_checkout_seconds).
+    if use_async:
+        pool = {"poolclass": metrics.TimedAsyncQueuePool} if metrics.METRICS_ENABLED else {}
+        engine = create_async_engine(async_database_url(url), **engine_options(url, role), **pool)
+        sync_engine = engine.sync_engine
+    else:
+        pool = {"poolclass": metrics.TimedQueuePool} if metrics.METRICS_ENABLED else {}
+        engine = sync_engine = create_engine(url, **engine_options(url, role), **pool)
+    if sync_engine.dialect.name == "sqlite":
+        event.listen(sync_engine, "connect", _enable_sqlite_foreign_keys)
+    return engine
+
+
+def get_engine() -> Engine:
+    engine = _engines.get("sync")
+    if engine is None:
+        with _engines_lock:
+            engine = _engines.get("sync")
+            if engine is None:
+                # No modo async este é o engine auxiliar, com pool próprio e pequeno.
+                engine = _create_engine(database_url(), use_async=False, role="auxiliar" if DB_ASYNC else "primario")
+                SessionLocal.configure(bind=engine)
+                _engines["sync"] = engine
+    return engine
+
+
+def get_async_engine():
+    engine = _engines.get("async")
+    if engine is None:
+        with _engines_lock:
+            engine = _engines.get("async")
+            if engine is None:
+                engine = _create_engine(database_url(), use_async=True)
+                AsyncSessionLocal.configure(bind=engine)
+                _engines["async"] = engine
+    return engine
+
+
+def _read_only(dialect: str, dbapi_connection, connection_record):
+    # Defesa extra: um GET que tente escrever numa réplica falha em vez de divergir dela.
+    cursor = dbapi_connection.cursor()
+    if dialect == "sqlite":
+        cursor.execute("PRAGMA query_only=ON")
+    else:
+        cursor.execute("SET SESSION CHARACTERISTICS AS TRANSACTION READ ONLY")
+    cursor.close()
+
+
+class ReplicaSet:
+    """Réplicas de leitura em rodízio.
+
+    Uma réplica que falha ao conectar (ou perde a conexão) sai do rodízio por
+    `DB_REPLICA_RETRY_SECONDS`; `monitor()`, no lifespan, testa todas a cada
+    `DB_REPLICA_CHECK_SECONDS` e devolve ao rodízio as que voltaram. Sem nenhuma réplica
+    disponível, as leituras vão para o primário. A requisição que encontrou a réplica fora do
+    ar falha; as seguintes já vão para as outras.
+    """
+
+    def __init__(self, urls: list[str]):
+        self.urls = urls
+        self._down_until = [0.0] * len(urls)
+        self._turn = itertools.count()
+
+    def __bool__(self):
+        return bool(self.urls)
+
+    def engine(self, index: int, use_async: bool):
+        key = f"replica{index}:{'async' if use_async else 'sync'}"
+        engine = _engines.get(key)
+        if engine is None:
+            with _engines_lock:
+                engine = _engines.get(key)
+                if engine is None:
+                    engine = _create_engine(self.urls[index], use_async, role="replica")
+                    sync_engine = engine.sync_engine if use_async else engine
+                    event.listen(sync_engine, "connect", functools.partial(_read_only, sync_engine.dialect.name))
+                    event.listen(sync_engine, "handle_error", functools.partial(self._on_error, index))
+                    _engines[key] = engine
+        return engine
+
+    def pick(self, use_async: bool):
+        """A próxima réplica disponível, ou None se todas estiverem fora do rodízio."""
+        now = time.monotonic()
+        for _ in range(len(self.urls)):
+            index = next(self._turn) % len(self.urls)
+            if self._down_until[index] <= now:
+                return self.engine(index, use_async)
+        return None
+
+    def healthy(self) -> dict:
+        now = time.monotonic()
+        return {(str(index),): int(until <= now) for index, until in enumerate(self._down_until)}
+
+    def mark_down(self, index: int):
+        if self._down_until[index] <= time.monotonic():
+            logger.warning("Réplica %d fora do rodízio por %.0f s.", index, DB_REPLICA_RETRY_SECONDS)
+        self._down_until[index] = time.monotonic() + DB_REPLICA_RETRY_SECONDS
+
+    def _on_error(self, index, context):
+        # Só falhas de conexão tiram a réplica: erro de SQL é do comando, não do servidor.
+        if context.is_disconnect or context.connection is None:
+            self.mark_down(index)
+
+    def _ping(self, index: int):
+        with self.engine(index, use_async=False).connect() as connection:
+            connection.execute(text("SELECT 1"))
+
+    async def check(self):
+        for index in range(len(self.urls)):
+            try:
+                if DB_ASYNC:
+                    async with self.engine(index, use_async=True).connect() as connection:
+                        await connection.execute(text("SELECT 1"))
+                else:
+                    await run_in_threadpool(self._ping, index)
+            except Exception:
+                self.mark_down(index)
+            else:
+                self._down_until[index] = 0.0
+
+    async def monitor(self):
+        while True:
+            await asyncio.sleep(DB_REPLICA_CHECK_SECONDS)
+            await self.check()
+
+
+replicas = ReplicaSet(DATABASE_REPLICA_URLS)
+
+
+def __getattr__(name):
+    # `from database import engine` continua funcionando em scripts, criando o engine ali.
+    if name == "engine":
+        return get_engine()
+    if name == "async_engine":
+        return get_async_engine() if DB_ASYNC else None
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def checked_out_connections() -> int:
+    return sum(engine.pool.checkedout() for engine in list(_engines.values()))
+
+
+async def warm_up_pool(connections: int = DB_POOL_WARMUP):
+    """Abre `connections` conexões de uma vez e as devolve ao pool."""
+    if connections <= 0:
+        return
+    if DB_ASYNC:
+        engine = get_async_engine()
+        opened = [await engine.connect() for _ in range(connections)]
+        await asyncio.gather(*(connection.close() for connection in opened))
+        return
+
+    def open_and_return():
+        engine = get_engine()
+        opened = [engine.connect() for _ in range(connections)]
+        for connection in opened:
+            connection.close()
+
+    await run_in_threadpool(open_and_return)
+
+
+async def dispose_engines():
+    with _engines_lock:
+        engines = list(_engines.values())
+    for engine in engines:
+        if isinstance(engine, AsyncEngine):
+            await engine.dispose()
+        else:
+            engine.dispose()
+
+
+def _replica_for(request: Request, use_async: bool):
+    """Réplica para a requisição: só leituras, e não logo depois de uma escrita do mesmo cliente."""
+    if not replicas or request.method not in SAFE_METHODS:
+        return None
     try:
+        if float(request.cookies.get(PRIMARY_COOKIE, 0)) > time.time():
+            return None
+    except ValueError:
+        pass
+    return replicas.pick(use_async)
+
+
+def get_db(request: Request):
+    replica = _replica_for(request, use_async=False)
+    db = SessionLocal(bind=replica or get_engine())
+    db.info["replica"] = replica is not None
+    try:
+        yield db
+    finally:
+        db.close()
+
+
+async def get_async_db(request: Request):
+    replica = _replica_for(request, use_async=True)
+    async with AsyncSessionLocal(bind=replica or get_async_engine()) as db:
+        # O mesmo dicionário fica visível em db.sync_session.info, usado pelo export em streaming.
+        db.info["async_session"] = db
+        db.info["replica"] = replica is not None
         yield db
+
+
+async def run_db(db, func, *args, **kwargs):
+    """Executa código síncrono do ORM sem bloquear o event loop, em qualquer um dos modos."""
+    if isinstance(db, AsyncSession):
+        return await db.run_sync(func, *args, **kwargs)
+    return await run_in_threadpool(func, db, *args, **kwargs)
+
+
+def session_endpoint(func):
+    """Transforma um handler síncrono que recebe `db` em um endpoint async.
+
+    Com `get_async_db` o corpo roda via `AsyncSession.run_sync` no próprio event loop;
+    com `get_db` roda no threadpool, como o FastAPI já fazia para handlers `def`.
+    """
+    @functools.wraps(func)
+    async def wrapper(*args, db, **kwargs):
+        return await run_db(db, lambda session: func(*args, db=session, **kwargs))
+    return wrapper
+
+
+def is_foreign_key_violation(exc: IntegrityError) -> bool:
+    orig = exc.orig
+    code = getattr(orig, "pgcode", None) or getattr(orig, "sqlstate", None)
+    return code == "23503" or "FOREIGN KEY constraint failed" in str(orig)
+
+
+def is_statement_timeout(exc: DBAPIError) -> bool:
+    orig = exc.orig
+    code = getattr(orig, "pgcode", None) or getattr(orig, "sqlstate", None)
+    return code == "57014" or str(orig) == "interrupted"
+
+
+_statement_timeout: ContextVar[float] = ContextVar("statement_timeout", default=DB_STATEMENT_TIMEOUT_SECONDS)
+
+
+def statement_timeout(seconds: float):
+    """Limita cada comando SQL do handler (e das sessões que ele abrir) a `seconds`.
+
+    O limite vale por comando, não por transação: a transação da sessão costuma começar antes,
+    na autenticação, e os comandos dela seguem com o limite padrão. No PostgreSQL, antes do
+    primeiro comando com um limite diferente do que a transação já tem, vai um `SET LOCAL
+    statement_timeout`; no SQLite (driver síncrono) um progress handler interrompe o comando,
+    da execução até a primeira linha. O estouro responde 503 (handler de DBAPIError em main.py).
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            token = _statement_timeout.set(seconds)
+            try:
+                return await func(*args, **kwargs)
+            finally:
+                _statement_timeout.reset(token)
+        return wrapper
+    return decorator
+
+
+def _set_postgresql_timeout(conn, cursor, timeout: float):
+    # O SET LOCAL vale até o fim da transação (ou do savepoint desfeito); conn.info guarda o que
+    # está valendo, e os eventos abaixo o esquecem quando a transação acaba.
+    if conn.info.get("statement_timeout", 0) == timeout:
+        return
+    cursor.execute(f"SET LOCAL statement_timeout = {int(timeout * 1000)}" if timeout else "SET LOCAL statement_timeout = DEFAULT")
+    conn.info["statement_timeout"] = timeout
+
+
+@event.listens_for(Engine, "commit")
+@event.listens_for(Engine, "rollback")
+def _end_transaction(conn):
+    # Conexão invalidada: a próxima é outra conexão DBAPI, com o `info` vazio.
+    if not conn.invalidated:
+        conn.info.pop("statement_timeout", None)
+
+
+@event.listens_for(Engine, "rollback_savepoint")
+def _rollback_savepoint(conn, name, context):
+    _end_transaction(conn)
+
+
+@event.listens_for(Pool, "reset")
+def _reset_connection(dbapi_connection, connection_record, reset_state):
+    connection_record.info.pop("statement_timeout", None)
+
+
+def _clear_deadline(conn):
+    if conn.info.pop("deadline", None) is not None:
+        conn.connection.dbapi_connection.set_progress_handler(None, 0)
+
+
+_statement_counter: ContextVar[list | None] = ContextVar("statement_counter", default=None)
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info["query_start"] = time.perf_counter()
+    counter = _statement_counter.get()
+    if counter is not None:
+        counter[0] += 1
+    timeout = _statement_timeout.get()
+    if conn.dialect.name == "postgresql":
+        _set_postgresql_timeout(conn, cursor, timeout)
+    elif timeout and conn.dialect.name == "sqlite":
+        dbapi_connection = conn.connection.dbapi_connection
+        if hasattr(dbapi_connection, "set_progress_handler"):
+            deadline = conn.info["deadline"] = time.perf_counter() + timeout
+            dbapi_connection.set_progress_handler(lambda: time.perf_counter() > deadline, SQLITE_PROGRESS_STEPS)
+
+@event.listens_for(Engine, "handle_error")
+def _handle_error(context):
+    if context.connection is not None and not context.connection.closed:
+        _clear_deadline(context.connection)
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    _clear_deadline(conn)
+    seconds = time.perf_counter() - conn.info.pop("query_start")
+    counter = _statement_counter.get()
+    if counter is not None:
+        counter[1] += seconds
+    if metrics.METRICS_ENABLED:
+        metrics.observe_statement(seconds, cursor.rowcount, statement)
+
+@contextmanager
+def count_statements():
+    """Conta os comandos SQL executados no contexto atual (inclusive em threads e run_sync).
+
+    Entrega `[comandos, segundos em SQL]`, atualizado conforme os comandos rodam.
+    """
+    counter = [0, 0.0]
+    token = _statement_counter.set(counter)
+    try:
+        yield counter
     finally:
-        db.close()
\ No newline at end of file
+        _statement_counter.reset(token)
\ No newline at end of file
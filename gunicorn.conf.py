@@ -0,0 +1,71 @@
+"""Vários workers uvicorn sob o gunicorn.
+
+    gunicorn -c gunicorn.conf.py "main:create_app()"
+    kill -HUP <pid do master>    # troca os workers aos poucos, sem derrubar requisições
+
+WEB_CONCURRENCY define o número de workers (padrão: um por núcleo). Com DB_MAX_CONNECTIONS,
+o orçamento de conexões do Postgres é dividido entre os workers: cada um recebe um pool fixo
+(DB_POOL_SIZE, sem overflow), de modo que o total nunca passa do orçamento:
+
+    workers × (DB_POOL_SIZE + auxiliar) + DB_RESERVED_CONNECTIONS ≤ DB_MAX_CONNECTIONS
+
+onde `auxiliar` é zero no modo sync e DB_AUX_POOL_SIZE + DB_AUX_MAX_OVERFLOW no modo async
+(o engine sync que ainda atende revogações, write-behind e migrações). Cada réplica é um
+servidor à parte, com o seu orçamento: DB_REPLICA_MAX_CONNECTIONS dá a cada worker
+DB_REPLICA_POOL_SIZE = (DB_REPLICA_MAX_CONNECTIONS − DB_RESERVED_CONNECTIONS) ÷ workers,
+sem overflow; sem ele, o pool de cada réplica repete o do primário.
+"""
+import multiprocessing
+import os
+import shutil
+import tempfile
+
+cores = multiprocessing.cpu_count()
+workers = int(os.environ.get("WEB_CONCURRENCY", str(cores)))
+worker_class = "uvicorn_worker.UvicornWorker"
+bind = f"0.0.0.0:{os.environ.get('PORT', '8000')}"
+timeout = int(os.environ.get("WORKER_TIMEOUT", "60"))
+graceful_timeout = int(os.environ.get("GRACEFUL_TIMEOUT", "30"))
+keepalive = 5
+max_requests = int(os.environ.get("MAX_REQUESTS", "0"))
+max_requests_jitter = max_requests // 10
+
+# Conexões reservadas para migrações, psql e afins, fora do orçamento dos workers.
+reserved_connections = int(os.environ.get("DB_RESERVED_CONNECTIONS", "2"))
+connection_budget = int(os.environ.get("DB_MAX_CONNECTIONS", "0"))
+if connection_budget:
+    auxiliary_connections = 0
+    if os.environ.get("DB_ASYNC", "").lower() in ("1", "true", "yes"):
+        auxiliary_connections = int(os.environ.setdefault("DB_AUX_POOL_SIZE", "2")) + int(os.environ.setdefault("DB_AUX_MAX_OVERFLOW", "0"))
+    per_worker = (connection_budget - reserved_connections) // workers - auxiliary_connections
+    os.environ.setdefault("DB_POOL_SIZE", str(max(1, per_worker)))
+    os.environ.setdefault("DB_MAX_OVERFLOW", "0")
+replica_budget = int(os.environ.get("DB_REPLICA_MAX_CONNECTIONS", "0"))
+if replica_budget:
+    os.environ.setdefault("DB_REPLICA_POOL_SIZE", str(max(1, (replica_budget - reserved_connections) // workers)))
+    os.environ.setdefault("DB_REPLICA_MAX_OVERFLOW", "0")
+
+# O bcrypt de cada worker fica com a sua fatia dos núcleos, senão N workers disputam N×núcleos threads.
+os.environ.setdefault("PASSWORD_HASH_WORKERS", str(max(1, cores // workers)))
+
+_created_shared_dir = None
+
+
+def on_starting(server):
+    # Diretório dos contadores de invalidação dos caches e das métricas de cada worker.
+    global _created_shared_dir
+    if not os.environ.get("SHARED_STATE_DIR"):
+        _created_shared_dir = tempfile.mkdtemp(prefix="api-shared-")
+        os.environ["SHARED_STATE_DIR"] = _created_shared_dir
+
+
+def child_exit(server, worker):
+    # Os contadores do worker encerrado vão para metrics/retired.json; o arquivo dele some.
+    from app import metrics
+
+    metrics.retire(worker.pid)
+
+
+def on_exit(server):
+    if _created_shared_dir:
+        shutil.rmtree(_created_shared_dir, ignore_errors=True)
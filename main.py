@@ -1,20 +1,145 @@
-from database import Base, engine
-from app.auth import endpoints as auth_endpoints
+import asyncio
+import logging
+import os
+import time
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, Request
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import JSONResponse, PlainTextResponse
+from sqlalchemy.exc import DBAPIError
+import migrations
+from database import (
+    DB_ASYNC, DB_REPLICA_LAG_SECONDS, PRIMARY_COOKIE, SAFE_METHODS, checked_out_connections, count_statements, dispose_engines,
+    get_async_db, get_async_engine, get_db, get_engine, is_statement_timeout, replicas, warm_up_pool,
+)
+from app import metrics
 from app.api import endpoints as api_endpoints
-from app.auth import models as auth_models
-from app.api import models as api_models
-from fastapi import FastAPI
+from app.api.cache import response_cache
+from app.api.writebehind import avaliacoes_queue
+from app.auth import auth
+from app.auth import endpoints as auth_endpoints
+from app.auth.cache import user_cache
+from app.auth.revocation import revocations
+from app.compression import COMPRESSION_ENABLED, CompressionMiddleware
+
+AUTO_MIGRATE = os.environ.get("AUTO_MIGRATE", "").lower() in ("1", "true", "yes")
+STARTUP_WARMUP = os.environ.get("STARTUP_WARMUP", "1").lower() in ("1", "true", "yes")
+
+logger = logging.getLogger(__name__)
+
+
+async def warm_up():
+    # Roda em segundo plano: o worker já aceita requisições enquanto o pool e o bcrypt aquecem.
+    try:
+        await asyncio.gather(warm_up_pool(), run_in_threadpool(auth.warm_up))
+    except Exception:
+        logger.warning("Falha no aquecimento da aplicação.", exc_info=True)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # O schema vem de `python -m migrations upgrade` (fase release do Procfile); AUTO_MIGRATE=1
+    # aplica as pendentes na subida, útil em desenvolvimento.
+    if DB_ASYNC:
+        get_async_engine()
+    else:
+        get_engine()
+    if AUTO_MIGRATE:
+        await run_in_threadpool(migrations.upgrade, get_engine())
+    tasks = [asyncio.create_task(warm_up())] if STARTUP_WARMUP else []
+    if metrics.METRICS_DIR:
+        tasks.append(asyncio.create_task(metrics.publish_periodically()))
+    if replicas:
+        tasks.append(asyncio.create_task(replicas.monitor()))
+    if revocations.backend is not None:
+        # A primeira carga antes de aceitar requisições: token revogado não pode passar na subida.
+        await run_in_threadpool(revocations.load)
+        tasks.append(asyncio.create_task(revocations.sync_periodically()))
+    try:
+        yield
+    finally:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        # Grava o que ficou na fila antes de fechar o pool.
+        await avaliacoes_queue.stop()
+        await dispose_engines()
+
+
+async def request_metrics(request: Request, call_next):
+    # Com as métricas desligadas, nem a contagem nem o cabeçalho X-SQL-Statements.
+    if not metrics.METRICS_ENABLED:
+        return await call_next(request)
+    start = time.perf_counter()
+    with count_statements() as counter:
+        response = await call_next(request)
+    response.headers["X-SQL-Statements"] = str(counter[0])
+    metrics.observe_request(request.method, _route_label(request), response.status_code, time.perf_counter() - start, counter[0], counter[1])
+    return response
+
+
+async def read_your_writes(request: Request, call_next):
+    # Depois de uma escrita bem-sucedida, o cliente lê do primário até a réplica alcançá-lo.
+    response = await call_next(request)
+    if request.method not in SAFE_METHODS and response.status_code < 400:
+        response.set_cookie(PRIMARY_COOKIE, f"{time.time() + DB_REPLICA_LAG_SECONDS:.3f}", max_age=max(1, round(DB_REPLICA_LAG_SECONDS)), httponly=True, samesite="lax")
+    return response
 
 
+async def statement_timeout_error(request: Request, exc: DBAPIError):
+    if not is_statement_timeout(exc):
+        raise exc
+    return JSONResponse({"detail": "A consulta excedeu o tempo limite; tente novamente mais tarde."}, status_code=503, headers={"Retry-After": "5"})
 
-Base.metadata.create_all(bind=engine)
 
-app = FastAPI()
+def _route_label(request: Request) -> str:
+    # O template da rota ("/api/empresas/{id_empresa}") mantém a cardinalidade dos labels baixa.
+    if "endpoint" not in request.scope:
+        return "unmatched"
+    names = {str(value): f"{{{name}}}" for name, value in request.path_params.items()}
+    return "/".join(names.get(segment, segment) for segment in request.url.path.split("/"))
 
 
-app.include_router(auth_endpoints.router, prefix="/auth", tags=["auth"])
-app.include_router(api_endpoints.router, prefix="/api", tags=["api"])
+def _cache_stat(field):
+    return lambda: {("user",): user_cache.stats()[field], ("response",): response_cache.stats().get(field, 0)}
+
+metrics.register(metrics.Gauge("db_pool_checked_out", "Conexões do pool em uso.", checked_out_connections))
+metrics.register(metrics.Gauge("db_replica_up", "Réplicas de leitura no rodízio (1) ou fora dele (0).", replicas.healthy, ("replica",)))
+metrics.register(metrics.Gauge("write_behind_queue_depth", "Itens aguardando gravação na fila write-behind.", lambda: {(avaliacoes_queue.name,): len(avaliacoes_queue)}, ("queue",)))
+for field in ("size", "hits", "misses"):
+    metrics.register(metrics.Gauge(f"cache_{field}", f"Estatística '{field}' dos caches em memória.", _cache_stat(field), ("cache",)))
+
+
+def read_metrics():
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
 
-@app.get("/")
 def read_root():
-    return {"message": "API integrada funcionando!"}
\ No newline at end of file
+    return {"message": "API integrada funcionando!"}
+
+
+def create_app() -> FastAPI:
+    """Monta a aplicação sem tocar no banco; o engine nasce no lifespan ou no primeiro uso.
+
+        uvicorn --factory main:create_app
+    """
+    app = FastAPI(lifespan=lifespan)
+
+    if DB_ASYNC:
+        app.dependency_overrides[get_db] = get_async_db
+
+    # Registrada antes, fica por dentro: recebe o corpo inteiro da rota e entra na latência medida.
+    if COMPRESSION_ENABLED:
+        app.add_middleware(CompressionMiddleware)
+    app.middleware("http")(request_metrics)
+    if replicas:
+        app.middleware("http")(read_your_writes)
+    app.exception_handler(DBAPIError)(statement_timeout_error)
+    app.get("/metrics", include_in_schema=False)(read_metrics)
+    app.include_router(auth_endpoints.router, prefix="/auth", tags=["auth"])
+    app.include_router(api_endpoints.router, prefix="/api", tags=["api"])
+    app.get("/")(read_root)
+    return app
+
+
+app = create_app()
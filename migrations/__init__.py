@@ -0,0 +1,81 @@
+"""Migrações versionadas do schema.
+
+Cada módulo em `migrations/versions` se chama `vNNNN_descricao.py` e define `upgrade(conn)`;
+a tabela `schema_version` guarda as versões já aplicadas.
+
+    python -m migrations upgrade   # aplica as pendentes
+    python -m migrations status    # versão atual e pendentes
+    python -m migrations explain   # confere se as consultas analíticas usam os índices
+"""
+import importlib
+import pkgutil
+from datetime import datetime, timezone
+from sqlalchemy import Column, DateTime, Integer, MetaData, String, Table, inspect, select, text
+
+# Chave arbitrária do advisory lock do Postgres; impede dois processos migrando ao mesmo tempo.
+ADVISORY_LOCK_KEY = 72_011
+
+metadata = MetaData()
+
+schema_version = Table(
+    "schema_version", metadata,
+    Column("version", Integer, primary_key=True),
+    Column("description", String),
+    Column("applied_at", DateTime(timezone=True)),
+    schema="public",
+)
+
+
+def load_migrations():
+    from migrations import versions
+
+    found = []
+    for module_info in pkgutil.iter_modules(versions.__path__):
+        if not module_info.name.startswith("v"):
+            continue
+        module = importlib.import_module(f"{versions.__name__}.{module_info.name}")
+        version = int(module_info.name[1:5])
+        description = (module.__doc__ or module_info.name).strip().splitlines()[0]
+        found.append((version, description, module))
+    return sorted(found, key=lambda migration: migration[0])
+
+
+def applied_versions(conn) -> set[int]:
+    # O inspector não aplica o schema_translate_map (o SQLite não tem o schema "public").
+    translate = conn.get_execution_options().get("schema_translate_map") or {}
+    schema = translate.get(schema_version.schema, schema_version.schema)
+    if not inspect(conn).has_table(schema_version.name, schema=schema):
+        return set()
+    return set(conn.execute(select(schema_version.c.version)).scalars())
+
+
+def pending(conn):
+    applied = applied_versions(conn)
+    return [migration for migration in load_migrations() if migration[0] not in applied]
+
+
+def upgrade(engine, target: int | None = None):
+    """Aplica, em ordem e cada uma na sua transação, as migrações pendentes até `target`."""
+    applied = []
+    with engine.connect() as lock_conn:
+        if engine.dialect.name == "postgresql":
+            lock_conn.execute(text("SELECT pg_advisory_lock(:key)"), {"key": ADVISORY_LOCK_KEY})
+            lock_conn.commit()
+        try:
+            with engine.begin() as conn:
+                metadata.create_all(conn, checkfirst=True)
+                todo = pending(conn)
+            for version, description, module in todo:
+                if target is not None and version > target:
+                    break
+                with engine.begin() as conn:
+                    module.upgrade(conn)
+                    conn.execute(schema_version.insert().values(
+                        version=version, description=description, applied_at=datetime.now(timezone.utc),
+                    ))
+                applied.append((version, description))
+        finally:
+            if engine.dialect.name == "postgresql":
+                lock_conn.execute(text("SELECT pg_advisory_unlock(:key)"), {"key": ADVISORY_LOCK_KEY})
+                lock_conn.commit()
+    return applied
@@ -0,0 +1,45 @@
+import argparse
+import sys
+from database import engine
+import migrations
+
+
+def main(argv):
+    parser = argparse.ArgumentParser(prog="python -m migrations")
+    commands = parser.add_subparsers(dest="command", required=True)
+    upgrade_parser = commands.add_parser("upgrade", help="aplica as migrações pendentes")
+    upgrade_parser.add_argument("--target", type=int, help="para nesta versão")
+    commands.add_parser("status", help="mostra a versão atual e as pendentes")
+    commands.add_parser("explain", help="confere os planos das consultas analíticas")
+    args = parser.parse_args(argv)
+
+    if args.command == "upgrade":
+        applied = migrations.upgrade(engine, args.target)
+        for version, description in applied:
+            print(f"Aplicada {version:04d}: {description}")
+        if not applied:
+            print("Nenhuma migração pendente.")
+        return 0
+
+    if args.command == "status":
+        with engine.connect() as conn:
+            applied = migrations.applied_versions(conn)
+            todo = migrations.pending(conn)
+        print(f"Versão atual: {max(applied, default=0):04d}")
+        for version, description, _ in todo:
+            print(f"Pendente {version:04d}: {description}")
+        return 1 if todo else 0
+
+    from migrations import explain
+
+    with engine.connect() as conn:
+        failures = explain.check_plans(conn)
+    for name, problem in failures.items():
+        print(f"{name}: {problem}")
+    if not failures:
+        print("Todos os planos usam os índices esperados.")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
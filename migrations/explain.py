@@ -0,0 +1,90 @@
+"""Confere, com EXPLAIN, se as consultas dos endpoints analíticos usam os índices esperados.
+
+No Postgres o plano é gerado com `enable_seqscan = off`: num banco pequeno o planner prefere
+varrer a tabela, e o que interessa aqui é saber se o índice existe e é aplicável à consulta.
+"""
+import json
+import re
+from contextlib import contextmanager
+from sqlalchemy import event
+
+PRIMARY_KEY = "PRIMARY KEY"
+
+
+def _checks(dialect: str):
+    from app.api import aggregates, endpoints, search, series
+
+    trimestre = ((2024, 7), (2024, 9))
+    # No SQLite a busca usa a tabela FTS5 (virtual); no Postgres, os dois índices GIN num BitmapOr.
+    busca = {
+        name: (lambda busca=busca: search.search_stmt(busca, dialect, "fer sil", None, 20),
+               {f"{table}_busca"} if dialect == "sqlite" else {f"ix_{table}_busca_tsv", f"ix_{table}_busca_trgm"})
+        for name, busca, table in (("busca_empresas", search.EMPRESAS, "empresas"), ("busca_produtos", search.PRODUTOS, "detalhes_produtos"))
+    }
+
+    return {
+        "insights": (aggregates.insights_stmt, {PRIMARY_KEY}),
+        "insights_refresh": (
+            lambda: aggregates.resumo_update([1]),
+            {"ix_faturamento_empresa", "ix_produtos_vendidos_faturamento", "ix_avaliacoes_empresa"},
+        ),
+        "pioresdiretores": (endpoints.piores_diretores_stmt, {"ix_faturamento_anual"}),
+        "faturamento_por_produto": (endpoints.faturamento_por_produto_stmt, {"ix_produtos_vendidos_quantidade"}),
+        "faturamento_mensal": (lambda: series.faturamento_mensal_stmt(*trimestre), {"ix_faturamento_periodo"}),
+        "faturamento_mensal_empresa": (lambda: series.faturamento_mensal_stmt(*trimestre, id_empresa=1), {"ix_faturamento_empresa_periodo"}),
+        "acumulado_12m": (lambda: series.acumulado_12m_stmt(*trimestre), {"ix_faturamento_periodo"}),
+        "produtos_vendidos_mensal": (lambda: series.produtos_vendidos_mensal_stmt(*trimestre), {"ix_produtos_vendidos_periodo"}),
+        **busca,
+    }
+
+
+@contextmanager
+def _explaining(conn, prefix: str):
+    # O prefixo entra no SQL já compilado, com schema_translate_map e parâmetros resolvidos.
+    def add_prefix(conn, cursor, statement, parameters, context, executemany):
+        return f"{prefix} {statement}", parameters
+
+    event.listen(conn, "before_cursor_execute", add_prefix, retval=True)
+    try:
+        yield
+    finally:
+        event.remove(conn, "before_cursor_execute", add_prefix)
+
+
+def _walk(plan):
+    yield plan
+    for child in plan.get("Plans", ()):
+        yield from _walk(child)
+
+
+def indexes_used(conn, stmt) -> set[str]:
+    if conn.dialect.name == "sqlite":
+        with _explaining(conn, "EXPLAIN QUERY PLAN"):
+            details = [row[-1] for row in conn.execute(stmt)]
+        used = {name for detail in details for name in re.findall(r"USING (?:COVERING )?INDEX (\w+)", detail)}
+        used |= {name for detail in details for name in re.findall(r"SCAN (\w+) VIRTUAL TABLE INDEX \d+:M", detail)}
+        if any(PRIMARY_KEY in detail for detail in details):
+            used.add(PRIMARY_KEY)
+        return used
+
+    conn.exec_driver_sql("SET LOCAL enable_seqscan = off")
+    with _explaining(conn, "EXPLAIN (FORMAT JSON)"):
+        plan = conn.execute(stmt).scalar()
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    used = {node["Index Name"] for node in _walk(plan[0]["Plan"]) if "Index Name" in node}
+    if any(name.endswith("_pkey") for name in used):
+        used.add(PRIMARY_KEY)
+    return used
+
+
+def check_plans(conn) -> dict:
+    """Devolve, por consulta, os índices esperados que ficaram fora do plano."""
+    failures = {}
+    with conn.begin():
+        for name, (build, expected) in _checks(conn.dialect.name).items():
+            missing = expected - indexes_used(conn, build())
+            if missing:
+                failures[name] = f"plano não usa {', '.join(sorted(missing))}"
+        conn.rollback()
+    return failures
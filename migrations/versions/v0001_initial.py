@@ -0,0 +1,68 @@
+"""Schema inicial (tabelas de usuários e de empresas)
+
+Cópia fixa das tabelas como estavam quando o schema era criado por `create_all`; bancos que
+já têm as tabelas só passam a registrar a versão.
+"""
+from sqlalchemy import Column, Date, Float, ForeignKey, Integer, MetaData, String, Table
+
+metadata = MetaData()
+
+Table(
+    "users", metadata,
+    Column("id", Integer, primary_key=True, index=True),
+    Column("email", String, unique=True, index=True),
+    Column("hashed_password", String),
+    schema="public",
+)
+
+Table(
+    "empresas", metadata,
+    Column("id_empresa", Integer, primary_key=True, autoincrement=True),
+    Column("nome_empresa", String),
+    Column("diretor_empresa", String),
+    schema="public",
+)
+
+Table(
+    "faturamento", metadata,
+    Column("id_faturamento", Integer, primary_key=True),
+    Column("id_empresa", Integer, ForeignKey("public.empresas.id_empresa")),
+    Column("faturamento_mensal", Float),
+    Column("faturamento_anual", Float),
+    schema="public",
+)
+
+Table(
+    "produtos_vendidos", metadata,
+    Column("id_venda", Integer, primary_key=True),
+    Column("id_faturamento", Integer, ForeignKey("public.faturamento.id_faturamento")),
+    Column("nome_produto", String),
+    Column("produtos_vendidos", Integer),
+    schema="public",
+)
+
+Table(
+    "detalhes_produtos", metadata,
+    Column("id_produto", Integer, primary_key=True, autoincrement=True),
+    Column("id_empresa", Integer, ForeignKey("public.empresas.id_empresa")),
+    Column("nome_produto", String),
+    Column("categoria", String),
+    Column("preco_unitario", Float),
+    Column("margem_lucro_percentual", Float),
+    Column("data_lancamento", Date),
+    schema="public",
+)
+
+Table(
+    "avaliacoes_diretor_empresa", metadata,
+    Column("id_avaliacao", Integer, primary_key=True, autoincrement=True),
+    Column("id_empresa", Integer, ForeignKey("public.empresas.id_empresa")),
+    Column("nota_diretor", Integer),
+    Column("nota_geral_empresa", Integer),
+    Column("comentario", String),
+    schema="public",
+)
+
+
+def upgrade(conn):
+    metadata.create_all(conn, checkfirst=True)
@@ -0,0 +1,47 @@
+"""Tabelas de agregados das empresas (empresa_resumo, empresa_produto_resumo)
+
+Além de criar as tabelas, calcula os agregados a partir dos dados existentes, para que
+/insights não comece vazio num banco que já tem empresas.
+"""
+from sqlalchemy import Column, Float, ForeignKey, Integer, MetaData, String, Table
+from sqlalchemy.orm import Session
+
+metadata = MetaData()
+
+Table("empresas", metadata, Column("id_empresa", Integer, primary_key=True), schema="public")
+
+Table(
+    "empresa_resumo", metadata,
+    Column("id_empresa", Integer, ForeignKey("public.empresas.id_empresa"), primary_key=True),
+    Column("n_faturamentos", Integer, nullable=False),
+    Column("soma_faturamento_anual", Float, nullable=False),
+    Column("n_faturamento_anual", Integer, nullable=False),
+    Column("n_vendas", Integer, nullable=False),
+    Column("soma_faturamento_vendas", Float, nullable=False),
+    Column("n_faturamento_vendas", Integer, nullable=False),
+    Column("soma_produtos_vendidos", Integer, nullable=False),
+    Column("n_produtos_vendidos", Integer, nullable=False),
+    Column("n_avaliacoes", Integer, nullable=False),
+    Column("soma_nota_geral", Integer, nullable=False),
+    Column("n_nota_geral", Integer, nullable=False),
+    Column("soma_nota_diretor", Integer, nullable=False),
+    Column("n_nota_diretor", Integer, nullable=False),
+    schema="public",
+)
+
+Table(
+    "empresa_produto_resumo", metadata,
+    Column("id", Integer, primary_key=True, autoincrement=True),
+    Column("id_empresa", Integer, ForeignKey("public.empresas.id_empresa"), index=True),
+    Column("nome_produto", String),
+    Column("n_detalhes", Integer, nullable=False),
+    schema="public",
+)
+
+
+def upgrade(conn):
+    from app.api import aggregates
+
+    metadata.tables["public.empresa_resumo"].create(conn, checkfirst=True)
+    metadata.tables["public.empresa_produto_resumo"].create(conn, checkfirst=True)
+    aggregates.refresh_empresas(Session(bind=conn))
@@ -0,0 +1,28 @@
+"""Índices nas FKs e nas colunas de ordenação usadas pelos endpoints analíticos
+
+Os índices das FKs incluem as colunas somadas pelos agregados, então as subconsultas de
+`refresh_empresas` e os JOINs de /insights são resolvidos só pelo índice (covering).
+"""
+from sqlalchemy import Column, Index, MetaData, Table
+
+INDEXES = {
+    "ix_faturamento_empresa": ("faturamento", ("id_empresa", "faturamento_anual")),
+    "ix_faturamento_anual": ("faturamento", ("faturamento_anual", "id_empresa")),
+    "ix_produtos_vendidos_faturamento": ("produtos_vendidos", ("id_faturamento", "produtos_vendidos")),
+    "ix_produtos_vendidos_quantidade": ("produtos_vendidos", ("produtos_vendidos", "id_faturamento", "nome_produto")),
+    "ix_detalhes_produtos_empresa": ("detalhes_produtos", ("id_empresa", "nome_produto")),
+    "ix_avaliacoes_empresa": ("avaliacoes_diretor_empresa", ("id_empresa", "nota_geral_empresa", "nota_diretor")),
+}
+
+
+def upgrade(conn):
+    metadata = MetaData()
+    tables = {}
+    for name, (table_name, columns) in INDEXES.items():
+        table = tables.get(table_name)
+        if table is None:
+            table = tables[table_name] = Table(table_name, metadata, schema="public")
+        for column in columns:
+            if column not in table.c:
+                table.append_column(Column(column))
+        Index(name, *(table.c[column] for column in columns)).create(conn, checkfirst=True)
@@ -0,0 +1,16 @@
+"""Tabela revoked_tokens (jti e famílias de refresh token revogados)"""
+from sqlalchemy import BigInteger, Column, Integer, MetaData, String, Table
+
+metadata = MetaData()
+
+Table(
+    "revoked_tokens", metadata,
+    Column("id", Integer, primary_key=True, autoincrement=True),
+    Column("token_id", String, unique=True, nullable=False),
+    Column("expires_at", BigInteger, nullable=False, index=True),
+    schema="public",
+)
+
+
+def upgrade(conn):
+    metadata.tables["public.revoked_tokens"].create(conn, checkfirst=True)
@@ -0,0 +1,50 @@
+"""Colunas ano/mes em faturamento e produtos_vendidos, com índices por período
+
+As linhas que já existem ficam com o período nulo e não entram nas consultas por intervalo
+até serem atualizadas (PUT ou bulk com on_conflict=update). Linhas novas precisam do período
+(os schemas de criação exigem `ano` e `mes`).
+
+Regra do preenchimento das linhas antigas: primeiro o faturamento; cada venda em
+produtos_vendidos recebe o período do faturamento a que pertence, como faz o seed dos
+benchmarks. No banco, depois de preencher o faturamento:
+
+    UPDATE produtos_vendidos AS pv SET ano = f.ano, mes = f.mes
+    FROM faturamento AS f
+    WHERE f.id_faturamento = pv.id_faturamento AND pv.ano IS NULL AND f.ano IS NOT NULL;
+"""
+from sqlalchemy import Column, Index, Integer, MetaData, Table, inspect
+
+COLUMNS = {
+    "faturamento": ("ano", "mes"),
+    "produtos_vendidos": ("ano", "mes"),
+}
+
+INDEXES = {
+    "ix_faturamento_periodo": ("faturamento", ("ano", "mes", "id_empresa", "faturamento_mensal")),
+    "ix_faturamento_empresa_periodo": ("faturamento", ("id_empresa", "ano", "mes", "faturamento_mensal")),
+    "ix_produtos_vendidos_periodo": ("produtos_vendidos", ("ano", "mes", "id_faturamento", "produtos_vendidos")),
+}
+
+
+def upgrade(conn):
+    # ALTER TABLE vai como texto, então o schema_translate_map é aplicado aqui (o SQLite não tem "public").
+    translate = conn.get_execution_options().get("schema_translate_map") or {}
+    schema = translate.get("public", "public")
+    preparer = conn.dialect.identifier_preparer
+    for table_name, columns in COLUMNS.items():
+        existing = {column["name"] for column in inspect(conn).get_columns(table_name, schema=schema)}
+        qualified = preparer.format_table(Table(table_name, MetaData(), schema=schema))
+        for column in columns:
+            if column not in existing:
+                conn.exec_driver_sql(f"ALTER TABLE {qualified} ADD COLUMN {preparer.quote(column)} INTEGER")
+
+    metadata = MetaData()
+    tables = {}
+    for name, (table_name, columns) in INDEXES.items():
+        table = tables.get(table_name)
+        if table is None:
+            table = tables[table_name] = Table(table_name, metadata, schema="public")
+        for column in columns:
+            if column not in table.c:
+                table.append_column(Column(column, Integer))
+        Index(name, *(table.c[column] for column in columns)).create(conn, checkfirst=True)
@@ -0,0 +1,59 @@
+"""Índices de busca textual em empresas e detalhes_produtos
+
+No PostgreSQL: extensão pg_trgm e, por tabela, um índice GIN do tsvector ('simple') e outro de
+trigramas sobre a concatenação das colunas buscadas. As expressões são as mesmas que
+`app/api/search.py` monta nas consultas; se mudarem lá, precisam mudar aqui.
+
+No SQLite: uma tabela FTS5 de conteúdo externo por tabela (rowid = chave primária), mantida
+por triggers e preenchida com 'rebuild', o que também a corrige se já existia.
+"""
+
+SEARCHES = {
+    "empresas": ("id_empresa", ("nome_empresa", "diretor_empresa")),
+    "detalhes_produtos": ("id_produto", ("nome_produto", "categoria")),
+}
+
+
+def _texto(columns) -> str:
+    return " || ' ' || ".join(f"coalesce({column}, '')" for column in columns)
+
+
+def _upgrade_postgresql(conn):
+    conn.exec_driver_sql("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    for table, (_, columns) in SEARCHES.items():
+        texto = _texto(columns)
+        conn.exec_driver_sql(f"CREATE INDEX IF NOT EXISTS ix_{table}_busca_tsv ON public.{table} USING gin (to_tsvector('simple', {texto}))")
+        conn.exec_driver_sql(f"CREATE INDEX IF NOT EXISTS ix_{table}_busca_trgm ON public.{table} USING gin (({texto}) gin_trgm_ops)")
+
+
+def _upgrade_sqlite(conn):
+    for table, (pk, columns) in SEARCHES.items():
+        fts = f"{table}_busca"
+        names = ", ".join(columns)
+        new = ", ".join(f"new.{column}" for column in columns)
+        old = ", ".join(f"old.{column}" for column in columns)
+        conn.exec_driver_sql(
+            f"CREATE VIRTUAL TABLE IF NOT EXISTS {fts} USING fts5({names}, content='{table}', content_rowid='{pk}',"
+            " tokenize='unicode61 remove_diacritics 2', prefix='2 3')"
+        )
+        conn.exec_driver_sql(f"""
+            CREATE TRIGGER IF NOT EXISTS {fts}_ai AFTER INSERT ON {table} BEGIN
+                INSERT INTO {fts}(rowid, {names}) VALUES (new.{pk}, {new});
+            END""")
+        conn.exec_driver_sql(f"""
+            CREATE TRIGGER IF NOT EXISTS {fts}_ad AFTER DELETE ON {table} BEGIN
+                INSERT INTO {fts}({fts}, rowid, {names}) VALUES ('delete', old.{pk}, {old});
+            END""")
+        conn.exec_driver_sql(f"""
+            CREATE TRIGGER IF NOT EXISTS {fts}_au AFTER UPDATE OF {pk}, {names} ON {table} BEGIN
+                INSERT INTO {fts}({fts}, rowid, {names}) VALUES ('delete', old.{pk}, {old});
+                INSERT INTO {fts}(rowid, {names}) VALUES (new.{pk}, {new});
+            END""")
+        conn.exec_driver_sql(f"INSERT INTO {fts}({fts}) VALUES ('rebuild')")
+
+
+def upgrade(conn):
+    if conn.dialect.name == "postgresql":
+        _upgrade_postgresql(conn)
+    elif conn.dialect.name == "sqlite":
+        _upgrade_sqlite(conn)
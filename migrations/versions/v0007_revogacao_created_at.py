@@ -0,0 +1,19 @@
+"""Coluna created_at em revoked_tokens, o cursor da sincronização entre workers
+
+As linhas que já existem ficam com 0 e entram na carga inicial de cada worker, como antes.
+"""
+from sqlalchemy import Column, Float, Index, MetaData, Table, inspect
+
+
+def upgrade(conn):
+    # ALTER TABLE vai como texto, então o schema_translate_map é aplicado aqui (o SQLite não tem "public").
+    translate = conn.get_execution_options().get("schema_translate_map") or {}
+    schema = translate.get("public", "public")
+    preparer = conn.dialect.identifier_preparer
+    existing = {column["name"] for column in inspect(conn).get_columns("revoked_tokens", schema=schema)}
+    if "created_at" not in existing:
+        qualified = preparer.format_table(Table("revoked_tokens", MetaData(), schema=schema))
+        conn.exec_driver_sql(f"ALTER TABLE {qualified} ADD COLUMN created_at FLOAT NOT NULL DEFAULT 0")
+
+    table = Table("revoked_tokens", MetaData(), Column("created_at", Float), schema="public")
+    Index("ix_revoked_tokens_created_at", table.c.created_at).create(conn, checkfirst=True)
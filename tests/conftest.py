@@ -0,0 +1,43 @@
+"""Fixtures da suíte: SQLite num diretório temporário, dados de `benchmarks.common.seed`.
+
+    python -m pytest -q
+"""
+import os
+import tempfile
+
+os.environ["BENCH_DATABASE_URL"] = f"sqlite:///{os.path.join(tempfile.mkdtemp(prefix='api-tests-'), 'tests.db')}"
+os.environ.setdefault("STARTUP_WARMUP", "0")
+
+import pytest  # noqa: E402
+
+from app.api.cache import response_cache  # noqa: E402
+from benchmarks.common import client, seed  # noqa: E402
+
+EMPRESAS = 30
+TAGS = ("empresas", "faturamento", "produtos_vendidos", "detalhes_produtos", "avaliacoes")
+
+
+@pytest.fixture
+def banco():
+    """Banco recém-semeado, com o cache de respostas invalidado."""
+    seed(EMPRESAS)
+    response_cache.invalidate(*TAGS)
+
+
+@pytest.fixture
+def http(banco):
+    """Cliente autenticado sobre o banco semeado."""
+    with client() as http:
+        yield http
+
+
+@pytest.fixture
+def autenticado(http):
+    """Cliente com o usuário já no cache de get_current_user: só os comandos da rota contam."""
+    http.get("/api/empresas/", params={"limit": 1}).raise_for_status()
+    return http
+
+
+def sql_statements(response) -> int:
+    """Comandos SQL da requisição, do cabeçalho X-SQL-Statements."""
+    return int(response.headers["X-SQL-Statements"])
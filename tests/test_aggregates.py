@@ -0,0 +1,30 @@
+from concurrent.futures import ThreadPoolExecutor
+
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.orm import Session
+
+from app.api import aggregates
+from benchmarks.common import engine
+
+
+def test_escritas_concorrentes_mantem_o_resumo(http):
+    def escrever(i):
+        empresa = i % 3 + 1
+        if i % 4 == 0:
+            response = http.post("/api/faturamento/", json={"id_empresa": empresa, "faturamento_mensal": 10.0, "faturamento_anual": 120.0 + i, "ano": 2024, "mes": i % 12 + 1})
+        elif i % 4 == 1:
+            response = http.put(f"/api/avaliacoes/{empresa * 2}", json={"nota_geral_empresa": i % 10})
+        else:
+            response = http.post("/api/avaliacoes/", json={"id_empresa": empresa, "nota_diretor": i % 10, "nota_geral_empresa": i % 7, "comentario": "x"})
+        assert response.status_code == 200, response.text
+
+    with ThreadPoolExecutor(8) as pool:
+        list(pool.map(escrever, range(80)))
+
+    with Session(engine) as db:
+        assert aggregates.check_consistency(db) == {}
+
+
+def test_recalculo_trava_as_linhas_no_postgresql():
+    sql = str(aggregates.lock_resumos([3, 1]).compile(dialect=postgresql.dialect()))
+    assert "FOR UPDATE" in sql and "ORDER BY" in sql
@@ -0,0 +1,37 @@
+import pytest
+from sqlalchemy import update
+from sqlalchemy.orm import Session
+
+from app.api import analytics
+from app.api import models as api_models
+from benchmarks.common import engine
+
+pytest.importorskip("numpy")
+
+
+def test_frame_recarrega_depois_do_ttl(monkeypatch, banco):
+    frame = analytics.ReportFrame()
+    monkeypatch.setattr(analytics, "REPORT_FRAME_TTL_SECONDS", 60)
+    with Session(engine) as db:
+        antes = frame.get(db)
+        # Escrita por fora da API: nenhuma geração muda.
+        db.execute(update(api_models.Faturamento).where(api_models.Faturamento.id_faturamento == 1).values(faturamento_anual=-1.0))
+        db.commit()
+
+        assert frame.get(db) is antes
+        frame._loaded_at -= 60
+        depois = frame.get(db)
+
+    assert depois is not antes
+    assert depois.faturamento_anual[depois.fat_id == 1].tolist() == [-1.0]
+
+
+@pytest.mark.parametrize("p", ["nan", "-1", "100.5"])
+def test_percentil_fora_da_faixa_responde_400(autenticado, p):
+    response = autenticado.get("/api/analytics/percentis/", params={"p": [50, p]})
+    assert response.status_code == 400
+
+
+def test_percentis_validos(autenticado):
+    response = autenticado.get("/api/analytics/percentis/", params={"p": [0, 50, 100]})
+    assert response.status_code == 200
@@ -0,0 +1,24 @@
+"""`main.create_app` só monta rotas e middlewares; o banco fica para o lifespan ou a primeira requisição."""
+import pytest
+
+import database
+import main
+
+
+def _sem_banco(*args, **kwargs):
+    raise AssertionError("create_app não deve criar engine")
+
+
+@pytest.mark.parametrize("modo_async", [False, True])
+def test_create_app_nao_toca_no_banco(monkeypatch, modo_async):
+    monkeypatch.setattr(main, "DB_ASYNC", modo_async)
+    monkeypatch.setattr(database, "_engines", {})
+    monkeypatch.setattr(database, "_create_engine", _sem_banco)
+    monkeypatch.delenv("DATABASE_URL", raising=False)
+
+    app = main.create_app()
+
+    assert database._engines == {}
+    caminhos = set(app.openapi()["paths"])
+    assert {"/", "/auth/token", "/api/empresas/"} <= caminhos
+    assert (database.get_db in app.dependency_overrides) is modo_async
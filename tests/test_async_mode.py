@@ -0,0 +1,90 @@
+"""Os endpoints no modo DB_ASYNC=1 (AsyncSession sobre sqlite+aiosqlite), na mesma base dos outros testes.
+
+O modo é lido na importação; aqui as flags são trocadas e a aplicação montada de novo por
+`create_app`, o que põe `get_async_db` no lugar de `get_db`.
+"""
+import pytest
+from sqlalchemy.ext.asyncio import AsyncEngine
+from starlette.testclient import TestClient
+
+import database
+import main
+from app.api import writebehind
+from app.auth.auth import create_access_token
+from benchmarks.common import BENCH_EMAIL
+from tests.conftest import EMPRESAS
+
+FATURAMENTO = {"id_empresa": 1, "faturamento_mensal": 1.0, "faturamento_anual": 12.0, "ano": 2024, "mes": 1}
+VENDA = {"id_faturamento": 1, "nome_produto": "P", "produtos_vendidos": 3, "ano": 2024, "mes": 1}
+DETALHE = {"id_empresa": 1, "nome_produto": "P", "categoria": "C", "preco_unitario": 1.0, "margem_lucro_percentual": 1.0, "data_lancamento": "2024-01-01"}
+AVALIACAO = {"id_empresa": 1, "nota_diretor": 7, "nota_geral_empresa": 8, "comentario": "ok"}
+
+
+@pytest.fixture
+def http_async(monkeypatch, banco):
+    for module in (database, main, writebehind):
+        monkeypatch.setattr(module, "DB_ASYNC", True)
+    app = main.create_app()
+    token = create_access_token(data={"sub": BENCH_EMAIL})
+    with TestClient(app, headers={"Authorization": f"Bearer {token}"}) as http:
+        assert app.dependency_overrides[database.get_db] is database.get_async_db
+        yield http
+    engine = database._engines["async"]
+    assert isinstance(engine, AsyncEngine) and engine.dialect.driver == "aiosqlite"
+
+
+@pytest.mark.parametrize("url, linhas", [
+    ("/api/empresas/", EMPRESAS),
+    ("/api/faturamento/", 100),
+    ("/api/produtos_vendidos/", 100),
+    ("/api/detalhes_produtos/", EMPRESAS * 2),
+    ("/api/avaliacoes/", EMPRESAS * 2),
+])
+def test_listas(http_async, url, linhas):
+    response = http_async.get(url)
+    assert response.status_code == 200
+    assert len(response.json()) == linhas
+
+
+@pytest.mark.parametrize("url", [
+    "/api/insights/", "/api/insights/maior_lucro/", "/api/pioresdiretores/", "/api/faturamento_por_produto",
+    "/api/media_notas_diretor/", "/api/dashboard/", "/api/busca/empresas/?q=empresa",
+    "/api/faturamento/mensal/?de=2021-01&ate=2024-12", "/api/empresas/?expand=faturamentos.produtos_vendidos",
+])
+def test_relatorios(http_async, url):
+    assert http_async.get(url).status_code == 200
+
+
+def test_export_em_streaming(http_async):
+    response = http_async.get("/api/empresas/", params={"format": "csv", "fields": "id_empresa"})
+    assert response.status_code == 200
+    assert response.text.split() == ["id_empresa", *map(str, range(1, EMPRESAS + 1))]
+
+
+@pytest.mark.parametrize("url, body", [
+    ("/api/empresas/", {"nome_empresa": "E", "diretor_empresa": "D"}),
+    ("/api/faturamento/", FATURAMENTO),
+    ("/api/produtos_vendidos/", VENDA),
+    ("/api/detalhes_produtos/", DETALHE),
+    ("/api/avaliacoes/", AVALIACAO),
+])
+def test_escritas(http_async, url, body):
+    response = http_async.post(url, json=body)
+    assert response.status_code == 200
+    assert {key: response.json()[key] for key in body} == body
+
+
+@pytest.mark.parametrize("method, url, body, detail", [
+    ("post", "/api/faturamento/", {**FATURAMENTO, "id_empresa": 999}, "Empresa com ID 999 não encontrada."),
+    ("post", "/api/produtos_vendidos/", {**VENDA, "id_faturamento": 99999}, "Faturamento com ID 99999 não encontrado."),
+    ("post", "/api/avaliacoes/", {**AVALIACAO, "id_empresa": 999}, "Empresa com ID 999 não encontrada."),
+    ("put", "/api/empresas/999", {"nome_empresa": "E", "diretor_empresa": "D"}, None),
+    ("put", "/api/faturamento/9999", {"faturamento_anual": 1.0}, None),
+    ("put", "/api/faturamento/1", {"id_empresa": 999}, "Empresa com ID 999 não encontrada."),
+    ("put", "/api/avaliacoes/999", {"nota_diretor": 1}, None),
+])
+def test_404(http_async, method, url, body, detail):
+    response = getattr(http_async, method)(url, json=body)
+    assert response.status_code == 404
+    if detail is not None:
+        assert response.json()["detail"] == detail
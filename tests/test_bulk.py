@@ -0,0 +1,42 @@
+from sqlalchemy import insert
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from app.api import bulk
+from app.api import models as api_models
+from benchmarks.common import engine
+from tests.conftest import EMPRESAS
+
+
+def _faturamento(id_faturamento=None, id_empresa=1, anual=100.0):
+    return {"id_faturamento": id_faturamento, "id_empresa": id_empresa, "faturamento_mensal": 1.0, "faturamento_anual": anual, "ano": 2024, "mes": 1}
+
+
+def test_id_repetido_no_lote_vira_erro_do_item(http):
+    for on_conflict in ("error", "ignore", "update"):
+        response = http.post("/api/faturamento/bulk", params={"on_conflict": on_conflict}, json=[_faturamento(5000), _faturamento(5000, anual=1.0)])
+        assert response.status_code == 200, response.text
+        itens = response.json()["itens"]
+        assert itens[1] == {"indice": 1, "status": "erro", "id": 5000, "erro": "ID 5000 repetido no lote."}
+        assert itens[0]["status"] in ("criado", "atualizado", "ignorado")
+
+
+def test_post_sem_id_depois_de_ids_explicitos(http):
+    assert http.post("/api/faturamento/bulk", json=[_faturamento(9000)]).json()["criados"] == 1
+    response = http.post("/api/faturamento/", json=_faturamento())
+    assert response.status_code == 200
+    assert response.json()["id_faturamento"] > 9000
+
+
+def test_erro_de_integridade_fica_no_item_recusado(http):
+    stmt = insert(api_models.Empresas).returning(api_models.Empresas.id_empresa)
+    rows = [
+        {"id_empresa": EMPRESAS + 1, "nome_empresa": "Nova", "diretor_empresa": "D"},
+        {"id_empresa": 1, "nome_empresa": "Repetida", "diretor_empresa": "D"},
+    ]
+    with Session(engine) as db:
+        outcomes = bulk._execute_rows(db, stmt, rows, "id_empresa")
+        db.commit()
+    assert outcomes[0] == EMPRESAS + 1
+    assert isinstance(outcomes[1], IntegrityError)
+    assert http.get("/api/empresas/", params={"limit": 1000}).json()[-1]["nome_empresa"] == "Nova"
@@ -0,0 +1,101 @@
+"""Negociação do Accept-Encoding, ETag por codificação (200 e 304) e corte do threadpool."""
+import asyncio
+import gzip
+
+import pytest
+
+from app import compression
+from app.compression import ENCODINGS, CompressionMiddleware, negotiate, strip_encoding
+from tests.conftest import sql_statements
+
+PREFERIDA = next(iter(ENCODINGS))
+
+
+@pytest.mark.parametrize("accept, esperado", [
+    ("gzip", "gzip"),
+    ("gzip;q=1, deflate", "gzip"),
+    ("GZIP", "gzip"),
+    ("*", PREFERIDA),
+    ("*;q=0.5, gzip;q=1", "gzip"),
+    ("gzip;q=0", None),
+    ("gzip;q=abc", None),
+    ("identity", None),
+    ("", None),
+])
+def test_negociacao(accept, esperado):
+    assert negotiate(accept) == esperado
+
+
+@pytest.mark.skipif("zstd" not in ENCODINGS or "br" not in ENCODINGS, reason="zstandard e brotli são opcionais")
+def test_negociacao_pelo_maior_q_e_pela_ordem_no_empate():
+    assert negotiate("gzip, br, zstd") == "zstd"
+    assert negotiate("gzip;q=1, br;q=0.8, zstd;q=0.5") == "gzip"
+    assert negotiate("br;q=0.9, zstd;q=0.9") == "zstd"
+
+
+def test_strip_encoding():
+    assert strip_encoding('"abc-gzip"') == '"abc"'
+    assert strip_encoding('"abc"') == '"abc"'
+
+
+def test_etag_com_sufixo_no_200_e_no_304(autenticado):
+    gzip_ = {"Accept-Encoding": "gzip"}
+    response = autenticado.get("/api/empresas/", params={"limit": 100}, headers=gzip_)
+    assert response.status_code == 200
+    assert response.headers["Content-Encoding"] == "gzip"
+    comprimido = response.headers["ETag"]
+    assert comprimido.endswith('-gzip"')
+
+    response = autenticado.get("/api/empresas/", params={"limit": 100}, headers={**gzip_, "If-None-Match": comprimido})
+    assert response.status_code == 304
+    assert response.headers["ETag"] == comprimido
+    assert sql_statements(response) == 0
+
+    # Quem validou a versão sem compressão recebe o ETag sem sufixo, com ou sem Accept-Encoding.
+    simples = strip_encoding(comprimido)
+    for headers in ({"Accept-Encoding": "identity"}, gzip_):
+        response = autenticado.get("/api/empresas/", params={"limit": 100}, headers={**headers, "If-None-Match": simples})
+        assert response.status_code == 304
+        assert response.headers["ETag"] == simples
+
+
+def _resposta(tamanho: int):
+    async def app(scope, receive, send):
+        await send({"type": "http.response.start", "status": 200, "headers": [(b"content-type", b"application/json")]})
+        await send({"type": "http.response.body", "body": b"1" * tamanho})
+    return app
+
+
+def _chama(middleware) -> list[dict]:
+    enviadas = []
+
+    async def send(message):
+        enviadas.append(message)
+
+    async def receive():
+        return {"type": "http.request"}
+
+    scope = {"type": "http", "method": "GET", "path": "/", "headers": [(b"accept-encoding", b"gzip")]}
+    asyncio.run(middleware(scope, receive, send))
+    return enviadas
+
+
+@pytest.mark.parametrize("tamanho, no_threadpool", [(100, False), (999, False), (1000, True), (5000, True)])
+def test_corpos_grandes_sao_comprimidos_no_threadpool(monkeypatch, tamanho, no_threadpool):
+    chamadas = []
+
+    async def run_in_threadpool(func, *args):
+        chamadas.append(len(args[0]))
+        return func(*args)
+
+    monkeypatch.setattr(compression, "run_in_threadpool", run_in_threadpool)
+    enviadas = _chama(CompressionMiddleware(_resposta(tamanho), minimum_size=10, thread_size=1000))
+
+    assert chamadas == ([tamanho] if no_threadpool else [])
+    assert gzip.decompress(enviadas[-1]["body"]) == b"1" * tamanho
+
+
+def test_corpo_pequeno_sai_sem_compressao():
+    enviadas = _chama(CompressionMiddleware(_resposta(100), minimum_size=1024))
+    assert (b"content-encoding", b"gzip") not in enviadas[0]["headers"]
+    assert enviadas[-1]["body"] == b"1" * 100
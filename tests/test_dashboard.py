@@ -0,0 +1,40 @@
+import threading
+import time
+
+from app.api import dashboard
+from app.api.cache import response_cache
+from database import checked_out_connections
+from tests.conftest import TAGS
+
+
+def test_consistente_da_o_mesmo_corpo_e_devolve_as_conexoes(http):
+    consistente = http.get("/api/dashboard/", params={"consistente": "true"})
+    assert consistente.status_code == 200
+    response_cache.invalidate(*TAGS)
+    paralelo = http.get("/api/dashboard/")
+    assert paralelo.status_code == 200
+    assert consistente.json() == paralelo.json()
+    assert checked_out_connections() == 0
+
+
+def test_fan_out_limitado_pelo_pool(monkeypatch, http):
+    monkeypatch.setattr(dashboard, "_fan_out_limit", lambda engine: 1)
+    monkeypatch.setattr(dashboard, "_fan_out", {})
+    lock = threading.Lock()
+    ativos, pico = [0], [0]
+    render = dashboard._render
+
+    def contado(report, db):
+        with lock:
+            ativos[0] += 1
+            pico[0] = max(pico[0], ativos[0])
+        try:
+            time.sleep(0.01)
+            return render(report, db)
+        finally:
+            with lock:
+                ativos[0] -= 1
+
+    monkeypatch.setattr(dashboard, "_render", contado)
+    assert http.get("/api/dashboard/").status_code == 200
+    assert pico[0] == 1
@@ -0,0 +1,37 @@
+"""expand= custa 1 + um SELECT ... IN por relação, qualquer que seja o tamanho da página."""
+import pytest
+
+from tests.conftest import EMPRESAS, sql_statements
+
+
+@pytest.mark.parametrize("url, expand, relacoes", [
+    ("/api/empresas/", None, 0),
+    ("/api/empresas/", "avaliacoes", 1),
+    ("/api/empresas/", "faturamentos,detalhes_produtos,avaliacoes", 3),
+    ("/api/empresas/", "faturamentos.produtos_vendidos,avaliacoes", 3),
+    ("/api/faturamento/", "empresa", 1),
+    ("/api/produtos_vendidos/", "faturamento.empresa", 2),
+    ("/api/avaliacoes/", "empresa", 1),
+])
+@pytest.mark.parametrize("limit", [1, 10, EMPRESAS])
+def test_comandos_fixos_por_requisicao(autenticado, url, expand, relacoes, limit):
+    params = {"limit": limit, **({"expand": expand} if expand else {})}
+    response = autenticado.get(url, params=params)
+    assert response.status_code == 200
+    assert len(response.json()) == limit
+    assert sql_statements(response) == 1 + relacoes
+
+
+def test_filhos_aninhados_batem_com_o_banco(autenticado):
+    empresas = autenticado.get("/api/empresas/", params={"limit": 5, "expand": "faturamentos.produtos_vendidos"}).json()
+    faturamentos = autenticado.get("/api/faturamento/", params={"limit": 1000, "expand": "produtos_vendidos"}).json()
+    por_empresa = {}
+    for faturamento in faturamentos:
+        por_empresa.setdefault(faturamento["id_empresa"], []).append(faturamento)
+    for empresa in empresas:
+        assert sorted(empresa["faturamentos"], key=lambda f: f["id_faturamento"]) == por_empresa.get(empresa["id_empresa"], [])
+
+
+def test_relacao_desconhecida(autenticado):
+    response = autenticado.get("/api/empresas/", params={"expand": "nada"})
+    assert response.status_code == 400
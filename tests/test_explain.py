@@ -0,0 +1,20 @@
+"""Planos das consultas analíticas num banco migrado e semeado (ver migrations/explain.py)."""
+import pytest
+
+from benchmarks.common import engine
+from migrations import explain
+
+CONSULTAS = sorted(explain._checks(engine.dialect.name))
+
+
+@pytest.mark.parametrize("name", CONSULTAS)
+def test_plano_usa_os_indices(banco, name):
+    build, expected = explain._checks(engine.dialect.name)[name]
+    with engine.connect() as conn:
+        used = explain.indexes_used(conn, build())
+        conn.rollback()
+    assert expected <= used, f"{name}: plano não usa {', '.join(sorted(expected - used))}"
+
+
+def test_endpoints_do_pedido_estao_cobertos():
+    assert {"insights", "pioresdiretores", "faturamento_por_produto"} <= set(CONSULTAS)
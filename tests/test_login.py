@@ -0,0 +1,75 @@
+import pytest
+from starlette.testclient import TestClient
+
+from app import metrics
+from app.auth import ratelimit
+from benchmarks.common import BENCH_EMAIL, app
+
+
+@pytest.fixture
+def baldes(monkeypatch, banco):
+    backend = ratelimit.MemoryRateLimitBackend(1000)
+    monkeypatch.setattr(ratelimit.login_ip_bucket, "backend", backend)
+    monkeypatch.setattr(ratelimit.login_email_bucket, "backend", backend)
+    # Reposição lenta: o bcrypt de cada tentativa não pode devolver fichas no meio do teste.
+    monkeypatch.setattr(ratelimit.login_ip_bucket, "rate", 1 / 3600)
+    monkeypatch.setattr(ratelimit.login_email_bucket, "rate", 1 / 3600)
+
+
+def _login(ip: str, email: str, senha: str, **headers):
+    with TestClient(app, client=(ip, 40000)) as http:
+        return http.post("/auth/token", data={"username": email, "password": senha}, headers=headers)
+
+
+def _bcrypt_calls() -> int:
+    return sum(state[-1] for state in metrics.PASSWORD_HASH.collect().values())
+
+
+def test_429_depois_da_rajada_sem_bcrypt(baldes):
+    burst = int(ratelimit.LOGIN_RATE_IP_BURST)
+    for i in range(burst):
+        assert _login("203.0.113.1", f"vitima{i}@example.com", "errada").status_code == 401
+
+    antes = _bcrypt_calls()
+    response = _login("203.0.113.1", "outra@example.com", "errada")
+    assert response.status_code == 429
+    assert int(response.headers["Retry-After"]) >= 1
+    assert _bcrypt_calls() == antes
+
+    # Quem está em outro IP continua entrando.
+    assert _login("10.0.0.1", BENCH_EMAIL, "bench").status_code == 200
+
+
+def test_email_inexistente_custa_um_bcrypt_como_senha_errada(baldes):
+    antes = _bcrypt_calls()
+    assert _login("203.0.113.2", "ninguem@example.com", "errada").status_code == 401
+    inexistente = _bcrypt_calls() - antes
+
+    antes = _bcrypt_calls()
+    assert _login("203.0.113.2", BENCH_EMAIL, "errada").status_code == 401
+    assert _bcrypt_calls() - antes == inexistente == 1
+
+
+def test_senhas_erradas_travam_so_o_email_atacado(baldes):
+    burst = int(ratelimit.LOGIN_RATE_EMAIL_BURST)
+    for i in range(burst):
+        assert _login(f"203.0.113.{10 + i}", "alvo@example.com", "errada").status_code == 401
+    assert _login("203.0.113.99", "alvo@example.com", "errada").status_code == 429
+    assert _login("203.0.113.99", BENCH_EMAIL, "bench").status_code == 200
+
+
+def test_x_forwarded_for_so_de_proxy_confiavel(monkeypatch, baldes):
+    monkeypatch.setattr(ratelimit, "TRUSTED_PROXIES", (ratelimit.ipaddress.ip_network("10.1.0.0/16"),))
+    burst = int(ratelimit.LOGIN_RATE_IP_BURST)
+
+    # Cabeçalho forjado de fora dos proxies: o balde continua sendo o da conexão.
+    for i in range(burst):
+        _login("203.0.113.3", f"vitima{i}@example.com", "errada", **{"X-Forwarded-For": f"198.51.100.{i}"})
+    assert _login("203.0.113.3", "x@example.com", "errada", **{"X-Forwarded-For": "198.51.100.200"}).status_code == 429
+
+    # Atrás do balanceador, cada cliente tem o seu balde; o que o cliente pôs à esquerda não conta.
+    for i in range(burst):
+        _login("10.1.0.5", f"vitima{i}@example.com", "errada", **{"X-Forwarded-For": f"1.2.3.{i}, 198.51.100.7"})
+    bloqueado = _login("10.1.0.5", "x@example.com", "errada", **{"X-Forwarded-For": "9.9.9.9, 198.51.100.7"})
+    assert bloqueado.status_code == 429
+    assert _login("10.1.0.6", BENCH_EMAIL, "bench", **{"X-Forwarded-For": "198.51.100.8, 10.1.0.9"}).status_code == 200
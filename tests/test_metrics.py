@@ -0,0 +1,33 @@
+import json
+import os
+import subprocess
+import sys
+
+from app import metrics
+
+
+def _pid_encerrado() -> int:
+    process = subprocess.Popen([sys.executable, "-c", "pass"])
+    process.wait()
+    return process.pid
+
+
+def test_gauges_por_worker_e_arquivos_de_workers_encerrados(monkeypatch, tmp_path):
+    monkeypatch.setattr(metrics, "METRICS_DIR", str(tmp_path))
+    gauge = metrics.Gauge("teste_replica_up", "Teste.", lambda: {("0",): 1}, ("replica",))
+    counter = metrics.Counter("teste_total", "Teste.")
+    monkeypatch.setattr(metrics, "REGISTRY", [gauge, counter])
+    counter.inc(amount=2)
+
+    morto = _pid_encerrado()
+    (tmp_path / f"{morto}.json").write_text(json.dumps({"teste_replica_up": {'["0"]': 1}, "teste_total": {"[]": 5}}))
+
+    texto = metrics.render()
+    assert f'teste_replica_up{{replica="0",worker="{os.getpid()}"}} 1' in texto
+    assert f'worker="{morto}"' not in texto
+    assert "teste_total 7" in texto
+    assert not (tmp_path / f"{morto}.json").exists()
+
+    # O total não diminui depois que o arquivo do worker encerrado some.
+    assert "teste_total 7" in metrics.render()
+    assert json.loads((tmp_path / "retired.json").read_text()) == {"teste_total": {"[]": 5}}
@@ -0,0 +1,86 @@
+import base64
+import json
+
+import pytest
+
+from app.api.pagination import NEXT_CURSOR_HEADER, encode_cursor
+from tests.conftest import EMPRESAS, sql_statements
+
+
+def _cursor(value) -> str:
+    return base64.urlsafe_b64encode(json.dumps({"k": value}).encode()).decode().rstrip("=")
+
+
+def test_percorre_todas_as_paginas(http):
+    ids, cursor = [], None
+    while True:
+        response = http.get("/api/empresas/", params={"limit": 7, **({"cursor": cursor} if cursor else {})})
+        assert response.status_code == 200
+        ids += [row["id_empresa"] for row in response.json()]
+        cursor = response.headers.get(NEXT_CURSOR_HEADER)
+        if cursor is None:
+            break
+    assert ids == list(range(1, EMPRESAS + 1))
+
+
+def test_cursor_valido(http):
+    response = http.get("/api/empresas/", params={"cursor": encode_cursor(3), "limit": 2})
+    assert [row["id_empresa"] for row in response.json()] == [4, 5]
+
+
+@pytest.mark.parametrize("cursor", [_cursor([1, 2]), _cursor("abc"), _cursor(True), _cursor(2.5), _cursor(None), _cursor(10**24), _cursor(-(2**63) - 1), "%%%", "e30"])
+def test_cursor_invalido_responde_400(http, cursor):
+    response = http.get("/api/empresas/", params={"cursor": cursor})
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Cursor inválido."
+
+
+def test_fields_projeta_colunas(http):
+    response = http.get("/api/empresas/", params={"fields": "nome_empresa", "limit": 1})
+    assert response.json() == [{"nome_empresa": "Empresa 1"}]
+
+
+def _lista(http, url="/api/empresas/", etag=None, **params):
+    headers = {"Accept-Encoding": "identity", **({"If-None-Match": etag} if etag else {})}
+    return http.get(url, params={"limit": 5, **params}, headers=headers)
+
+
+def test_listagem_com_etag_responde_304_sem_consultar_o_banco(autenticado):
+    response = _lista(autenticado)
+    etag = response.headers["ETag"]
+    assert response.status_code == 200
+
+    response = _lista(autenticado, etag=etag)
+    assert response.status_code == 304
+    assert response.headers["ETag"] == etag
+    assert sql_statements(response) == 0
+
+    # Cursor, limit e fields fazem parte da versão.
+    outras = [
+        _lista(autenticado, cursor=_cursor(5)),
+        _lista(autenticado, limit=6),
+        _lista(autenticado, fields="nome_empresa"),
+    ]
+    assert len({etag, *(r.headers["ETag"] for r in outras)}) == 4
+
+
+def test_escrita_muda_o_etag_da_listagem_e_das_relacoes(autenticado):
+    empresas = _lista(autenticado).headers["ETag"]
+    expandida = _lista(autenticado, expand="avaliacoes").headers["ETag"]
+    faturamento = _lista(autenticado, "/api/faturamento/").headers["ETag"]
+
+    criada = autenticado.post("/api/avaliacoes/", json={"id_empresa": 1, "nota_diretor": 5, "nota_geral_empresa": 5, "comentario": "x"})
+    assert criada.status_code == 200
+    # A avaliação só entra na listagem de empresas com expand=avaliacoes.
+    assert _lista(autenticado, etag=empresas).status_code == 304
+    assert _lista(autenticado, etag=expandida, expand="avaliacoes").status_code == 200
+    assert _lista(autenticado, "/api/faturamento/", etag=faturamento).status_code == 304
+
+    criada = autenticado.post("/api/empresas/", json={"nome_empresa": "E", "diretor_empresa": "D"})
+    assert criada.status_code == 200
+    assert _lista(autenticado, etag=empresas).status_code == 200
+
+
+def test_expand_invalido_continua_400(autenticado):
+    assert _lista(autenticado, expand="inexistente").status_code == 400
+
@@ -0,0 +1,65 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from passlib.hash import bcrypt
+from sqlalchemy import insert, select
+from starlette.testclient import TestClient
+
+from app.auth import auth
+from app.auth.models import User
+from benchmarks.common import app, engine
+
+
+@pytest.fixture
+def pool_de_um(monkeypatch):
+    """Um bcrypt por vez e nenhuma vaga na fila."""
+    executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="bcrypt-teste")
+    monkeypatch.setattr(auth, "_password_executor", executor)
+    monkeypatch.setattr(auth, "_password_slots", threading.BoundedSemaphore(1))
+    yield
+    executor.shutdown(wait=True)
+
+
+def _login(email: str, senha: str, ip: str = "192.0.2.10"):
+    with TestClient(app, client=(ip, 40000)) as http:
+        return http.post("/auth/token", data={"username": email, "password": senha})
+
+
+def test_pool_cheio_recusa_sem_enfileirar(pool_de_um):
+    async def duas_ao_mesmo_tempo():
+        return await asyncio.gather(
+            auth._run_password_task(time.sleep, 0.2), auth._run_password_task(time.sleep, 0.2), return_exceptions=True,
+        )
+
+    primeira, segunda = asyncio.run(duas_ao_mesmo_tempo())
+    assert primeira is None
+    assert isinstance(segunda, auth.PasswordPoolBusy)
+    # A vaga volta quando o bcrypt termina.
+    assert asyncio.run(auth._run_password_task(lambda: "ok")) == "ok"
+
+
+def test_login_com_pool_cheio_responde_503(pool_de_um, banco):
+    assert auth._password_slots.acquire(blocking=False)
+    try:
+        response = _login("ninguem@example.com", "x")
+    finally:
+        auth._password_slots.release()
+    assert response.status_code == 503
+    assert response.headers["Retry-After"] == "1"
+
+
+def test_login_refaz_o_hash_com_custo_antigo(banco):
+    antigo = bcrypt.using(rounds=4).hash("senha")
+    with engine.begin() as conn:
+        conn.execute(insert(User).values(email="antigo@example.com", hashed_password=antigo))
+
+    assert _login("antigo@example.com", "senha").status_code == 200
+
+    with engine.connect() as conn:
+        novo = conn.execute(select(User.hashed_password).where(User.email == "antigo@example.com")).scalar_one()
+    assert novo != antigo
+    assert bcrypt.from_string(novo).rounds == auth.BCRYPT_ROUNDS
+    assert auth.verify_password("senha", novo)
@@ -0,0 +1,55 @@
+"""O orçamento de conexões do gunicorn.conf.py e os limites de pool de cada papel de engine."""
+import os
+import runpy
+
+import pytest
+
+import database
+
+VARIAVEIS = ("DB_POOL_SIZE", "DB_MAX_OVERFLOW", "DB_AUX_POOL_SIZE", "DB_AUX_MAX_OVERFLOW",
+             "DB_REPLICA_POOL_SIZE", "DB_REPLICA_MAX_OVERFLOW", "DB_REPLICA_MAX_CONNECTIONS",
+             "DB_RESERVED_CONNECTIONS", "DB_ASYNC", "PASSWORD_HASH_WORKERS")
+
+
+@pytest.fixture
+def ambiente(monkeypatch):
+    # O gunicorn.conf.py escreve direto no os.environ; uma cópia isola o que ele define.
+    monkeypatch.setattr(os, "environ", {k: v for k, v in os.environ.items() if k not in VARIAVEIS})
+    monkeypatch.setenv("WEB_CONCURRENCY", "4")
+    monkeypatch.setenv("DB_MAX_CONNECTIONS", "50")
+    return monkeypatch
+
+
+def _conexoes(role):
+    size, overflow = database.pool_limits(role)
+    return size + overflow
+
+
+def test_orcamento_no_modo_sync(ambiente):
+    runpy.run_path("gunicorn.conf.py")
+    assert database.pool_limits("primario") == (12, 0)
+    assert 4 * _conexoes("primario") + 2 <= 50
+
+
+def test_orcamento_no_modo_async_conta_o_engine_auxiliar(ambiente):
+    ambiente.setenv("DB_ASYNC", "1")
+    runpy.run_path("gunicorn.conf.py")
+    assert database.pool_limits("auxiliar") == (2, 0)
+    assert database.pool_limits("primario") == (10, 0)
+    assert 4 * (_conexoes("primario") + _conexoes("auxiliar")) + 2 <= 50
+
+
+def test_orcamento_das_replicas(ambiente):
+    ambiente.setenv("DB_REPLICA_MAX_CONNECTIONS", "22")
+    runpy.run_path("gunicorn.conf.py")
+    assert database.pool_limits("replica") == (5, 0)
+
+
+def test_engine_auxiliar_tem_pool_proprio(monkeypatch, tmp_path):
+    monkeypatch.setenv("DB_POOL_SIZE", "7")
+    monkeypatch.setenv("DB_AUX_POOL_SIZE", "1")
+    engine = database._create_engine(f"sqlite:///{tmp_path / 'aux.db'}", use_async=False, role="auxiliar")
+    try:
+        assert engine.pool.size() == 1
+    finally:
+        engine.dispose()
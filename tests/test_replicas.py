@@ -0,0 +1,82 @@
+"""Réplica de leitura em outro arquivo SQLite: roteamento, read-your-writes e failover.
+
+A "replicação" é uma cópia do arquivo do banco dos testes; depois dela o primário recebe uma
+empresa que a réplica não tem, e o total da listagem mostra de onde veio cada leitura.
+"""
+import asyncio
+import shutil
+
+import pytest
+from sqlalchemy import insert, text
+from sqlalchemy.exc import OperationalError
+from starlette.testclient import TestClient
+
+import database
+import main
+from app.api import models as api_models
+from app.auth.auth import create_access_token
+from benchmarks.common import BENCH_EMAIL, engine
+from tests.conftest import EMPRESAS
+
+
+@pytest.fixture
+def replicas(monkeypatch, banco, tmp_path):
+    engine.dispose()
+    shutil.copyfile(engine.url.database, tmp_path / "replica.db")
+    with engine.begin() as conn:
+        conn.execute(insert(api_models.Empresas).values(nome_empresa="Só no primário", diretor_empresa="D"))
+
+    # A segunda réplica aponta para um caminho que não abre.
+    replica_set = database.ReplicaSet([f"sqlite:///{tmp_path / 'replica.db'}", f"sqlite:///{tmp_path / 'ausente' / 'replica.db'}"])
+    monkeypatch.setattr(database, "replicas", replica_set)
+    monkeypatch.setattr(main, "replicas", replica_set)
+    engines = dict(database._engines)
+    monkeypatch.setattr(database, "_engines", engines)
+    yield replica_set
+    for key, replica_engine in list(engines.items()):
+        if key.startswith("replica"):
+            replica_engine.dispose()
+
+
+@pytest.fixture
+def http_replicas(replicas):
+    token = create_access_token(data={"sub": BENCH_EMAIL})
+    with TestClient(main.create_app(), headers={"Authorization": f"Bearer {token}"}) as http:
+        yield http
+
+
+def _total(http) -> int:
+    response = http.get("/api/empresas/", params={"limit": 100})
+    assert response.status_code == 200
+    return len(response.json())
+
+
+def test_leituras_vao_para_a_replica_e_escritas_para_o_primario(replicas, http_replicas):
+    replicas.mark_down(1)
+    assert _total(http_replicas) == EMPRESAS
+
+    response = http_replicas.post("/api/empresas/", json={"nome_empresa": "Nova", "diretor_empresa": "D"})
+    assert response.status_code == 200
+    assert database.PRIMARY_COOKIE in response.cookies
+
+    # Read-your-writes: com o cookie, o mesmo cliente lê do primário.
+    assert _total(http_replicas) == EMPRESAS + 2
+    http_replicas.cookies.clear()
+    assert _total(http_replicas) == EMPRESAS
+
+
+def test_failover_tira_a_replica_que_nao_abre_do_rodizio(replicas, http_replicas):
+    asyncio.run(replicas.check())
+    assert replicas.healthy() == {("0",): 1, ("1",): 0}
+    for _ in range(4):
+        assert _total(http_replicas) == EMPRESAS
+
+    # Sem nenhuma réplica disponível, as leituras voltam ao primário.
+    replicas.mark_down(0)
+    assert _total(http_replicas) == EMPRESAS + 1
+
+
+def test_replica_recusa_escrita(replicas):
+    with replicas.engine(0, use_async=False).connect() as conn:
+        with pytest.raises(OperationalError):
+            conn.execute(text("DELETE FROM empresas"))
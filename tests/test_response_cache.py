@@ -0,0 +1,39 @@
+from tests.conftest import sql_statements
+
+URL = "/api/pioresdiretores/"
+DETALHE = {"id_empresa": 1, "nome_produto": "P", "categoria": "C", "preco_unitario": 1.0, "margem_lucro_percentual": 1.0, "data_lancamento": "2024-01-01"}
+FATURAMENTO = {"id_empresa": 30, "faturamento_mensal": 1.0, "faturamento_anual": -1e12, "ano": 2024, "mes": 1}
+
+
+def test_escrita_invalida_so_os_relatorios_da_tabela(autenticado):
+    primeira = autenticado.get(URL)
+    assert primeira.headers["X-Cache"] == "MISS"
+    segunda = autenticado.get(URL)
+    assert segunda.headers["X-Cache"] == "HIT"
+    assert sql_statements(segunda) == 0
+    assert segunda.content == primeira.content
+
+    # detalhes_produtos não é tag do relatório: a entrada continua valendo.
+    assert autenticado.post("/api/detalhes_produtos/", json=DETALHE).status_code == 200
+    assert autenticado.get(URL).headers["X-Cache"] == "HIT"
+
+    assert autenticado.post("/api/faturamento/", json=FATURAMENTO).status_code == 200
+    depois = autenticado.get(URL)
+    assert depois.headers["X-Cache"] == "MISS"
+    assert depois.content != primeira.content
+
+
+def test_if_none_match_responde_304_sem_consultar_o_banco(autenticado):
+    etag = autenticado.get(URL).headers["ETag"]
+
+    response = autenticado.get(URL, headers={"If-None-Match": etag})
+    assert response.status_code == 304
+    assert response.content == b""
+    assert sql_statements(response) == 0
+    assert autenticado.get(URL, headers={"If-None-Match": f"W/{etag}"}).status_code == 304
+    assert autenticado.get(URL, headers={"If-None-Match": '"outro"'}).status_code == 200
+
+    assert autenticado.post("/api/faturamento/", json=FATURAMENTO).status_code == 200
+    response = autenticado.get(URL, headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.headers["ETag"] != etag
@@ -0,0 +1,54 @@
+"""`FastJSONResponse` (orjson) produz o mesmo JSON que a `JSONResponse` com `jsonable_encoder` de antes."""
+import datetime
+import json
+from decimal import Decimal
+
+import pytest
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+
+from app.api import responses
+from app.api.responses import FastJSONResponse
+
+CONTEUDO = [
+    {
+        "id": 1,
+        "data_lancamento": datetime.date(2024, 1, 31),
+        "atualizado_em": datetime.datetime(2024, 1, 31, 12, 30, 5, 123456),
+        "com_fuso": datetime.datetime(2024, 1, 31, 12, 30, tzinfo=datetime.timezone.utc),
+        "preco": Decimal("10.25"),
+        "inteiro": Decimal("7"),
+        "margem": 0.5,
+        "comentario": None,
+        "nome": "Empresa Ação",
+        "notas": {1: 7, 2: None},
+    },
+]
+
+
+def _anterior(content) -> bytes:
+    return JSONResponse(jsonable_encoder(content)).body
+
+
+@pytest.mark.parametrize("orjson", [responses.orjson, None], ids=["orjson", "stdlib"])
+def test_mesmo_json_que_o_jsonable_encoder(monkeypatch, orjson):
+    if orjson is None:
+        monkeypatch.setattr(responses, "orjson", None)
+    corpo = FastJSONResponse(CONTEUDO).body
+    assert json.loads(corpo) == json.loads(_anterior(CONTEUDO))
+    item = json.loads(corpo)[0]
+    assert item["data_lancamento"] == "2024-01-31"
+    assert item["atualizado_em"] == "2024-01-31T12:30:05.123456"
+    assert item["com_fuso"] == "2024-01-31T12:30:00+00:00"
+    assert item["comentario"] is None
+    assert type(item["preco"]) is float and type(item["inteiro"]) is int
+    assert item["notas"] == {"1": 7, "2": None}
+
+
+def test_endpoint_serializa_datas_como_antes(autenticado):
+    response = autenticado.get("/api/detalhes_produtos/", params={"limit": 5})
+    assert response.status_code == 200
+    for item in response.json():
+        assert isinstance(item["data_lancamento"], (str, type(None)))
+        if item["data_lancamento"]:
+            datetime.date.fromisoformat(item["data_lancamento"])
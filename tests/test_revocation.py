@@ -0,0 +1,77 @@
+import time
+
+from sqlalchemy import insert
+from starlette.testclient import TestClient
+
+from app.auth.models import RevokedToken
+from app.auth.revocation import DatabaseRevocationBackend, RevocationStore
+from benchmarks.common import BENCH_EMAIL, app, engine
+from database import count_statements
+
+
+def test_consulta_so_em_memoria_e_sincronizacao_com_sobreposicao(banco):
+    outro_worker = RevocationStore(DatabaseRevocationBackend())
+    store = RevocationStore(DatabaseRevocationBackend())
+    expira = int(time.time()) + 3600
+
+    assert outro_worker.revoke("jti-a", expira)
+    with count_statements() as counter:
+        assert not store.is_revoked("jti-a")
+    assert counter[0] == 0
+
+    assert store.load()
+    assert store.is_revoked("jti-a")
+
+    # Linha mais antiga que o cursor que só ficou visível agora (commit fora de ordem): a janela
+    # de sobreposição a traz, o que `id > último id` perderia.
+    with engine.begin() as conn:
+        conn.execute(insert(RevokedToken).values(token_id="jti-b", expires_at=expira, created_at=time.time() - 2))
+    assert store.load()
+    assert store.is_revoked("jti-b")
+    assert store.is_revoked("jti-a")
+
+
+def _sessao(ip: str) -> dict:
+    with TestClient(app, client=(ip, 40000)) as http:
+        response = http.post("/auth/token", data={"username": BENCH_EMAIL, "password": "bench"})
+    assert response.status_code == 200
+    return response.json()
+
+
+def _me(http, access_token: str):
+    return http.get("/auth/users/me", headers={"Authorization": f"Bearer {access_token}"})
+
+
+def _refresh(http, refresh_token: str):
+    return http.post("/auth/token/refresh", data={"refresh_token": refresh_token})
+
+
+def test_refresh_devolve_um_par_novo(http):
+    par = _sessao("198.51.100.10")
+    response = _refresh(http, par["refresh_token"])
+    assert response.status_code == 200
+    novo = response.json()
+    assert novo["access_token"] != par["access_token"]
+    assert novo["refresh_token"] != par["refresh_token"]
+    assert _me(http, novo["access_token"]).status_code == 200
+    assert _refresh(http, novo["refresh_token"]).status_code == 200
+
+
+def test_reuso_de_refresh_trocado_revoga_a_familia(http):
+    par = _sessao("198.51.100.11")
+    novo = _refresh(http, par["refresh_token"]).json()
+
+    assert _refresh(http, par["refresh_token"]).status_code == 401
+    # A família inteira caiu: o par emitido na troca também deixa de valer.
+    assert _refresh(http, novo["refresh_token"]).status_code == 401
+    assert _me(http, novo["access_token"]).status_code == 401
+
+
+def test_logout_revoga_o_acesso(http):
+    par = _sessao("198.51.100.12")
+    assert _me(http, par["access_token"]).status_code == 200
+
+    response = http.post("/auth/logout", headers={"Authorization": f"Bearer {par['access_token']}"})
+    assert response.status_code == 200
+    assert _me(http, par["access_token"]).status_code == 401
+    assert _refresh(http, par["refresh_token"]).status_code == 401
@@ -0,0 +1,54 @@
+import pytest
+from sqlalchemy.dialects import postgresql
+
+from app.api.pagination import MAX_LIMIT, NEXT_CURSOR_HEADER, encode_cursor
+from app.api.search import EMPRESAS as BUSCA_EMPRESAS, search_stmt
+from tests.conftest import EMPRESAS
+
+
+def _pagina(http, **params):
+    response = http.get("/api/busca/empresas/", params={"q": "empresa", **params})
+    assert response.status_code == 200
+    return response.json(), response.headers.get(NEXT_CURSOR_HEADER)
+
+
+def test_melhor_correspondencia_primeiro_e_paginas_na_ordem_do_banco(http):
+    criada = http.post("/api/empresas/", json={"nome_empresa": "Empresa Empresa Empresa", "diretor_empresa": "Empresa"})
+    assert criada.status_code == 200
+
+    tudo, cursor = _pagina(http, limit=MAX_LIMIT)
+    assert cursor is None
+    assert len(tudo) == EMPRESAS + 1
+    assert tudo[0]["id_empresa"] == criada.json()["id_empresa"]
+    assert [(row["score"], row["id_empresa"]) for row in tudo] == sorted(
+        ((row["score"], row["id_empresa"]) for row in tudo), key=lambda item: (-item[0], item[1])
+    )
+
+    paginas, cursor = [], None
+    while True:
+        pagina, cursor = _pagina(http, limit=7, **({"cursor": cursor} if cursor else {}))
+        paginas += pagina
+        if cursor is None:
+            break
+    assert paginas == tudo
+
+
+@pytest.mark.parametrize("valor", [[1.0], ["x", 1], [1.0, "1"], [True, 1], [1.0, False], {"score": 1}, [1.0, 2**63], [float("nan"), 1]])
+def test_cursor_da_busca_invalido(http, valor):
+    response = http.get("/api/busca/empresas/", params={"q": "empresa", "cursor": encode_cursor(valor)})
+    assert response.status_code == 400
+    assert response.json() == {"detail": "Cursor inválido."}
+
+
+def test_keyset_do_postgresql_compara_o_score_em_double():
+    # ts_rank/word_similarity são float4 e o cursor guarda um double: os dois lados do
+    # `score < :ultimo OR (score = :ultimo AND id > :id)` precisam ser double precision.
+    stmt = search_stmt(BUSCA_EMPRESAS, "postgresql", "fer", encode_cursor([0.1, 3]), 10)
+    compilado = stmt.compile(dialect=postgresql.dialect())
+    sql = str(compilado)
+    score = sql[sql.index("CAST(greatest("):sql.index(" AS score")]
+    assert score.endswith("AS FLOAT(53))")
+    assert f"{score} < %(param_2)s" in sql
+    assert f"{score} = %(param_3)s" in sql
+    assert compilado.params["param_2"] == compilado.params["param_3"] == 0.1
+
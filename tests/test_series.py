@@ -0,0 +1,74 @@
+import math
+
+import pytest
+from sqlalchemy import select
+
+from app.api import models as api_models
+from benchmarks.common import PERIODO_INICIO, engine
+from benchmarks.series import _acumulado_12m, _mensal
+
+Faturamento = api_models.Faturamento
+ProdutosVendidos = api_models.ProdutosVendidos
+
+INTERVALOS = [
+    ((PERIODO_INICIO + 2, 7), (PERIODO_INICIO + 2, 9), None),
+    ((PERIODO_INICIO + 1, 1), (PERIODO_INICIO + 2, 12), None),
+    ((PERIODO_INICIO, 1), (PERIODO_INICIO + 3, 12), 3),
+]
+
+
+def _linhas():
+    with engine.connect() as conn:
+        faturamentos = conn.execute(select(Faturamento.id_empresa, Faturamento.ano, Faturamento.mes, Faturamento.faturamento_mensal)).all()
+        vendas = conn.execute(
+            select(Faturamento.id_empresa, ProdutosVendidos.ano, ProdutosVendidos.mes, ProdutosVendidos.produtos_vendidos)
+            .join(Faturamento, Faturamento.id_faturamento == ProdutosVendidos.id_faturamento)
+        ).all()
+    return faturamentos, vendas
+
+
+def _confere(expected, rows, fields):
+    actual = {(row["id_empresa"], row["ano"], row["mes"]): tuple(row[field] for field in fields) for row in rows}
+    assert actual.keys() == expected.keys()
+    for key, values in expected.items():
+        assert all(math.isclose(a, b, rel_tol=1e-9, abs_tol=1e-6) for a, b in zip(values, actual[key])), key
+
+
+@pytest.mark.parametrize("inicio, fim, id_empresa", INTERVALOS)
+def test_series_batem_com_a_referencia(http, inicio, fim, id_empresa):
+    faturamentos, vendas = _linhas()
+    params = {"de": f"{inicio[0]}-{inicio[1]:02d}", "ate": f"{fim[0]}-{fim[1]:02d}"}
+    if id_empresa is not None:
+        params["id_empresa"] = id_empresa
+
+    for url, expected, fields in (
+        ("/api/faturamento/mensal/", _mensal(faturamentos, inicio, fim, id_empresa),
+         ("soma_faturamento_mensal", "media_faturamento_mensal", "n_faturamentos")),
+        ("/api/faturamento/acumulado_12m/", _acumulado_12m(faturamentos, inicio, fim, id_empresa),
+         ("faturamento_12m", "meses_com_faturamento")),
+        ("/api/produtos_vendidos/mensal/", _mensal(vendas, inicio, fim, id_empresa),
+         ("soma_produtos_vendidos", "media_produtos_vendidos", "n_vendas")),
+    ):
+        response = http.get(url, params=params)
+        assert response.status_code == 200
+        assert expected, url
+        _confere(expected, response.json(), fields)
+
+
+@pytest.mark.parametrize("payload", [
+    {},
+    {"ano": 2024},
+    {"mes": 1},
+    {"ano": 1899, "mes": 1},
+    {"ano": 2101, "mes": 1},
+    {"ano": 2024, "mes": 13},
+])
+def test_periodo_obrigatorio_e_limitado_na_criacao(http, payload):
+    faturamento = {"id_empresa": 1, "faturamento_mensal": 1.0, "faturamento_anual": 12.0, **payload}
+    venda = {"id_faturamento": 1, "nome_produto": "P", "produtos_vendidos": 1, **payload}
+    assert http.post("/api/faturamento/", json=faturamento).status_code == 422
+    assert http.post("/api/produtos_vendidos/", json=venda).status_code == 422
+    for url, row in (("/api/faturamento/bulk", faturamento), ("/api/produtos_vendidos/bulk", venda)):
+        response = http.post(url, json=[row])
+        assert response.status_code == 200
+        assert [item["status"] for item in response.json()["itens"]] == ["erro"]
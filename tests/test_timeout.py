@@ -0,0 +1,41 @@
+from types import SimpleNamespace
+
+import pytest
+from sqlalchemy import text
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import Session
+
+import database
+from benchmarks.common import engine
+
+LENTA = "WITH RECURSIVE n(i) AS (SELECT 1 UNION ALL SELECT i + 1 FROM n) SELECT count(*) FROM n"
+
+
+def test_limite_vale_para_comandos_de_transacao_ja_aberta(banco):
+    with Session(engine) as db:
+        # Como a autenticação: a transação começa antes de o handler definir o limite.
+        db.execute(text("SELECT 1"))
+        token = database._statement_timeout.set(0.05)
+        try:
+            with pytest.raises(OperationalError) as excinfo:
+                db.execute(text(LENTA))
+        finally:
+            database._statement_timeout.reset(token)
+    assert database.is_statement_timeout(excinfo.value)
+
+
+def test_postgresql_set_local_por_comando_e_esquecido_no_fim_da_transacao():
+    executados = []
+    conn = SimpleNamespace(info={}, invalidated=False)
+    cursor = SimpleNamespace(execute=executados.append)
+
+    database._set_postgresql_timeout(conn, cursor, 0)
+    database._set_postgresql_timeout(conn, cursor, 2.5)
+    database._set_postgresql_timeout(conn, cursor, 2.5)
+    database._set_postgresql_timeout(conn, cursor, 0)
+    assert executados == ["SET LOCAL statement_timeout = 2500", "SET LOCAL statement_timeout = DEFAULT"]
+
+    database._set_postgresql_timeout(conn, cursor, 2.5)
+    database._end_transaction(conn)
+    database._set_postgresql_timeout(conn, cursor, 2.5)
+    assert executados[2:] == ["SET LOCAL statement_timeout = 2500"] * 2
@@ -0,0 +1,65 @@
+import time
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from app.auth.cache import UserCache, user_cache
+from app.auth.models import User
+from app.shared import SharedGenerations
+from benchmarks.common import BENCH_EMAIL, engine
+from tests.conftest import sql_statements
+
+
+def _usuario(email="a@example.com") -> User:
+    return User(id=1, email=email)
+
+
+def test_primeira_requisicao_busca_o_usuario_e_as_seguintes_usam_o_cache(http):
+    user_cache.clear()
+    antes = user_cache.stats()
+    primeira = http.get("/api/empresas/", params={"limit": 1})
+    segunda = http.get("/api/empresas/", params={"limit": 1})
+    assert sql_statements(primeira) == 2
+    assert sql_statements(segunda) == 1
+    depois = user_cache.stats()
+    assert depois["misses"] - antes["misses"] == 1
+    assert depois["hits"] - antes["hits"] == 1
+
+
+def test_expira_com_o_token_antes_do_ttl():
+    cache = UserCache(10, 300)
+    cache.set("a", _usuario(), token_exp=time.time() + 0.05)
+    assert cache.get("a").email == "a@example.com"
+    time.sleep(0.06)
+    assert cache.get("a") is None
+
+    cache.set("b", _usuario("b@example.com"), token_exp=time.time() - 1)
+    assert cache.get("b") is None
+
+
+def test_lru_descarta_o_menos_usado():
+    cache = UserCache(2, 300)
+    for sub in ("a", "b"):
+        cache.set(sub, _usuario(sub))
+    cache.get("a")
+    cache.set("c", _usuario("c"))
+    assert cache.get("b") is None
+    assert cache.get("a") is not None
+    assert cache.stats()["evictions"] == 1
+
+
+def test_invalidacao_vale_para_os_outros_workers(tmp_path):
+    shared = SharedGenerations(str(tmp_path / "generations"))
+    worker_a, worker_b = UserCache(10, 300, shared), UserCache(10, 300, shared)
+    worker_b.set("a", _usuario())
+    worker_a.invalidate("a")
+    assert worker_b.get("a") is None
+
+
+def test_alterar_o_usuario_no_banco_invalida(banco):
+    user_cache.set(BENCH_EMAIL, _usuario(BENCH_EMAIL))
+    with Session(engine) as db:
+        user = db.execute(select(User).where(User.email == BENCH_EMAIL)).scalar_one()
+        user.hashed_password = "outro"
+        db.commit()
+    assert user_cache.get(BENCH_EMAIL) is None
@@ -0,0 +1,74 @@
+"""Fila write-behind das avaliações: 202 no POST, 503 com a fila cheia e gravação no encerramento."""
+import logging
+
+import pytest
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+
+import main
+from app import metrics
+from app.api import bulk, endpoints
+from app.api import models as api_models
+from app.api.writebehind import WriteBehindQueue
+from benchmarks.common import client, engine
+from tests.conftest import EMPRESAS
+
+AVALIACAO = {"id_empresa": 1, "nota_diretor": 7, "nota_geral_empresa": 8, "comentario": "fila"}
+
+
+@pytest.fixture
+def fila(monkeypatch, banco):
+    # Intervalo longo: nada é gravado antes do encerramento do lifespan.
+    queue = WriteBehindQueue("avaliacoes_teste", bulk.AVALIACOES, "avaliacoes", True, max_size=2, batch_size=100, interval=60)
+    monkeypatch.setattr(endpoints, "avaliacoes_queue", queue)
+    monkeypatch.setattr(main, "avaliacoes_queue", queue)
+    # Contador novo: os números do teste não somam os de outros testes.
+    monkeypatch.setattr(metrics, "WRITE_BEHIND_ROWS", metrics.Counter("write_behind_rows_total", "", ("queue", "status")))
+    return queue
+
+
+def _avaliacoes() -> int:
+    with Session(engine) as db:
+        return db.scalar(select(func.count()).select_from(api_models.AvaliacoesDiretorEmpresa))
+
+
+def _linhas(queue, destino) -> float:
+    return metrics.WRITE_BEHIND_ROWS.collect().get((queue.name, destino), 0)
+
+
+def test_202_e_gravacao_no_encerramento(fila):
+    antes = _avaliacoes()
+    with client() as http:
+        response = http.post("/api/avaliacoes/", json=AVALIACAO)
+        assert response.status_code == 202
+        assert response.json() == {"status": "enfileirado", "fila": 1}
+        assert len(fila) == 1
+        assert _avaliacoes() == antes
+    # stop() no lifespan drena a fila.
+    assert len(fila) == 0
+    assert _avaliacoes() == antes + 1
+    assert _linhas(fila, "gravado") == 1
+
+
+def test_503_com_a_fila_cheia(fila):
+    with client() as http:
+        for _ in range(fila.max_size):
+            assert http.post("/api/avaliacoes/", json=AVALIACAO).status_code == 202
+        response = http.post("/api/avaliacoes/", json=AVALIACAO)
+        assert response.status_code == 503
+        assert int(response.headers["Retry-After"]) >= 1
+        assert len(fila) == fila.max_size
+    assert _linhas(fila, "recusado") == 1
+    assert _linhas(fila, "gravado") == fila.max_size
+
+
+def test_item_sem_empresa_e_descartado_na_gravacao(fila, caplog):
+    antes = _avaliacoes()
+    with caplog.at_level(logging.WARNING, logger="app.api.writebehind"):
+        with client() as http:
+            assert http.post("/api/avaliacoes/", json={**AVALIACAO, "id_empresa": EMPRESAS + 999}).status_code == 202
+            assert http.post("/api/avaliacoes/", json=AVALIACAO).status_code == 202
+    assert _avaliacoes() == antes + 1
+    assert _linhas(fila, "descartado") == 1
+    assert _linhas(fila, "gravado") == 1
+    assert any("descartou 1 itens" in record.getMessage() for record in caplog.records)
@@ -0,0 +1,54 @@
+"""Comandos SQL por escrita (cabeçalho X-SQL-Statements): a linha sai do próprio INSERT/UPDATE
+... RETURNING, e o resumo da empresa (app/api/aggregates.py) custa um comando a mais."""
+import pytest
+
+from tests.conftest import sql_statements
+
+FATURAMENTO = {"id_empresa": 1, "faturamento_mensal": 1.0, "faturamento_anual": 12.0, "ano": 2024, "mes": 1}
+AVALIACAO = {"id_empresa": 1, "nota_diretor": 7, "nota_geral_empresa": 8, "comentario": "ok"}
+DETALHE = {"id_empresa": 1, "nome_produto": "P", "categoria": "C", "preco_unitario": 1.0, "margem_lucro_percentual": 1.0, "data_lancamento": "2024-01-01"}
+
+
+@pytest.mark.parametrize("method, url, body, statements", [
+    ("post", "/api/empresas/", {"nome_empresa": "E", "diretor_empresa": "D"}, 2),
+    ("post", "/api/faturamento/", FATURAMENTO, 2),
+    ("post", "/api/produtos_vendidos/", {"id_faturamento": 1, "nome_produto": "P", "produtos_vendidos": 3, "ano": 2024, "mes": 1}, 2),
+    ("post", "/api/avaliacoes/", AVALIACAO, 2),
+    ("post", "/api/detalhes_produtos/", DETALHE, 3),
+    ("put", "/api/empresas/1", {"nome_empresa": "E", "diretor_empresa": "D"}, 1),
+    ("put", "/api/faturamento/1", {"faturamento_anual": 3.0}, 2),
+    ("put", "/api/produtos_vendidos/1", {"produtos_vendidos": 3}, 2),
+    ("put", "/api/avaliacoes/1", {"nota_diretor": 3}, 2),
+    ("put", "/api/detalhes_produtos/1", {"preco_unitario": 3.0}, 3),
+])
+def test_comandos_por_escrita(autenticado, method, url, body, statements):
+    response = getattr(autenticado, method)(url, json=body)
+    assert response.status_code == 200, response.text
+    assert sql_statements(response) == statements
+
+
+@pytest.mark.parametrize("url, body, detail", [
+    ("/api/faturamento/", {**FATURAMENTO, "id_empresa": 999}, "Empresa com ID 999 não encontrada."),
+    ("/api/avaliacoes/", {**AVALIACAO, "id_empresa": 999}, "Empresa com ID 999 não encontrada."),
+    ("/api/produtos_vendidos/", {"id_faturamento": 99999, "nome_produto": "P", "produtos_vendidos": 1, "ano": 2024, "mes": 1}, "Faturamento com ID 99999 não encontrado."),
+])
+def test_violacao_de_fk_vira_404_num_comando(autenticado, url, body, detail):
+    response = autenticado.post(url, json=body)
+    assert response.status_code == 404
+    assert response.json() == {"detail": detail}
+    assert sql_statements(response) == 1
+
+
+def test_update_inexistente_responde_404(autenticado):
+    response = autenticado.put("/api/empresas/999", json={"nome_empresa": "E", "diretor_empresa": "D"})
+    assert response.status_code == 404
+    assert sql_statements(response) == 1
+
+
+def test_sem_metricas_nao_ha_cabecalho(monkeypatch, autenticado):
+    from app import metrics
+
+    monkeypatch.setattr(metrics, "METRICS_ENABLED", False)
+    response = autenticado.get("/api/empresas/", params={"limit": 1})
+    assert response.status_code == 200
+    assert "X-SQL-Statements" not in response.headers